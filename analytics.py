@@ -0,0 +1,156 @@
+import numpy as np
+
+from cache import LRUCache, data_generation
+from models import db, Pokemon, POKEMON_DATA
+
+# Stat analytics over the whole dex.
+#
+# ``stat_table()`` loads every Pokemon's stats into NumPy column arrays with
+# one query per data generation (i.e. again only after seed-db, reset-db or
+# import-dex) and keeps the table in a process-local cache. Totals,
+# percentile ranks, per-type summaries, correlations and leaderboards are
+# computed from those arrays with vectorized operations; the derived
+# results are memoized on the table, so they live exactly as long as it.
+
+STATS = ['hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed']
+MEASURES = STATS + ['total', 'height', 'weight']
+MEASURE_LABELS = {
+    'hp': 'HP', 'attack': 'Attack', 'defense': 'Defense', 'sp_attack': 'Sp. Atk',
+    'sp_defense': 'Sp. Def', 'speed': 'Speed', 'total': 'Total',
+    'height': 'Height', 'weight': 'Weight',
+}
+DEFAULT_LEADERBOARD_SIZE = 20
+
+table_cache = LRUCache(maxsize=2, name='analytics')
+
+
+class StatTable:
+    """Column arrays of every Pokemon's stats; missing values are NaN."""
+
+    def __init__(self, ids, names, type1, type2, columns):
+        self.ids = ids
+        self.names = names
+        self.type1 = type1
+        self.type2 = type2
+        self.columns = dict(columns)
+        self.columns['total'] = np.sum([self.columns[stat] for stat in STATS], axis=0)
+        self._ranks = {}
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls):
+        """Reads the stat columns of every Pokemon with a single query."""
+        columns = [Pokemon.id, Pokemon.name, Pokemon.type1, Pokemon.type2,
+                   *(getattr(Pokemon, measure) for measure in STATS + ['height', 'weight'])]
+        rows = db.session.execute(db.select(*columns).order_by(Pokemon.id)).all()
+        data = list(zip(*rows)) if rows else [()] * len(columns)
+        numeric = {
+            measure: np.array([np.nan if v is None else v for v in values], dtype=float)
+            for measure, values in zip(STATS + ['height', 'weight'], data[4:])
+        }
+        return cls(np.array(data[0], dtype=np.int64), np.array(data[1], dtype=object),
+                   np.array([t or '' for t in data[2]], dtype=object),
+                   np.array([t or '' for t in data[3]], dtype=object), numeric)
+
+    def row(self, pokemon_id):
+        """Position of ``pokemon_id`` in the arrays, or None."""
+        position = int(np.searchsorted(self.ids, pokemon_id))
+        if position < len(self.ids) and self.ids[position] == pokemon_id:
+            return position
+        return None
+
+    def ranks(self, measure):
+        """Percentile rank (0-100] of every Pokemon for ``measure``: the share at or below it."""
+        if measure not in self._ranks:
+            values = self.columns[measure]
+            valid = np.sort(values[~np.isnan(values)])
+            ranks = np.full(len(values), np.nan)
+            if len(valid):
+                known = ~np.isnan(values)
+                ranks[known] = np.searchsorted(valid, values[known], side='right') / len(valid) * 100
+            self._ranks[measure] = ranks
+        return self._ranks[measure]
+
+    def percentile_ranks(self, pokemon_id):
+        """``{measure: rank}`` for one Pokemon (None where its value is unknown)."""
+        position = self.row(pokemon_id)
+        if position is None:
+            return {}
+        result = {}
+        for measure in MEASURES:
+            rank = self.ranks(measure)[position]
+            result[measure] = None if np.isnan(rank) else round(float(rank), 1)
+        return result
+
+    def memoized(self, key, compute):
+        """``compute()``, kept on the table until the next data generation."""
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def type_mask(self, type_name):
+        return (self.type1 == type_name) | (self.type2 == type_name)
+
+    def types(self):
+        return self.memoized('types', lambda: sorted(
+            (set(self.type1.tolist()) | set(self.type2.tolist())) - {''}))
+
+    def summary(self, measure):
+        """Count, mean, median, quartiles and extremes of one measure over the dex."""
+        return self.memoized(('summary', measure), lambda: _describe(self.columns[measure]))
+
+    def type_summary(self, measure):
+        """``[(type, summary)]`` for every type, Pokemon counted under both of their types."""
+        values = self.columns[measure]
+        return self.memoized(('types', measure), lambda: [
+            (type_name, _describe(values[self.type_mask(type_name)]))
+            for type_name in self.types()])
+
+    def correlations(self):
+        """Pearson correlation matrix of MEASURES over Pokemon with complete data."""
+        def compute():
+            matrix = np.vstack([self.columns[measure] for measure in MEASURES])
+            complete = matrix[:, ~np.isnan(matrix).any(axis=0)]
+            if complete.shape[1] < 2:
+                return None
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.round(np.corrcoef(complete), 2)
+        return self.memoized('correlations', compute)
+
+    def leaderboard(self, measure, n=DEFAULT_LEADERBOARD_SIZE, type_name=None, lowest=False):
+        """The top (or bottom) ``n`` Pokemon by ``measure`` as ``[(id, name, value, rank)]``."""
+        def compute():
+            values = self.columns[measure]
+            candidates = ~np.isnan(values)
+            if type_name:
+                candidates &= self.type_mask(type_name)
+            positions = np.flatnonzero(candidates)
+            if not len(positions):
+                return []
+            keys = values[positions] if lowest else -values[positions]
+            count = min(n, len(positions))
+            top = np.argpartition(keys, count - 1)[:count]
+            # Ties are broken by Pokedex number
+            top = top[np.lexsort((self.ids[positions[top]], keys[top]))]
+            ranks = self.ranks(measure)
+            return [(int(self.ids[p]), self.names[p], float(values[p]), round(float(ranks[p]), 1))
+                    for p in positions[top]]
+        return self.memoized(('leaderboard', measure, n, type_name, lowest), compute)
+
+
+def _describe(values):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {'count': 0}
+    p25, median, p75 = np.percentile(values, [25, 50, 75])
+    return {'count': int(len(values)), 'mean': round(float(values.mean()), 1),
+            'median': float(median), 'p25': float(p25), 'p75': float(p75),
+            'min': float(values.min()), 'max': float(values.max())}
+
+
+def stat_table():
+    """The ``StatTable`` of the current data generation, loading it on first use."""
+    return table_cache.get_or_set(data_generation(POKEMON_DATA), StatTable.load)
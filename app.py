@@ -1,4 +1,5 @@
 import os
+import click
 from flask import Flask, render_template  # Removed unused imports from here
 from flask_login import LoginManager
 import datetime
@@ -6,6 +7,14 @@ from config import config_by_name
 # Pokemon model not directly used here yet
 from models import db, bcrypt, User, connect_db
 from forms import SearchForm  # Global search form
+from cache import pokemon_cache
+import page_cache
+import passwords
+import identity
+import instrumentation
+import sprites
+import streaming
+import compression
 
 # Initialize Flask extensions (globally if not app-specific config needed at init)
 login_manager = LoginManager()
@@ -13,6 +22,28 @@ login_manager = LoginManager()
 # db is initialized in models.py
 
 
+def seed_options(command):
+    """Shared PokeAPI fetch options for the seed-db and reset-db commands."""
+    command = click.option('--offline', is_flag=True, default=None,
+                           help='Replay cached PokeAPI responses only, never touch the network.')(command)
+    command = click.option('--batch-size', type=click.IntRange(min=1), default=None,
+                           help='Rows per bulk INSERT (default: SEED_BATCH_SIZE).')(command)
+    command = click.option('--concurrency', type=click.IntRange(min=1), default=None,
+                           help='Number of concurrent PokeAPI fetches (default: SEED_CONCURRENCY).')(command)
+    return command
+
+
+def mirror_after_load(app, offline=None):
+    """Mirrors new sprites after Pokemon were loaded, unless disabled or offline."""
+    offline = app.config.get('POKEAPI_OFFLINE', False) if offline is None else offline
+    if not app.config.get('SPRITE_MIRROR') or offline:
+        return
+    print("Mirroring sprites...")
+    with app.app_context():
+        result = sprites.mirror_sprites()
+    print(f"Mirrored sprites: {result}.")
+
+
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config_by_name[config_name])
@@ -23,6 +54,14 @@ def create_app(config_name='default'):
     # bcrypt needs the app context if used for hashing config
     bcrypt.init_app(app)
     login_manager.init_app(app)
+    pokemon_cache.init_app(app)
+    page_cache.init_app(app)
+    passwords.init_app(app)
+    identity.init_app(app)
+    instrumentation.init_app(app)
+    sprites.init_app(app)
+    streaming.init_app(app)
+    compression.init_app(app)
 
     @app.context_processor
     def inject_current_year_and_search_form():
@@ -36,16 +75,24 @@ def create_app(config_name='default'):
     login_manager.login_message_category = 'info'
     login_manager.login_message = "Please log in to access this page."
 
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    # Cached snapshots instead of a users query on every request
+    login_manager.user_loader(identity.load_user)
 
     # Import and register Blueprints
     from routes.main import main_bp
     from routes.auth import auth_bp
+    from routes.api import api_bp
+    from routes.stats import stats_bp
+    from routes.sprites import sprites_bp
     app.register_blueprint(main_bp)
     # Auth routes will be like /auth/login
     app.register_blueprint(auth_bp, url_prefix='/auth')
+    # JSON API for other services, e.g. /api/v1/pokemon?ids=1,4,7
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    # Stat analytics and leaderboards, e.g. /stats/top/speed
+    app.register_blueprint(stats_bp, url_prefix='/stats')
+    # Mirrored sprites by content hash, e.g. /sprites/<sha256>.png
+    app.register_blueprint(sprites_bp, url_prefix='/sprites')
 
     # Context processor to make forms available to all templates
     @app.context_processor
@@ -66,33 +113,117 @@ def create_app(config_name='default'):
     @app.cli.command("init-db")
     def init_db_command():
         """Initializes the database and creates tables."""
+        from migrations import stamp
         with app.app_context():  # Ensure app context for db operations
             db.create_all()
+            stamp()  # The models already include every migration
         print("Initialized the database and created tables.")
 
+    @app.cli.command("db-upgrade")
+    def db_upgrade_command():
+        """Applies pending schema migrations (indexes etc.) to an existing database."""
+        from migrations import upgrade, current
+        with app.app_context():
+            applied = upgrade()
+            version = current()
+        for target, description in applied:
+            print(f"Applied migration {target}: {description}")
+        print(f"Database schema is at version {version}.")
+
     @app.cli.command("seed-db")
-    def seed_db_command():
+    @seed_options
+    def seed_db_command(concurrency, batch_size, offline):
         """Seeds the database with initial Pokemon data."""
         from seed import seed_pokemon_data
         print("Starting to seed Pokemon data. This may take a while...")
         with app.app_context():  # Ensure app context for db operations
             # Pass app if seed needs config or db directly
-            count = seed_pokemon_data(app)
+            count = seed_pokemon_data(app, concurrency=concurrency,
+                                      batch_size=batch_size, offline=offline)
         print(f"Seeded {count} Pokemon into the database.")
+        mirror_after_load(app, offline)
 
     @app.cli.command("reset-db")
-    def reset_db_command():
+    @seed_options
+    def reset_db_command(concurrency, batch_size, offline):
         """Drops all tables and re-initializes the database."""
+        from migrations import stamp
         with app.app_context():
             db.drop_all()
             db.create_all()
+            stamp()
         print("Dropped all tables and re-initialized the database.")
         # Optionally, re-seed
         from seed import seed_pokemon_data
         print("Starting to re-seed Pokemon data. This may take a while...")
         with app.app_context():
-            count = seed_pokemon_data(app)
+            count = seed_pokemon_data(app, concurrency=concurrency,
+                                      batch_size=batch_size, offline=offline)
         print(f"Re-seeded {count} Pokemon into the database.")
+        mirror_after_load(app, offline)
+
+    @app.cli.command("recount")
+    def recount_command():
+        """Rebuilds the catch counters (Pokemon.catch_count, User.caught_total) from the caught lists."""
+        from popularity import recount
+        with app.app_context():
+            fixed_pokemon, fixed_users = recount()
+            db.session.commit()
+        print(f"Recounted catches: corrected {fixed_pokemon} Pokemon and {fixed_users} users.")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_command():
+        """Creates (if needed) and rebuilds the Pokemon full-text search index."""
+        from search import rebuild_search_index, fts_available
+        with app.app_context():
+            if db.session.get_bind().dialect.name != 'sqlite':
+                raise click.ClickException(
+                    "The full-text search index requires SQLite; other backends use ILIKE.")
+            rebuild_search_index()
+            if not fts_available():
+                raise click.ClickException(
+                    "The search index could not be created; search falls back to ILIKE.")
+        print("Rebuilt the Pokemon search index.")
+
+    @app.cli.command("export-dex")
+    @click.argument('path', type=click.Path(dir_okay=False, writable=True))
+    @click.option('--compress/--no-compress', default=None,
+                  help='Gzip the snapshot (default: only when PATH ends in .gz).')
+    def export_dex_command(path, compress):
+        """Writes every Pokemon to a versioned snapshot file."""
+        from snapshot import export_dex
+        with app.app_context():
+            count = export_dex(path, compress=compress)
+        print(f"Exported {count} Pokemon to {path}.")
+
+    @app.cli.command("import-dex")
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', type=click.IntRange(min=1), default=None,
+                  help='Rows per bulk INSERT (default: SEED_BATCH_SIZE).')
+    @click.option('--replace', is_flag=True,
+                  help='Overwrite Pokemon that already exist instead of skipping them.')
+    def import_dex_command(path, batch_size, replace):
+        """Loads Pokemon from a snapshot file written by export-dex."""
+        from snapshot import import_dex, SnapshotError
+        with app.app_context():
+            try:
+                result = import_dex(
+                    path, batch_size or app.config['SEED_BATCH_SIZE'], replace=replace)
+            except SnapshotError as e:
+                raise click.ClickException(str(e))
+        print(f"Imported Pokemon from {path}: {result}.")
+        mirror_after_load(app)
+
+    @app.cli.command("mirror-sprites")
+    @click.option('--refresh', is_flag=True,
+                  help='Download every sprite again, not just ones missing locally.')
+    @click.option('--concurrency', type=click.IntRange(min=1), default=None,
+                  help='Number of concurrent downloads (default: SPRITE_CONCURRENCY).')
+    def mirror_sprites_command(refresh, concurrency):
+        """Downloads sprites into the local store and rebuilds thumbnails and sprite sheets."""
+        with app.app_context():
+            result = sprites.mirror_sprites(refresh=refresh, concurrency=concurrency)
+        print(f"Mirrored sprites: {result}.")
 
     return app
 
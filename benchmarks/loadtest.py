@@ -0,0 +1,263 @@
+"""
+Load test against a real gunicorn process on a seeded benchmark database.
+
+    python -m benchmarks.loadtest --workers 4 --clients 32 --duration 30
+    python -m benchmarks.loadtest --reuse --mix browse=50,search=20,catch=25,signup=5
+
+Starts ``gunicorn -w N`` on a local port with the 'benchmark' config, drives
+it from a pool of client threads (anonymous browsing, search, logged-in
+catch/release, signups) for ``--duration`` seconds and reports throughput,
+latency percentiles per action and error rates, including SQLite
+``database is locked`` errors found in the server log.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import requests
+
+from benchmarks.run import percentile
+from benchmarks.synthetic import PASSWORD
+
+DEFAULT_MIX = 'browse=60,search=20,catch=15,signup=5'
+STARTUP_TIMEOUT = 30  # Seconds to wait for gunicorn to answer
+REQUEST_TIMEOUT = 30
+LOCKED_MESSAGE = 'database is locked'
+
+
+def parse_mix(text):
+    """``'browse=60,search=20'`` -> ``{'browse': 60.0, 'search': 20.0}``."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ACTIONS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown action {name!r}; choose from {', '.join(ACTIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Client:
+    """One simulated visitor with its own cookie jar."""
+
+    def __init__(self, base_url, rng, pokemon_count, user_count, names):
+        self.base_url = base_url
+        self.rng = rng
+        self.pokemon_count = pokemon_count
+        self.user_count = user_count
+        self.names = names
+        self.session = requests.Session()
+        self.logged_in = False
+
+    def request(self, method, path, **kwargs):
+        return self.session.request(method, self.base_url + path, allow_redirects=False,
+                                    timeout=REQUEST_TIMEOUT, **kwargs)
+
+    def login(self):
+        username = f'trainer{self.rng.randint(1, self.user_count)}'
+        response = self.request('POST', '/auth/login',
+                                 data={'identifier': username, 'password': PASSWORD})
+        self.logged_in = response.status_code == 302
+        return response
+
+
+def browse(client):
+    roll = client.rng.random()
+    if roll < 0.3:
+        return client.request('GET', f'/?page={client.rng.randint(1, 10)}')
+    if roll < 0.7:
+        return client.request('GET', f'/pokemon/{client.rng.randint(1, client.pokemon_count)}')
+    return client.request('GET', '/pokemon/' + client.rng.choice(client.names))
+
+
+def search(client):
+    term = client.rng.choice(client.names)[:client.rng.randint(2, 6)]
+    return client.request('GET', '/', params={'search_term': term})
+
+
+def catch(client):
+    if not client.logged_in:
+        return client.login()
+    pokemon_id = client.rng.randint(1, client.pokemon_count)
+    action = 'catch' if client.rng.random() < 0.6 else 'release'
+    return client.request('POST', f'/pokemon/{pokemon_id}/{action}')
+
+
+def signup(client):
+    name = 'load' + uuid.uuid4().hex[:12]
+    return client.request('POST', '/auth/signup', data={
+        'username': name, 'email': f'{name}@example.com',
+        'password': PASSWORD, 'confirm_password': PASSWORD})
+
+
+ACTIONS = {'browse': browse, 'search': search, 'catch': catch, 'signup': signup}
+
+
+class Recorder:
+    """Thread-safe latency and status collection."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.exceptions = Counter()
+
+    def record(self, action, elapsed, status=None, exception=None):
+        with self.lock:
+            if exception is not None:
+                self.exceptions[f'{action}: {type(exception).__name__}'] += 1
+                self.statuses[action]['exception'] += 1
+            else:
+                self.latencies[action].append(elapsed * 1000)
+                self.statuses[action][status] += 1
+
+
+def drive(client, mix, deadline, recorder):
+    actions, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        action = client.rng.choices(actions, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = ACTIONS[action](client)
+        except requests.RequestException as e:
+            recorder.record(action, time.perf_counter() - started, exception=e)
+        else:
+            recorder.record(action, time.perf_counter() - started, response.status_code)
+
+
+def start_gunicorn(database_url, workers, threads, port, log_path):
+    env = dict(os.environ, BENCHMARK_DATABASE_URL=database_url)
+    log = open(log_path, 'w', encoding='utf-8')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+         '--bind', f'127.0.0.1:{port}', '--error-logfile', '-', "app:create_app('benchmark')"],
+        env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}; see {log_path}")
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not start within {STARTUP_TIMEOUT}s; see {log_path}")
+
+
+def report(recorder, duration, log_path):
+    with open(log_path, encoding='utf-8', errors='replace') as f:
+        locked = f.read().count(LOCKED_MESSAGE)
+    actions = {}
+    total = errors = 0
+    for action, statuses in sorted(recorder.statuses.items()):
+        samples = sorted(recorder.latencies[action])
+        count = sum(statuses.values())
+        failed = sum(n for status, n in statuses.items()
+                     if status == 'exception' or status >= 500)
+        total += count
+        errors += failed
+        actions[action] = {
+            'requests': count, 'errors': failed,
+            'error_rate': round(failed / count, 4) if count else 0.0,
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'p99_ms': round(percentile(samples, 99), 2),
+            'statuses': {str(status): n for status, n in sorted(statuses.items(), key=str)},
+        }
+    return {
+        'requests': total,
+        'throughput_rps': round(total / duration, 1),
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'database_locked': locked,
+        'exceptions': dict(recorder.exceptions),
+        'actions': actions,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent simulated visitors')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of load')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'Action weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--pokemon', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', help='SQLite file to use (default: a temporary one)')
+    parser.add_argument('--reuse', action='store_true', help='Keep the existing --database')
+    parser.add_argument('--output', help='Write the report JSON here')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='pokedex-load-')
+    database = os.path.abspath(args.database or os.path.join(workdir, 'load.db'))
+    database_url = f'sqlite:///{database}'
+    os.environ['BENCHMARK_DATABASE_URL'] = database_url
+    from app import create_app
+    from benchmarks.run import prepare_database
+    app = create_app('benchmark')
+    prepare_args = argparse.Namespace(reuse=args.reuse, pokemon=args.pokemon,
+                                      users=args.users, seed=args.seed)
+    pokemon_count, user_count, names, _ = prepare_database(app, prepare_args)
+
+    log_path = os.path.join(workdir, 'gunicorn.log')
+    process, base_url = start_gunicorn(database_url, args.workers, args.threads,
+                                       free_port(), log_path)
+    print(f"gunicorn: {args.workers} workers x {args.threads} threads at {base_url} "
+          f"(log: {log_path})")
+    recorder = Recorder()
+    try:
+        rng = random.Random(args.seed)
+        clients = [Client(base_url, random.Random(rng.random()), pokemon_count, user_count, names)
+                   for _ in range(args.clients)]
+        started = time.monotonic()
+        deadline = started + args.duration
+        threads = [threading.Thread(target=drive, args=(client, args.mix, deadline, recorder))
+                   for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    result = report(recorder, elapsed, log_path)
+    result['config'] = {'workers': args.workers, 'threads': args.threads,
+                        'clients': args.clients, 'duration': args.duration, 'mix': args.mix,
+                        'pokemon': pokemon_count, 'users': user_count}
+    print(f"{result['requests']} requests in {elapsed:.1f}s: {result['throughput_rps']} req/s, "
+          f"error rate {result['error_rate']:.2%}, 'database is locked' x{result['database_locked']}")
+    for action, stats in result['actions'].items():
+        print(f"  {action:8} {stats['requests']:7} req  p50 {stats['p50_ms']:8.2f} ms  "
+              f"p95 {stats['p95_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  "
+              f"errors {stats['error_rate']:.2%}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
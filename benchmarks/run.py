@@ -0,0 +1,256 @@
+"""
+Route benchmarks over a synthetic Pokedex.
+
+    python -m benchmarks.run --pokemon 20000 --users 500 --output results.json
+    python -m benchmarks.run --reuse --baseline results.json --output new.json
+
+Builds (or with ``--reuse`` keeps) the benchmark database, times each
+scenario through the Flask test client and reports p50/p95/p99 latency
+and SQL statements per request. With ``--baseline`` the run is compared
+against an earlier results file and exits with status 1 if any scenario
+got slower than ``--threshold`` (p95) or issues more queries.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+
+from benchmarks.synthetic import PASSWORD, TYPES
+
+DEFAULT_REPEAT = 50
+DEFAULT_WARMUP = 5
+DEFAULT_THRESHOLD = 0.25  # Allowed relative p95 slowdown before flagging
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_samples)) - 1, 0)
+    return sorted_samples[rank]
+
+
+def summarize(samples, queries):
+    samples = sorted(samples)
+    return {
+        'samples': len(samples),
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+    }
+
+
+class Context:
+    """What scenarios need to build requests: data shape, clients and a seeded RNG."""
+
+    def __init__(self, app, rng, pokemon_count, user_count, names, collector_id):
+        self.app = app
+        self.rng = rng
+        self.pokemon_count = pokemon_count
+        self.user_count = user_count
+        self.names = names
+        self.collector_id = collector_id
+        self.anonymous = app.test_client()
+        self.collector = self.login(f'trainer{collector_id}')
+
+    def login(self, username):
+        client = self.app.test_client()
+        response = client.post('/auth/login', data={'identifier': username, 'password': PASSWORD})
+        assert response.status_code == 302, f"Could not log in as {username}"
+        return client
+
+    def random_id(self):
+        return self.rng.randint(1, self.pokemon_count)
+
+    def cursor_page(self, fraction):
+        """Index URL seeking to ``fraction`` of the way through the dex."""
+        from pagination import encode_cursor
+        from routes.main import POKEMON_PER_PAGE
+        key = int(self.pokemon_count * fraction)
+        with self.app.test_request_context():
+            return '/?cursor=' + encode_cursor(key, 'next', key // POKEMON_PER_PAGE + 1)
+
+
+def catch_or_release(ctx, action):
+    """A catch of a random Pokemon, or a release of one caught just before (untimed)."""
+    pokemon_id = ctx.random_id()
+    if action == 'release':
+        ctx.collector.post(f'/pokemon/{pokemon_id}/catch')
+    return ctx.collector, 'POST', f'/pokemon/{pokemon_id}/{action}', None
+
+
+# name -> function(ctx) returning (client, method, url, form data)
+SCENARIOS = {
+    'index_page_1': lambda ctx: (ctx.anonymous, 'GET', '/', None),
+    'index_page_10': lambda ctx: (ctx.anonymous, 'GET', '/?page=10', None),
+    'index_deep_50pct': lambda ctx: (ctx.anonymous, 'GET', ctx.cursor_page(0.5), None),
+    'index_deep_90pct': lambda ctx: (ctx.anonymous, 'GET', ctx.cursor_page(0.9), None),
+    'index_filtered': lambda ctx: (
+        ctx.anonymous, 'GET', f'/?type={ctx.rng.choice(TYPES)}&filter=speed>=100&sort=-total', None),
+    'index_filtered_mine': lambda ctx: (
+        ctx.collector, 'GET', f'/?type1={ctx.rng.choice(TYPES)}&caught=no&sort=-attack', None),
+    'index_show_all_type': lambda ctx: (
+        ctx.anonymous, 'GET', f'/?show=all&type={ctx.rng.choice(TYPES)}', None),
+    'search_substring': lambda ctx: (
+        ctx.anonymous, 'GET', '/?search_term=' + ctx.rng.choice(ctx.names)[:5], None),
+    'search_prefix_short': lambda ctx: (
+        ctx.anonymous, 'GET', '/?search_term=' + ctx.rng.choice(ctx.names)[:2], None),
+    'search_typo': lambda ctx: (
+        ctx.anonymous, 'GET', '/?search_term=' + ctx.rng.choice(ctx.names)[:6] + 'x', None),
+    'detail_by_id': lambda ctx: (ctx.anonymous, 'GET', f'/pokemon/{ctx.random_id()}', None),
+    'detail_by_name': lambda ctx: (
+        ctx.anonymous, 'GET', '/pokemon/' + ctx.rng.choice(ctx.names), None),
+    'detail_logged_in': lambda ctx: (ctx.collector, 'GET', f'/pokemon/{ctx.random_id()}', None),
+    'stats_most_caught': lambda ctx: (ctx.anonymous, 'GET', '/stats/popular', None),
+    'profile_page_1': lambda ctx: (ctx.collector, 'GET', '/profile', None),
+    'profile_page_5': lambda ctx: (ctx.collector, 'GET', '/profile?page=5', None),
+    'catch': lambda ctx: catch_or_release(ctx, 'catch'),
+    'release': lambda ctx: catch_or_release(ctx, 'release'),
+    'login': lambda ctx: (ctx.app.test_client(), 'POST', '/auth/login',
+                          {'identifier': f'trainer{ctx.rng.randint(1, ctx.user_count)}',
+                           'password': PASSWORD}),
+}
+
+
+def run_scenarios(app, ctx, names, repeat, warmup):
+    from sqlalchemy import event
+    from models import db
+
+    counter = [0]
+
+    def count(*args):
+        counter[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    results = {}
+    try:
+        for name in names:
+            samples, queries = [], []
+            for i in range(warmup + repeat):
+                client, method, url, data = SCENARIOS[name](ctx)
+                counter[0] = 0
+                started = time.perf_counter()
+                response = client.open(url, method=method, data=data)
+                response.get_data()  # Streamed pages render while the body is read
+                elapsed = (time.perf_counter() - started) * 1000
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{name}: {method} {url} returned {response.status_code}")
+                if i >= warmup:
+                    samples.append(elapsed)
+                    queries.append(counter[0])
+            results[name] = summarize(samples, queries)
+            print(f"{name:22} p50 {results[name]['p50_ms']:8.2f} ms  "
+                  f"p95 {results[name]['p95_ms']:8.2f} ms  "
+                  f"p99 {results[name]['p99_ms']:8.2f} ms  "
+                  f"{results[name]['queries_per_request']:6.2f} queries")
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Descriptions of scenarios that regressed against ``baseline``."""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+        if result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        if result['queries_per_request'] > before['queries_per_request']:
+            regressions.append(f"{name}: queries/request {before['queries_per_request']} -> "
+                               f"{result['queries_per_request']}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_database(app, args):
+    from models import db, Pokemon, User
+    from migrations import stamp
+    from benchmarks.synthetic import generate_dex, heaviest_collector
+
+    with app.app_context():
+        if not args.reuse:
+            db.drop_all()
+            db.create_all()
+            stamp()
+            print(f"Generating {args.pokemon} Pokemon and {args.users} users...")
+            print(f"Generated: {generate_dex(args.pokemon, args.users, seed=args.seed)}")
+        pokemon_count = db.session.scalar(db.select(db.func.count()).select_from(Pokemon))
+        user_count = db.session.scalar(db.select(db.func.count()).select_from(User))
+        rng = random.Random(args.seed)
+        names = list(db.session.scalars(db.select(Pokemon.name).where(
+            Pokemon.id.in_([rng.randint(1, pokemon_count) for _ in range(200)]))))
+        return pokemon_count, user_count, names, heaviest_collector()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pokemon', type=int, default=10000, help='Pokemon to generate')
+    parser.add_argument('--users', type=int, default=100, help='Users to generate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help='Untimed requests per scenario')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Run only these scenarios (repeatable)')
+    parser.add_argument('--database', help='Database URL (default: BENCHMARK_DATABASE_URL or '
+                                           'instance/pokedex_bench.db)')
+    parser.add_argument('--reuse', action='store_true', help='Keep the existing benchmark database')
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--baseline', help='Results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Relative p95 slowdown flagged as a regression')
+    args = parser.parse_args(argv)
+
+    if args.database:
+        os.environ['BENCHMARK_DATABASE_URL'] = args.database  # Read when config is imported
+    from app import create_app
+    app = create_app('benchmark')
+    pokemon_count, user_count, names, collector_id = prepare_database(app, args)
+
+    ctx = Context(app, random.Random(args.seed), pokemon_count, user_count, names, collector_id)
+    results = run_scenarios(app, ctx, args.scenario or list(SCENARIOS), args.repeat, args.warmup)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'revision': git_revision(),
+            'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+            'pokemon': pokemon_count, 'users': user_count, 'seed': args.seed,
+            'repeat': args.repeat, 'warmup': args.warmup,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import itertools
+import random
+import time
+
+from models import db, User, Pokemon, caught_pokemon_association, upsert_statement
+from passwords import hash_password
+from popularity import recount
+from seed import bulk_insert_pokemon
+
+# Synthetic Pokedex for benchmarks.
+#
+# Generates N Pokemon (IDs past the real dex become regional forms and
+# variants of earlier ones, like "pikachu-alola-2"), M users sharing one
+# known password, and a skewed caught-pokemon table: a few Pokemon are
+# caught by almost everyone and a few users have caught almost
+# everything, as in the real app. The same seed gives the same database.
+
+TYPES = ['normal', 'fire', 'water', 'electric', 'grass', 'ice', 'fighting', 'poison',
+         'ground', 'flying', 'psychic', 'bug', 'rock', 'ghost', 'dragon', 'dark',
+         'steel', 'fairy']
+SYLLABLES = ['bul', 'ba', 'saur', 'char', 'man', 'der', 'squir', 'tle', 'pi', 'ka', 'chu',
+             'ee', 'vee', 'mew', 'two', 'gen', 'gar', 'snor', 'lax', 'dra', 'go', 'nite',
+             'lu', 'cario', 'ze', 'kro', 'ma', 'gne', 'ton', 'zap', 'dos']
+FORMS = ['alola', 'galar', 'hisui', 'paldea', 'mega', 'gmax', 'shadow', 'origin']
+DESCRIPTION_WORDS = ['seed', 'flame', 'shell', 'thunder', 'shadow', 'forest', 'river',
+                     'mountain', 'storm', 'crystal', 'ancient', 'sleeps', 'hunts', 'glows',
+                     'battles', 'swims', 'flies', 'burrows']
+BASE_DEX_SIZE = 1025  # Distinct species; later IDs are forms of these
+PASSWORD = 'benchmark-password'
+CATCH_SKEW = 1.1  # Zipf exponent of Pokemon popularity
+COLLECTOR_SKEW = 1.5  # Pareto shape of caught-list sizes (lower = more skewed)
+
+
+def species_name(rng, index):
+    parts = rng.randint(2, 3)
+    return ''.join(rng.choice(SYLLABLES) for _ in range(parts)) + str(index)
+
+
+def generate_pokemon(count, rng):
+    """Yields ``count`` Pokemon column dicts with plausible stats."""
+    species = []
+    for pokemon_id in range(1, count + 1):
+        if pokemon_id <= BASE_DEX_SIZE:
+            name = species_name(rng, pokemon_id)
+            species.append(name)
+        else:
+            base = species[(pokemon_id - 1) % len(species)]
+            name = f'{base}-{FORMS[pokemon_id % len(FORMS)]}-{pokemon_id}'
+        type1 = rng.choice(TYPES)
+        type2 = rng.choice(TYPES) if rng.random() < 0.5 else None
+        yield {
+            'id': pokemon_id, 'name': name, 'type1': type1,
+            'type2': type2 if type2 != type1 else None,
+            'hp': rng.randint(20, 255), 'attack': rng.randint(5, 190),
+            'defense': rng.randint(5, 230), 'sp_attack': rng.randint(10, 194),
+            'sp_defense': rng.randint(20, 230), 'speed': rng.randint(5, 200),
+            'height': rng.randint(1, 200), 'weight': rng.randint(1, 9999),
+            'sprite_url': f'https://example.invalid/sprites/{pokemon_id}.png',
+            'description': ' '.join(rng.choice(DESCRIPTION_WORDS) for _ in range(12)).capitalize() + '.',
+        }
+
+
+def caught_rows(user_ids, pokemon_count, rng, max_per_user=None):
+    """Yields ``(user_id, pokemon_id)`` pairs with skewed popularity and collection sizes."""
+    cum_weights = list(itertools.accumulate(
+        1 / rank ** CATCH_SKEW for rank in range(1, pokemon_count + 1)))
+    popularity = list(range(1, pokemon_count + 1))
+    rng.shuffle(popularity)  # Popular Pokemon are spread over the dex
+    max_per_user = min(max_per_user or pokemon_count, pokemon_count)
+    for user_id in user_ids:
+        size = min(int(rng.paretovariate(COLLECTOR_SKEW) * 10), max_per_user)
+        caught = set()
+        while len(caught) < size:
+            caught.update(rng.choices(popularity, cum_weights=cum_weights, k=size - len(caught)))
+        for pokemon_id in sorted(caught):
+            yield user_id, pokemon_id
+
+
+def generate_dex(pokemon=10000, users=100, seed=0, batch_size=2000, max_caught_per_user=None):
+    """
+    Fills an empty database with a synthetic dex and returns a summary
+    dict. Users are named ``trainer<N>`` and share PASSWORD.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    bulk_insert_pokemon(generate_pokemon(pokemon, rng), batch_size=batch_size)
+
+    password_hash = hash_password(PASSWORD)  # One bcrypt run for every account
+    db.session.execute(db.insert(User.__table__), [
+        {'id': i, 'username': f'trainer{i}', 'email': f'trainer{i}@example.com',
+         'password_hash': password_hash} for i in range(1, users + 1)])
+    db.session.commit()
+
+    stmt = upsert_statement(caught_pokemon_association)
+    batch, caught = [], 0
+    for user_id, pokemon_id in caught_rows(range(1, users + 1), pokemon, rng, max_caught_per_user):
+        batch.append({'user_id': user_id, 'pokemon_id': pokemon_id})
+        if len(batch) >= batch_size:
+            db.session.execute(stmt, batch)
+            caught += len(batch)
+            batch.clear()
+    if batch:
+        db.session.execute(stmt, batch)
+        caught += len(batch)
+    recount()  # The rows went in directly, bypassing the catch counters
+    db.session.commit()
+
+    return {'pokemon': pokemon, 'users': users, 'caught': caught, 'seed': seed,
+            'seconds': round(time.perf_counter() - started, 2)}
+
+
+def heaviest_collector():
+    """ID of the user with the most caught Pokemon."""
+    return db.session.execute(
+        db.select(User.id).order_by(User.caught_total.desc()).limit(1)).scalar()
@@ -0,0 +1,199 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, has_app_context
+
+from models import db, DataVersion, Pokemon, POKEMON_DATA, POKEMON_DATA_COLUMNS
+
+DEFAULT_GENERATION_POLL_SECONDS = 5
+DEFAULT_POKEMON_CACHE_SIZE = 4096
+
+_MISSING = object()
+_registry = weakref.WeakSet()  # Every LRUCache, for stats and test resets
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU mapping for process-local caches.
+    Entries may carry a TTL; ``hits`` and ``misses`` count lookups.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, name=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl  # Default lifetime in seconds, None = until evicted
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        _registry.add(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires_at = item
+                if expires_at is not None and expires_at <= time.monotonic():
+                    del self._data[key]
+                else:
+                    self._data.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return value
+            if count:
+                self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Read-through lookup: calls ``factory()`` and stores its result on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[0] if item is not None else default
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._data), 'maxsize': self.maxsize}
+
+
+def cache_stats():
+    """Hit/miss counters of every named cache in this process."""
+    return {cache.name: cache.stats() for cache in list(_registry) if cache.name}
+
+
+def clear_all_caches():
+    """Empties every process-local cache and forgets cached generations."""
+    for cache in list(_registry):
+        cache.clear()
+    forget_generation()
+
+
+# name -> (generation, monotonic time it was read)
+_generations = {}
+
+
+def data_generation(name):
+    """
+    The current ``DataVersion`` generation of ``name``.
+    Re-read from the database at most every DATA_GENERATION_POLL_SECONDS,
+    so steady-state requests do not pay a query for it.
+    """
+    poll_seconds = DEFAULT_GENERATION_POLL_SECONDS
+    if has_app_context():
+        poll_seconds = current_app.config.get(
+            'DATA_GENERATION_POLL_SECONDS', poll_seconds)
+    now = time.monotonic()
+    cached = _generations.get(name)
+    if cached is not None and now - cached[1] < poll_seconds:
+        return cached[0]
+    generation = DataVersion.current(name)
+    _generations[name] = (generation, now)
+    return generation
+
+
+def forget_generation(name=None):
+    """Makes the next ``data_generation`` call re-read from the database."""
+    if name is None:
+        _generations.clear()
+    else:
+        _generations.pop(name, None)
+
+
+# Immutable, session-independent copy of a ``pokemon`` row's reference data
+PokemonRecord = namedtuple('PokemonRecord', POKEMON_DATA_COLUMNS)
+
+
+class PokemonCache:
+    """
+    Read-through cache of Pokemon reference data.
+
+    Keeps id -> ``PokemonRecord`` and lowercase name -> id maps in bounded
+    LRUs (unknown IDs and names are cached too, so 404s are cheap). Both
+    maps are dropped whenever the ``pokemon`` data generation changes, i.e.
+    after seed-db, reset-db or import-dex in any process.
+    """
+
+    def __init__(self, maxsize=DEFAULT_POKEMON_CACHE_SIZE):
+        self.by_id = LRUCache(maxsize, name='pokemon')
+        self.name_to_id = LRUCache(maxsize, name='pokemon_names')
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        maxsize = app.config.get('POKEMON_CACHE_SIZE', DEFAULT_POKEMON_CACHE_SIZE)
+        self.by_id.maxsize = self.name_to_id.maxsize = maxsize
+
+    def _check_generation(self):
+        generation = data_generation(POKEMON_DATA)
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    self.by_id.clear()
+                    self.name_to_id.clear()
+                    self._generation = generation
+
+    @staticmethod
+    def _record(pokemon):
+        if pokemon is None:
+            return None
+        return PokemonRecord(*(getattr(pokemon, field) for field in PokemonRecord._fields))
+
+    def get(self, pokemon_id):
+        """The ``PokemonRecord`` with this ID, or None."""
+        self._check_generation()
+        return self.by_id.get_or_set(
+            int(pokemon_id), lambda: self._record(db.session.get(Pokemon, int(pokemon_id))))
+
+    def get_by_name(self, name):
+        """The ``PokemonRecord`` with this (case-insensitive) name, or None."""
+        self._check_generation()
+        key = name.lower()
+        pokemon_id = self.name_to_id.get(key, _MISSING)
+        if pokemon_id is _MISSING:
+            pokemon = Pokemon.query.filter(
+                db.func.lower(Pokemon.name) == key).first()
+            record = self._record(pokemon)
+            pokemon_id = record.id if record else None
+            self.name_to_id.set(key, pokemon_id)
+            if record is not None:
+                self.by_id.set(record.id, record)
+                return record
+        if pokemon_id is None:
+            return None
+        return self.get(pokemon_id)
+
+    def get_by_id_or_name(self, identifier):
+        """Cached counterpart of ``Pokemon.get_by_id_or_name``."""
+        if isinstance(identifier, int) or identifier.isdigit():
+            return self.get(int(identifier))
+        return self.get_by_name(identifier)
+
+
+pokemon_cache = PokemonCache()
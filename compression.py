@@ -0,0 +1,126 @@
+import gzip
+import re
+import zlib
+
+from flask import g, request
+
+from cache import LRUCache
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Response compression.
+#
+# Text responses are compressed with brotli or gzip, whichever the client
+# prefers (brotli wins ties when the Brotli package is installed). Bodies
+# smaller than COMPRESSION_MIN_SIZE are left alone. Bodies with a strong
+# ETag (cached pages, API lookups) are identical for every client that
+# sends the same ETag back, so their compressed bytes are kept in an LRU
+# keyed by ETag and encoding. Every encoded response, streamed or not,
+# gets its own ETag (``<etag>-<encoding>``). A before-request hook strips
+# that suffix from If-None-Match again, so the views' own ETag checks (the
+# page cache, the API) answer revalidations with a 304 before doing any
+# work, and the 304 echoes the encoded ETag back. Streamed responses are compressed chunk by
+# chunk with a sync flush after each, so every write still reaches the
+# client as soon as it is produced.
+
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html', 'text/plain', 'text/css', 'text/javascript', 'text/csv',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml',
+})
+DEFAULT_MIN_SIZE = 1024  # Bytes; smaller bodies barely shrink
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5  # Near gzip -6 speed, noticeably smaller
+DEFAULT_CACHE_SIZE = 256
+
+compressed_cache = LRUCache(DEFAULT_CACHE_SIZE, name='compressed')
+
+ENCODED_ETAG = re.compile(r'-(br|gzip)"')  # The suffix this module appends
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding, gzip_level=DEFAULT_GZIP_LEVEL, brotli_quality=DEFAULT_BROTLI_QUALITY):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)  # mtime=0: same bytes every time
+
+
+def compress_stream(chunks, encoding, gzip_level=DEFAULT_GZIP_LEVEL,
+                    brotli_quality=DEFAULT_BROTLI_QUALITY):
+    """Compresses an iterable of byte chunks, flushing after each one."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=brotli_quality)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip wrapper
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def init_app(app):
+    """Installs the compressing after-request hook; a no-op unless COMPRESSION_ENABLED."""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+    levels = {'gzip_level': app.config.get('COMPRESSION_GZIP_LEVEL', DEFAULT_GZIP_LEVEL),
+              'brotli_quality': app.config.get('COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)}
+    compressed_cache.maxsize = app.config.get('COMPRESSION_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+    @app.before_request
+    def decode_if_none_match():
+        header = request.headers.get('If-None-Match')
+        match = ENCODED_ETAG.search(header) if header else None
+        if match is None:
+            return
+        request.environ['HTTP_IF_NONE_MATCH'] = ENCODED_ETAG.sub('"', header)
+        request.__dict__.pop('if_none_match', None)  # Parsed lazily; drop a stale parse
+        g.etag_encoding = match.group(1)
+
+    @app.after_request
+    def compress_response(response):
+        encoding = g.pop('etag_encoding', None)
+        if response.status_code == 304 and encoding:
+            etag, weak = response.get_etag()
+            if etag:
+                response.set_etag(f'{etag}-{encoding}', weak=weak)
+            return response
+        if response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers or response.cache_control.no_transform):
+            return response
+        encoding = request.accept_encodings.best_match(available_encodings())
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        if response.is_streamed:
+            response.response = compress_stream(response.iter_encoded(), encoding, **levels)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            if etag:
+                response.set_etag(f'{etag}-{encoding}', weak=weak)
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        if etag and not weak:
+            body = compressed_cache.get_or_set(
+                (etag, encoding), lambda: compress(data, encoding, **levels))
+        else:
+            body = compress(data, encoding, **levels)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak=weak)
+        return response
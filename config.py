@@ -12,6 +12,74 @@ class Config:
     DEBUG = False
     TESTING = False
 
+    # Password hashing
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = 16  # Logins allowed to wait for a hashing thread
+    PASSWORD_HASH_WAIT = 5.0  # Seconds before a waiting login is turned away
+
+    # Logged-in user snapshots used instead of a users query per request
+    IDENTITY_CACHE_SIZE = 4096
+    IDENTITY_CACHE_TTL = 60  # Seconds other workers may lag a password change
+    # Also carry them in the signed session cookie (no lookup at all)
+    IDENTITY_IN_SESSION = os.environ.get(
+        'IDENTITY_IN_SESSION', '').lower() in ('1', 'true', 'yes')
+
+    # Request instrumentation (Server-Timing header and pokedex.* loggers)
+    INSTRUMENTATION_ENABLED = True
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '1').lower() in ('1', 'true', 'yes')
+    PERF_LOG_LEVEL = os.environ.get('PERF_LOG_LEVEL', 'WARNING')  # INFO logs every request
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 100))
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # 0-1
+    PROFILE_DIR = 'profiles'  # cProfile dumps, relative to the instance folder
+
+    # Pagination and caching
+    KEYSET_PAGE_LINK_LIMIT = 10  # Deeper pages use cursor links
+    COUNT_CACHE_TTL = 60  # Seconds
+    DATA_GENERATION_POLL_SECONDS = 5
+    POKEMON_CACHE_SIZE = 4096  # Pokemon rows kept in each worker
+    # Rendered public pages: 'memory' (per worker), 'file' (per host) or '' (off)
+    PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'memory')
+    PAGE_CACHE_DIR = 'page_cache'  # Relative to the instance folder
+    PAGE_CACHE_SIZE = 512
+    PAGE_CACHE_TTL = 300  # Seconds
+
+    # Streamed ?show=all listings and response compression
+    STREAM_LISTINGS = True
+    STREAM_BATCH_SIZE = 500  # Rows per cursor fetch
+    STREAM_CHUNK_BYTES = 16 * 1024  # Rendered HTML per write
+    COMPRESSION_ENABLED = True  # gzip, or brotli when the Brotli package is installed
+    COMPRESSION_MIN_SIZE = 1024  # Bytes; smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 5
+    COMPRESSION_CACHE_SIZE = 256  # Compressed bodies of ETagged responses
+
+    # PokeAPI seeding
+    POKEAPI_BASE_URL = os.environ.get(
+        'POKEAPI_BASE_URL') or 'https://pokeapi.co/api/v2/'
+    SEED_CONCURRENCY = int(os.environ.get('SEED_CONCURRENCY', 8))
+    POKEAPI_MAX_PER_HOST = int(os.environ.get('POKEAPI_MAX_PER_HOST', 8))
+    POKEAPI_RETRIES = 5
+    POKEAPI_BACKOFF_FACTOR = 0.5
+    SEED_BATCH_SIZE = int(os.environ.get('SEED_BATCH_SIZE', 500))
+    # On-disk PokeAPI response cache, relative to the instance folder
+    POKEAPI_CACHE_DIR = os.environ.get('POKEAPI_CACHE_DIR', 'pokeapi_cache')
+    POKEAPI_CACHE_TTL = int(os.environ.get(
+        'POKEAPI_CACHE_TTL', 7 * 24 * 3600))  # Seconds
+    POKEAPI_CACHE_MAX_BYTES = int(os.environ.get(
+        'POKEAPI_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    POKEAPI_OFFLINE = os.environ.get(
+        'POKEAPI_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+    # Local sprite mirror, filled after seed-db/reset-db/import-dex
+    SPRITE_MIRROR = os.environ.get('SPRITE_MIRROR', '1').lower() in ('1', 'true', 'yes')
+    SPRITE_DIR = 'sprites'  # Relative to the instance folder
+    SPRITE_CONCURRENCY = int(os.environ.get('SPRITE_CONCURRENCY', 16))
+    SPRITE_THUMBNAIL_SIZE = 96  # Pixels, square
+    SPRITE_SHEET_SIZE = 20  # Thumbnails per sheet; keep equal to the index page size
+    SPRITE_MAX_BYTES = 2 * 1024 * 1024
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -26,6 +94,13 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         'TEST_DATABASE_URL') or 'sqlite:///pokedex_test.db'
     WTF_CSRF_ENABLED = False
+    BCRYPT_LOG_ROUNDS = 4  # Cheapest cost bcrypt allows
+    POKEAPI_BACKOFF_FACTOR = 0
+    POKEAPI_CACHE_DIR = None  # Tests opt in with a temporary directory
+    DATA_GENERATION_POLL_SECONDS = 0
+    COUNT_CACHE_TTL = 0  # Tests insert rows directly; opt in per test
+    PAGE_CACHE_BACKEND = ''
+    SPRITE_MIRROR = False  # Tests opt in with a temporary SPRITE_DIR
 
 
 class ProductionConfig(Config):
@@ -35,9 +110,17 @@ class ProductionConfig(Config):
     SECRET_KEY = os.environ.get('SECRET_KEY')
 
 
+class BenchmarkConfig(Config):
+    """Production-like settings on a separate database, for benchmarks/."""
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'BENCHMARK_DATABASE_URL') or 'sqlite:///pokedex_bench.db'
+    WTF_CSRF_ENABLED = False  # Benchmarks post forms through the test client
+
+
 config_by_name = {
     'development': DevelopmentConfig,
     'testing': TestingConfig,
     'production': ProductionConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,202 @@
+import operator
+import re
+
+from sqlalchemy import bindparam
+
+from cache import LRUCache
+from models import (db, Pokemon, caught_pokemon_association, BASE_STAT_TOTAL,
+                    GENERATION_RANGES)
+
+# Filter and sort engine for the Pokedex index and the API.
+#
+# A ``FilterSpec`` is parsed from URL arguments such as
+# ``?filter=speed>=100,weight<500&type=fire&caught=no&sort=-total`` and
+# compiled into one SELECT. Values are bound parameters, so every spec of
+# the same *shape* (fields, operators, sort, caught or not) shares a
+# statement, kept in a small LRU of compiled statements; SQLAlchemy's own
+# compiled cache then reuses the SQL string. The composite indexes in
+# models.py (type + stat, type + base stat total) cover the common "best
+# of a type" pages.
+
+NUMERIC_FIELDS = {
+    'id': Pokemon.id, 'hp': Pokemon.hp, 'attack': Pokemon.attack,
+    'defense': Pokemon.defense, 'sp_attack': Pokemon.sp_attack,
+    'sp_defense': Pokemon.sp_defense, 'speed': Pokemon.speed,
+    'total': BASE_STAT_TOTAL, 'height': Pokemon.height, 'weight': Pokemon.weight,
+}
+TYPE_FIELDS = ('type', 'type1', 'type2')
+SORT_FIELDS = dict(NUMERIC_FIELDS, name=Pokemon.name)
+OPERATORS = {'=': operator.eq, '!=': operator.ne, '>=': operator.ge, '<=': operator.le,
+             '>': operator.gt, '<': operator.lt}
+CLAUSE = re.compile(r'^\s*([a-z_0-9]+)\s*(>=|<=|!=|=|>|<|:)\s*(.+?)\s*$')
+YES, NO = ('yes', 'true', '1', 'caught'), ('no', 'false', '0', 'uncaught')
+MAX_CLAUSES = 12
+DEFAULT_STATEMENT_CACHE_SIZE = 256
+
+statement_cache = LRUCache(DEFAULT_STATEMENT_CACHE_SIZE, name='filter_statements')
+
+
+class FilterError(ValueError):
+    """An invalid filter or sort; the message is meant for the user."""
+
+
+class FilterSpec:
+    """Parsed filters, sort order and caught state of an index or API request."""
+
+    def __init__(self, clauses=(), sort='id', descending=False, caught=None):
+        self.clauses = tuple(clauses)  # (field, operator, value)
+        self.sort = sort
+        self.descending = descending
+        self.caught = caught  # True, False or None for either
+
+    def __bool__(self):
+        return bool(self.clauses) or self.sort != 'id' or self.descending or self.caught is not None
+
+    def __repr__(self):
+        return f"<FilterSpec {self.to_args()}>"
+
+    @classmethod
+    def parse(cls, args):
+        """
+        Reads ``filter`` (comma-separated clauses, repeatable), the
+        ``type``/``type1``/``type2``/``generation`` shortcuts, ``caught``
+        and ``sort`` (a field, ``-`` prefixed for descending) from ``args``.
+        """
+        texts = [part for value in args.getlist('filter') for part in value.split(',') if part.strip()]
+        texts += [f'{field}={args[field]}' for field in TYPE_FIELDS + ('generation',)
+                  if args.get(field)]
+        if len(texts) > MAX_CLAUSES:
+            raise FilterError(f"At most {MAX_CLAUSES} filters per request.")
+        clauses = [cls.parse_clause(text) for text in texts]
+
+        caught = (args.get('caught') or '').lower()
+        if caught and caught not in YES + NO:
+            raise FilterError("caught must be yes or no.")
+
+        sort = (args.get('sort') or 'id').strip().lower()
+        descending = sort.startswith('-')
+        sort = sort.lstrip('-')
+        if sort not in SORT_FIELDS:
+            raise FilterError(f"Cannot sort by {sort!r}. Choose from: {', '.join(SORT_FIELDS)}.")
+        return cls(clauses, sort, descending, caught in YES if caught else None)
+
+    @staticmethod
+    def parse_clause(text):
+        match = CLAUSE.match(text.lower())
+        if match is None:
+            raise FilterError(f"Cannot read filter {text.strip()!r}; use e.g. speed>=100 or type=fire.")
+        field, op, value = match.groups()
+        op = '=' if op == ':' else op
+        if field in TYPE_FIELDS:
+            if op not in ('=', '!='):
+                raise FilterError(f"{field} can only be compared with = or !=.")
+            return field, op, value
+        if field == 'generation':
+            if op != '=' or not value.isdigit() or int(value) not in GENERATION_RANGES:
+                raise FilterError("generation must be one of "
+                                  f"{', '.join(str(g) for g in GENERATION_RANGES)}.")
+            return field, op, int(value)
+        if field not in NUMERIC_FIELDS:
+            raise FilterError(f"Unknown filter field {field!r}. Choose from: "
+                              f"{', '.join(list(NUMERIC_FIELDS) + list(TYPE_FIELDS) + ['generation'])}.")
+        try:
+            return field, op, int(value)
+        except ValueError:
+            raise FilterError(f"{field} must be compared with a whole number.")
+
+    def shape(self):
+        """Everything but the values: specs with the same shape share a statement."""
+        return (tuple((field, op) for field, op, _ in self.clauses),
+                self.sort, self.descending, self.caught)
+
+    def params(self, user_id=None):
+        params = {}
+        for i, (field, op, value) in enumerate(self.clauses):
+            if field == 'generation':
+                params[f'p{i}'], params[f'p{i}_last'] = GENERATION_RANGES[value]
+            else:
+                params[f'p{i}'] = value
+        if self.caught is not None:
+            params['user_id'] = user_id
+        return params
+
+    def key(self):
+        return self.shape(), tuple(value for _, _, value in self.clauses)
+
+    def form_args(self):
+        """``to_args()`` with the first ``type=`` clause as ``type``, for the index form's select."""
+        chosen = next((clause for clause in self.clauses if clause[:2] == ('type', '=')), None)
+        if chosen is None:
+            return self.to_args()
+        rest = list(self.clauses)
+        rest.remove(chosen)
+        args = FilterSpec(rest, self.sort, self.descending, self.caught).to_args()
+        args['type'] = chosen[2]
+        return args
+
+    def to_args(self):
+        """Canonical URL arguments, for pagination links."""
+        args = {}
+        if self.clauses:
+            args['filter'] = ','.join(f'{field}{op}{value}' for field, op, value in self.clauses)
+        if self.sort != 'id' or self.descending:
+            args['sort'] = ('-' if self.descending else '') + self.sort
+        if self.caught is not None:
+            args['caught'] = 'yes' if self.caught else 'no'
+        return args
+
+
+def _criterion(field, op, name):
+    value = bindparam(name)
+    if field == 'generation':
+        return Pokemon.id.between(value, bindparam(f'{name}_last'))
+    if field == 'type':
+        if op == '=':
+            # Both type indexes read only the matches; a page sorts those few
+            # rows rather than filtering its way down a sort-column index
+            return db.or_(Pokemon.type1 == value, Pokemon.type2 == value)
+        either = value.in_([Pokemon.type1, Pokemon.type2])
+        return db.not_(db.func.coalesce(either, False))
+    column = getattr(Pokemon, field) if field in TYPE_FIELDS else NUMERIC_FIELDS[field]
+    if op == '!=' and getattr(getattr(column, 'expression', column), 'nullable', True):
+        # NULL != value is NULL, not true: a missing value differs from any value
+        return db.or_(column.is_(None), column != value)
+    return OPERATORS[op](column, value)
+
+
+def build_statement(shape, columns=None, counting=False):
+    """
+    The SELECT for a spec shape, of ``Pokemon`` rows or of the named
+    columns, or with ``counting`` the COUNT of its rows.
+    """
+    clauses, sort, descending, caught = shape
+    if counting:
+        stmt = db.select(db.func.count()).select_from(Pokemon)
+    elif columns:
+        stmt = db.select(*(Pokemon.__table__.c[column] for column in columns))
+    else:
+        stmt = db.select(Pokemon)
+    for i, (field, op) in enumerate(clauses):
+        stmt = stmt.where(_criterion(field, op, f'p{i}'))
+    if caught is not None:
+        caught_table = caught_pokemon_association.c
+        caught_ids = db.select(caught_table.pokemon_id).where(
+            caught_table.user_id == bindparam('user_id'))
+        stmt = stmt.where(Pokemon.id.in_(caught_ids) if caught else Pokemon.id.not_in(caught_ids))
+    if counting:
+        return stmt
+    order = SORT_FIELDS[sort]
+    # The ID tie-break runs the same way, so (type, stat) indexes can be walked backwards
+    if descending:
+        return stmt.order_by(order.desc(), Pokemon.id.desc())
+    return stmt.order_by(order, Pokemon.id)
+
+
+def compile_filter(spec, columns=None):
+    """The cached SELECT and its COUNT for ``spec``'s shape; run them with ``spec.params()``."""
+    key = (spec.shape(), tuple(columns or ()))
+
+    def build():
+        return (build_statement(spec.shape(), columns),
+                build_statement(spec.shape(), counting=True))
+    return statement_cache.get_or_set(key, build)
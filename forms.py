@@ -37,17 +37,18 @@ class SignupForm(FlaskForm):
     )
     submit = SubmitField('Sign Up')
 
-    def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError(
+    def validate(self, extra_validators=None):
+        """Field validation, then one query to check the username and email are free."""
+        if not super().validate(extra_validators):
+            return False
+        taken = User.taken_fields(self.username.data, self.email.data)
+        if 'username' in taken:
+            self.username.errors.append(
                 'That username is already taken. Please choose a different one.')
-
-    def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError(
+        if 'email' in taken:
+            self.email.errors.append(
                 'That email address is already registered. Please use a different one or log in.')
+        return not taken
 
 
 class LoginForm(FlaskForm):
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+
+class OfflineCacheMiss(requests.exceptions.RequestException):
+    """Raised in replay-only mode when a URL has no cached response."""
+
+
+class HttpCache:
+    """
+    Persistent on-disk cache for GET responses.
+
+    Bodies are stored content-addressed under ``blobs/<sha256>`` so identical
+    documents are kept once; ``entries/<sha256(url)>.json`` maps a URL to its
+    blob plus the ETag/Last-Modified validators and fetch time. Entry mtimes
+    double as last-access times for LRU eviction once the stored bodies
+    exceed ``max_bytes``.
+    """
+
+    def __init__(self, directory, ttl=None, max_bytes=None, offline=False):
+        self.directory = directory
+        self.ttl = ttl  # Seconds before an entry needs revalidation, None = forever
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries_dir = os.path.join(directory, 'entries')
+        self._blobs_dir = os.path.join(directory, 'blobs')
+        os.makedirs(self._entries_dir, exist_ok=True)
+        os.makedirs(self._blobs_dir, exist_ok=True)
+        self._total_bytes = sum(
+            os.path.getsize(os.path.join(self._blobs_dir, name))
+            for name in os.listdir(self._blobs_dir))
+
+    @classmethod
+    def from_config(cls, config, instance_path, offline=None):
+        """Builds the seeder cache from POKEAPI_CACHE_* settings, or None if disabled."""
+        directory = config.get('POKEAPI_CACHE_DIR')
+        if not directory:
+            return None
+        return cls(
+            os.path.join(instance_path, directory),
+            ttl=config.get('POKEAPI_CACHE_TTL'),
+            max_bytes=config.get('POKEAPI_CACHE_MAX_BYTES'),
+            offline=config.get('POKEAPI_OFFLINE', False) if offline is None else offline,
+        )
+
+    def _entry_path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self._entries_dir, f"{key}.json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self._blobs_dir, digest)
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url):
+        """Returns the cache entry dict for ``url``, or None."""
+        try:
+            with open(self._entry_path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._blob_path(entry['blob'])):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return self.ttl is None or time.time() - entry['fetched_at'] < self.ttl
+
+    def read(self, entry):
+        """Reads the cached body and marks the entry as recently used."""
+        with open(self._blob_path(entry['blob']), 'rb') as f:
+            body = f.read()
+        try:
+            os.utime(self._entry_path(entry['url']))
+        except OSError:
+            pass
+        return body
+
+    def conditional_headers(self, entry):
+        """Validators to revalidate a stale entry with a conditional GET."""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def mark_revalidated(self, entry):
+        """Resets the TTL of an entry after a 304 Not Modified."""
+        entry['fetched_at'] = time.time()
+        self._write_atomic(self._entry_path(entry['url']),
+                           json.dumps(entry).encode('utf-8'))
+
+    def store(self, url, body, headers):
+        """Stores a response body with its validators and evicts if over the size cap."""
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        entry = {
+            'url': url,
+            'blob': digest,
+            'size': len(body),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        }
+        with self._lock:
+            if not os.path.exists(blob_path):
+                self._write_atomic(blob_path, body)
+                self._total_bytes += len(body)
+            self._write_atomic(self._entry_path(url),
+                               json.dumps(entry).encode('utf-8'))
+            if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+                self._evict()
+        return entry
+
+    def _evict(self):
+        """Drops least recently used entries until the blobs fit under max_bytes."""
+        entries = []
+        for name in os.listdir(self._entries_dir):
+            path = os.path.join(self._entries_dir, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries.append((os.path.getmtime(path), path, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        entries.sort(key=lambda item: item[0])
+
+        blob_refs = {}
+        for _, _, entry in entries:
+            blob_refs[entry['blob']] = blob_refs.get(entry['blob'], 0) + 1
+
+        for _, path, entry in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            os.remove(path)
+            blob_refs[entry['blob']] -= 1
+            if blob_refs[entry['blob']] == 0:
+                blob_path = self._blob_path(entry['blob'])
+                try:
+                    self._total_bytes -= os.path.getsize(blob_path)
+                    os.remove(blob_path)
+                except OSError:
+                    pass
+
+    def _count(self, counter):
+        # The seeder fetches from a thread pool; += on an attribute is not atomic
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def fetch(self, session, url, **kwargs):
+        """
+        GETs ``url`` through the cache and returns the body bytes.
+        Fresh entries are served from disk, stale ones revalidated with a
+        conditional GET; in offline mode only cached bodies are returned.
+        """
+        entry = self.get(url)
+        if entry is not None and (self.offline or self.is_fresh(entry)):
+            self._count('hits')
+            return self.read(entry)
+        if self.offline:
+            self._count('misses')
+            raise OfflineCacheMiss(f"{url} is not cached (offline replay mode)")
+
+        response = session.get(
+            url, headers=self.conditional_headers(entry), **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self._count('revalidated')
+            self.mark_revalidated(entry)
+            return self.read(entry)
+        response.raise_for_status()
+        self._count('misses')
+        self.store(url, response.content, response.headers)
+        return response.content
@@ -0,0 +1,161 @@
+import hashlib
+import time
+
+from flask import current_app, has_request_context, request, session
+from flask_login import UserMixin
+from flask_login.config import COOKIE_NAME
+
+from cache import LRUCache
+from models import db, User, Pokemon, caught_pokemon_association
+
+# Identity cache for Flask-Login's user loader.
+#
+# Authenticated requests resolve ``current_user`` from a snapshot of the
+# user's immutable fields instead of a ``users`` query: from a per-process
+# LRU (IDENTITY_CACHE_TTL seconds), or, with IDENTITY_IN_SESSION, from the
+# signed session cookie itself. Snapshots answer the collection methods
+# (they only need the ID) and load the ORM ``User`` on first access to
+# anything else, so routes that need the full row still get it.
+# ``forget_identity`` drops a user's snapshot on password change and logout;
+# other workers catch up within the TTL. Snapshots carry a fingerprint of
+# the password hash: a session cookie snapshot is trusted for at most the
+# TTL after it was last checked against the database, and rejected (the
+# session is logged out) once the password it was issued for has changed.
+
+DEFAULT_IDENTITY_CACHE_SIZE = 4096
+DEFAULT_IDENTITY_CACHE_TTL = 60  # Seconds
+SESSION_KEY = '_identity'
+
+identity_cache = LRUCache(DEFAULT_IDENTITY_CACHE_SIZE, ttl=DEFAULT_IDENTITY_CACHE_TTL,
+                          name='identities')
+
+
+class UserSnapshot(UserMixin):
+    """Request-local stand-in for ``User`` built from cached fields."""
+
+    FIELDS = ('id', 'username', 'email', 'fingerprint')
+
+    def __init__(self, id, username, email, fingerprint):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.fingerprint = fingerprint
+        self._user = None
+
+    def __repr__(self):
+        return f"<UserSnapshot #{self.id}: {self.username}>"
+
+    @classmethod
+    def of(cls, user):
+        return cls(user.id, user.username, user.email, password_fingerprint(user.password_hash))
+
+    def fields(self):
+        return [getattr(self, field) for field in self.FIELDS]
+
+    # These only use ``self.id``, so they run without loading the user
+    has_caught = User.has_caught
+    catch = User.catch
+    release = User.release
+    catch_matching = User.catch_matching
+    release_matching = User.release_matching
+    collection_counters = User.collection_counters
+
+    @property
+    def caught_pokemon(self):
+        """Query of the caught Pokemon, like the dynamic relationship on ``User``."""
+        caught = caught_pokemon_association.c
+        return (Pokemon.query.join(caught_pokemon_association, caught.pokemon_id == Pokemon.id)
+                .filter(caught.user_id == self.id))
+
+    @property
+    def caught_total(self):
+        """Read on demand; the counters change too often to keep in the snapshot."""
+        return self.collection_counters()[0]
+
+    def orm_user(self):
+        """The full ``User`` row, loaded once per request."""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.orm_user(), name)
+
+
+def password_fingerprint(password_hash):
+    """Short digest of a password hash; changes whenever the password does."""
+    return hashlib.sha256(password_hash.encode('utf-8')).hexdigest()[:16]
+
+
+def init_app(app):
+    identity_cache.maxsize = app.config.get('IDENTITY_CACHE_SIZE', DEFAULT_IDENTITY_CACHE_SIZE)
+    identity_cache.ttl = app.config.get('IDENTITY_CACHE_TTL', DEFAULT_IDENTITY_CACHE_TTL)
+
+
+def _in_session():
+    return current_app.config.get('IDENTITY_IN_SESSION', False)
+
+
+def remember_identity(user):
+    """Caches ``user``'s snapshot (and stores it in the session cookie if enabled)."""
+    snapshot = UserSnapshot.of(user)
+    identity_cache.set(snapshot.id, tuple(snapshot.fields()))
+    if has_request_context() and _in_session():
+        _store_in_session(snapshot)
+    return snapshot
+
+
+def _store_in_session(snapshot):
+    # The time it was checked against the database goes along with it
+    session[SESSION_KEY] = [*snapshot.fields(), int(time.time())]
+
+
+def forget_identity(user_id):
+    identity_cache.pop(user_id)
+    if has_request_context() and _in_session():
+        session.pop(SESSION_KEY, None)
+
+
+def _session_snapshot(user_id):
+    """``(fields, checked_at)`` from the session cookie, or None."""
+    stored = session.get(SESSION_KEY)
+    if not stored or len(stored) != len(UserSnapshot.FIELDS) + 1 or stored[0] != user_id:
+        return None  # Absent, another user's, or written before fingerprints
+    return stored[:-1], stored[-1]
+
+
+def _end_session():
+    """Logs the session out from inside the user loader (``logout_user`` would re-enter it)."""
+    for key in (SESSION_KEY, '_user_id', '_fresh', '_id', '_remember_seconds'):
+        session.pop(key, None)
+    if current_app.config.get('REMEMBER_COOKIE_NAME', COOKIE_NAME) in request.cookies:
+        session['_remember'] = 'clear'  # Flask-Login skips the cookie and deletes it
+
+
+def load_user(user_id):
+    """Flask-Login user loader: session cookie, then process cache, then the database."""
+    user_id = int(user_id)
+    cookie = _session_snapshot(user_id) if _in_session() else None
+    fields = identity_cache.get(user_id)
+    if cookie is not None and fields is None:
+        ttl = identity_cache.ttl
+        if ttl is None or time.time() - cookie[1] < ttl:
+            return UserSnapshot(*cookie[0])  # Checked recently enough; no lookup
+
+    if fields is not None:
+        snapshot = UserSnapshot(*fields)
+    else:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = remember_identity(user)
+        snapshot._user = user  # Already loaded for this request
+    if cookie is not None:
+        if cookie[0][-1] != snapshot.fingerprint:
+            _end_session()
+            return None  # The password changed since this session signed in
+        if cookie[0] != snapshot.fields():
+            _store_in_session(snapshot)  # Username or email changed
+    return snapshot
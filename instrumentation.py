@@ -0,0 +1,180 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import time
+
+from flask import (current_app, g, has_app_context, has_request_context, request,
+                   template_rendered, before_render_template)
+from sqlalchemy import event
+
+from cache import cache_stats
+from models import db
+from passwords import password_stats
+
+# Per-request performance instrumentation.
+#
+# Counts SQL statements and database time (SQLAlchemy cursor events),
+# template render time (Flask's template signals) and cache hits/misses
+# (``cache_stats()`` before and after) for every request. Results go out as
+# a ``Server-Timing`` header, which browser dev tools display, and as one
+# structured (JSON) log line per request on the ``pokedex.requests``
+# logger at INFO. Requests that hash a password (or are turned away by
+# the hashing pool) also report the hashing time and this worker's pool
+# counters (``password_stats()``). Statements slower than SLOW_QUERY_MS and
+# requests slower than SLOW_REQUEST_MS are logged at WARNING. A fraction
+# (PROFILE_SAMPLE_RATE) of requests can be run under cProfile, with the
+# stats written to PROFILE_DIR.
+
+DEFAULT_SLOW_QUERY_MS = 100
+DEFAULT_SLOW_REQUEST_MS = 500
+MAX_LOGGED_STATEMENT = 500  # Characters of SQL kept in slow-query log lines
+
+request_log = logging.getLogger('pokedex.requests')
+slow_log = logging.getLogger('pokedex.slow')
+
+
+class RequestMetrics:
+    """Counters of the current request, kept on ``g``."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.template_start = None
+        self.cache_before = _cache_totals()
+        self.profiler = None
+
+
+def _cache_totals():
+    hits = misses = 0
+    for stats in cache_stats().values():
+        hits += stats['hits']
+        misses += stats['misses']
+    return hits, misses
+
+
+def current_metrics():
+    """The current request's ``RequestMetrics``, or None outside instrumented requests."""
+    return g.get('_metrics') if has_request_context() else None
+
+
+def _setting(name, default):
+    return current_app.config.get(name, default) if has_app_context() else default
+
+
+def _log(logger, level, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps(fields, default=str))
+
+
+def init_app(app):
+    """Installs the hooks; a no-op unless INSTRUMENTATION_ENABLED."""
+    if not app.config.get('INSTRUMENTATION_ENABLED', True):
+        return
+    logger = logging.getLogger('pokedex')
+    logger.setLevel(app.config.get('PERF_LOG_LEVEL', 'WARNING'))
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.sql_count += 1
+            metrics.sql_seconds += elapsed
+        if elapsed * 1000 >= _setting('SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS):
+            _log(slow_log, logging.WARNING, event='slow_query',
+                 ms=round(elapsed * 1000, 1), statement=statement[:MAX_LOGGED_STATEMENT],
+                 path=request.path if metrics is not None else None)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+    def on_before_render(sender, template, context, **extra):
+        metrics = current_metrics()
+        if metrics is not None:
+            if metrics.template_depth == 0:
+                metrics.template_start = time.perf_counter()
+            metrics.template_depth += 1
+
+    def on_rendered(sender, template, context, **extra):
+        metrics = current_metrics()
+        if metrics is not None and metrics.template_depth:
+            metrics.template_depth -= 1
+            if metrics.template_depth == 0:  # Nested renders (fragments) count once
+                metrics.template_seconds += time.perf_counter() - metrics.template_start
+
+    before_render_template.connect(on_before_render, app, weak=False)
+    template_rendered.connect(on_rendered, app, weak=False)
+
+    @app.before_request
+    def start_metrics():
+        g._metrics = metrics = RequestMetrics()
+        g.pop('password_hash_seconds', None)
+        sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+        if sample_rate and random.random() < sample_rate:
+            metrics.profiler = cProfile.Profile()
+            metrics.profiler.enable()
+
+    @app.after_request
+    def finish_metrics(response):
+        metrics = current_metrics()
+        if metrics is None:
+            return response
+        if metrics.profiler is not None:
+            metrics.profiler.disable()
+            _save_profile(metrics.profiler, os.path.join(
+                app.instance_path, app.config.get('PROFILE_DIR', 'profiles')))
+        total = time.perf_counter() - metrics.start
+        hits_before, misses_before = metrics.cache_before
+        hits, misses = _cache_totals()
+        hash_seconds = g.get('password_hash_seconds')
+        record = {
+            'method': request.method, 'path': request.path, 'endpoint': request.endpoint,
+            'status': response.status_code, 'ms': round(total * 1000, 1),
+            'sql_count': metrics.sql_count, 'sql_ms': round(metrics.sql_seconds * 1000, 1),
+            'template_ms': round(metrics.template_seconds * 1000, 1),
+            'cache_hits': hits - hits_before, 'cache_misses': misses - misses_before,
+        }
+        if hash_seconds is not None:
+            record['hash_ms'] = round(hash_seconds * 1000, 1)
+            record['hash_pool'] = password_stats()
+        if app.config.get('SERVER_TIMING', True):
+            response.headers['Server-Timing'] = server_timing_header(record)
+        _log(request_log, logging.INFO, event='request', **record)
+        if total * 1000 >= app.config.get('SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS):
+            _log(slow_log, logging.WARNING, event='slow_request', **record)
+        return response
+
+
+def server_timing_header(record):
+    parts = [
+        f'db;dur={record["sql_ms"]};desc="{record["sql_count"]} queries"',
+        f'tpl;dur={record["template_ms"]}',
+        f'cache;desc="{record["cache_hits"]} hits, {record["cache_misses"]} misses"',
+    ]
+    if 'hash_ms' in record:
+        pool = record['hash_pool']
+        parts.append(f'hash;dur={record["hash_ms"]};'
+                     f'desc="mean {pool["mean_ms"]} ms, {pool["rejected"]} rejected"')
+    parts.append(f'total;dur={record["ms"]}')
+    return ', '.join(parts)
+
+
+def _save_profile(profiler, directory):
+    os.makedirs(directory, exist_ok=True)
+    endpoint = (request.endpoint or 'unknown').replace('.', '-')
+    path = os.path.join(directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{endpoint}-{os.getpid()}.prof')
+    profiler.dump_stats(path)
+    _log(slow_log, logging.INFO, event='profile', path=request.path, file=path)
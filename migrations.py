@@ -0,0 +1,142 @@
+import sqlalchemy as sa
+
+from models import db, DataVersion
+from popularity import recount
+from search import replace_update_trigger
+
+# Versioned schema migrations.
+#
+# ``db.create_all()`` only creates missing tables, so changes to existing
+# tables (new indexes, columns) are applied here, in order, by
+# ``flask db-upgrade``. The applied version is stored in ``data_versions``
+# under SCHEMA_VERSION. Fresh databases created by init-db/reset-db get the
+# full schema from the models and are stamped with the latest version.
+# Migrations must be idempotent: a database may already have part of them.
+
+SCHEMA_VERSION = 'schema'
+
+MIGRATIONS = []  # (version, description, function), in order
+
+
+def migration(version, description):
+    """Registers ``func()`` as the migration to ``version``."""
+    def decorator(func):
+        assert not MIGRATIONS or MIGRATIONS[-1][0] < version, "Migrations must be in order"
+        MIGRATIONS.append((version, description, func))
+        return func
+    return decorator
+
+
+def create_indexes(*names):
+    """Creates the named indexes declared on the models, skipping any that exist."""
+    bind = db.session.connection()
+    indexes = {index.name: index
+               for table in db.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        # IF NOT EXISTS rather than checkfirst: SQLite cannot reflect expression indexes
+        bind.execute(sa.schema.CreateIndex(indexes[name], if_not_exists=True))
+
+
+def add_columns(table_name, *names):
+    """Adds the named columns declared on the model to ``table_name``, skipping any that exist."""
+    bind = db.session.connection()
+    existing = {column['name'] for column in sa.inspect(bind).get_columns(table_name)}
+    table = db.metadata.tables[table_name]
+    for name in names:
+        if name not in existing:
+            column = sa.schema.CreateColumn(table.c[name]).compile(dialect=bind.dialect)
+            bind.execute(sa.text(f'ALTER TABLE {table_name} ADD COLUMN {column}'))
+
+
+@migration(1, "Indexes for name, type, stat and caught-by lookups")
+def add_lookup_indexes():
+    create_indexes(
+        'ix_pokemon_name_lower', 'ix_caught_pokemon_pokemon_id',
+        'ix_pokemon_type1', 'ix_pokemon_type2',
+        'ix_pokemon_hp', 'ix_pokemon_attack', 'ix_pokemon_defense',
+        'ix_pokemon_sp_attack', 'ix_pokemon_sp_defense', 'ix_pokemon_speed')
+    analyze()
+
+
+@migration(2, "Case-insensitive unique indexes on usernames and emails")
+def add_user_lookup_indexes():
+    # Fails if two existing accounts differ only in case; merge them first
+    create_indexes('ix_users_username_lower', 'ix_users_email_lower')
+    analyze()
+
+
+@migration(3, "Composite indexes for filtered and sorted index pages")
+def add_filter_indexes():
+    create_indexes(
+        'ix_pokemon_total', 'ix_pokemon_height', 'ix_pokemon_weight',
+        'ix_pokemon_type1_total', 'ix_pokemon_type2_total',
+        *(f'ix_pokemon_type1_{stat}' for stat in
+          ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed')))
+    analyze()
+
+
+@migration(4, "Catch counters on Pokemon and users, with the popularity index")
+def add_catch_counters():
+    add_columns('pokemon', 'catch_count')
+    add_columns('users', 'caught_total')
+    create_indexes('ix_pokemon_catch_count')
+    recount()  # Backfill from the existing caught lists
+    analyze()
+
+
+@migration(5, "Collection version on users for cached progress breakdowns")
+def add_collection_version():
+    add_columns('users', 'collection_version')
+
+
+@migration(6, "Reindex search only when a Pokemon's name or description changes")
+def narrow_search_update_trigger():
+    replace_update_trigger()
+
+
+def analyze():
+    """Refreshes the planner statistics after index changes (SQLite and PostgreSQL)."""
+    if db.session.get_bind().dialect.name in ('sqlite', 'postgresql'):
+        db.session.execute(sa.text('ANALYZE'))
+
+
+def head():
+    """The latest schema version."""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current():
+    return DataVersion.current(SCHEMA_VERSION)
+
+
+def set_version(version):
+    row = db.session.get(DataVersion, SCHEMA_VERSION)
+    if row is None:
+        row = DataVersion(name=SCHEMA_VERSION)
+        db.session.add(row)
+    row.version = version
+
+
+def stamp():
+    """Marks a database created from the current models as fully migrated."""
+    set_version(head())
+    db.session.commit()
+
+
+def upgrade():
+    """
+    Applies every migration newer than the database's schema version, each
+    in its own transaction. Returns the ``(version, description)`` pairs
+    that were applied.
+    """
+    db.create_all()  # New tables, including data_versions itself
+    applied = []
+    version = current()
+    for target, description, func in MIGRATIONS:
+        if target <= version:
+            continue
+        func()
+        set_version(target)
+        db.session.commit()
+        applied.append((target, description))
+    return applied
@@ -1,4 +1,7 @@
+import time
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
 from flask_login import UserMixin
 from flask_bcrypt import Bcrypt
 
@@ -12,6 +15,22 @@ caught_pokemon_association = db.Table('caught_pokemon',
                                       db.Column('pokemon_id', db.Integer, db.ForeignKey(
                                           'pokemon.id'), primary_key=True)
                                       )
+# Reverse lookups ("who caught this Pokemon") cannot use the primary key
+db.Index('ix_caught_pokemon_pokemon_id', caught_pokemon_association.c.pokemon_id)
+
+
+# National Pokedex IDs introduced by each generation, inclusive
+GENERATION_RANGES = {
+    1: (1, 151),
+    2: (152, 251),
+    3: (252, 386),
+    4: (387, 493),
+    5: (494, 649),
+    6: (650, 721),
+    7: (722, 809),
+    8: (810, 905),
+    9: (906, 1025),
+}
 
 
 class User(UserMixin, db.Model):
@@ -23,6 +42,10 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(30), nullable=False, unique=True)
     email = db.Column(db.String(100), nullable=False, unique=True)
     password_hash = db.Column(db.String(128), nullable=False)
+    # Size of the caught list, kept in step by catch/release and the bulk paths
+    caught_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every change to the caught list; keys the cached progress breakdowns
+    collection_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationship: A user can have many "caught" Pokemon
     caught_pokemon = db.relationship(
@@ -35,12 +58,157 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f"<User #{self.id}: {self.username}, {self.email}>"
 
+    @classmethod
+    def find_by_identifier(cls, identifier):
+        """
+        The user whose email or username matches ``identifier`` (ignoring
+        case), resolved with one OR query; an email match wins.
+        """
+        key = identifier.strip().lower()
+        email = db.func.lower(cls.email)
+        return (cls.query
+                .filter(db.or_(email == key, db.func.lower(cls.username) == key))
+                .order_by((email == key).desc())
+                .first())
+
+    @classmethod
+    def taken_fields(cls, username, email):
+        """Which of ``{'username', 'email'}`` already belong to an account, in one query."""
+        username, email = username.strip().lower(), email.strip().lower()
+        username_column = db.func.lower(cls.username)
+        email_column = db.func.lower(cls.email)
+        rows = db.session.execute(
+            db.select(username_column, email_column)
+            .where(db.or_(username_column == username, email_column == email))).all()
+        taken = set()
+        for row_username, row_email in rows:
+            if row_username == username:
+                taken.add('username')
+            if row_email == email:
+                taken.add('email')
+        return taken
+
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(
-            password).decode('utf-8')
+        from passwords import hash_password  # Off-thread, at the configured cost
+        from identity import forget_identity
+        self.password_hash = hash_password(password)
+        if self.id is not None:
+            forget_identity(self.id)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        from passwords import verify_password
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """True when the stored hash was made at a different cost than the current policy."""
+        from passwords import needs_rehash
+        return needs_rehash(self.password_hash)
+
+    def has_caught(self, pokemon_id):
+        """Primary-key existence check, without loading the caught list."""
+        caught = caught_pokemon_association.c
+        return db.session.execute(db.select(db.exists().where(
+            caught.user_id == self.id, caught.pokemon_id == pokemon_id))).scalar()
+
+    def collection_counters(self):
+        """``(caught_total, collection_version)``, read fresh with one narrow query."""
+        return tuple(db.session.execute(
+            db.select(User.caught_total, User.collection_version).where(User.id == self.id)).one())
+
+    def catch(self, pokemon_id):
+        """
+        Adds a Pokemon to the caught list with a single idempotent INSERT;
+        the caller commits. Returns False if it was already caught, which
+        also covers a concurrent double-click from another worker.
+        """
+        stmt = upsert_statement(caught_pokemon_association).values(
+            user_id=self.id, pokemon_id=pokemon_id)
+        try:
+            caught = db.session.execute(stmt).rowcount > 0
+        except IntegrityError:  # Backends without ON CONFLICT DO NOTHING
+            db.session.rollback()
+            return False
+        if caught:
+            _adjust_counters(self.id, [pokemon_id], 1)
+        return caught
+
+    def release(self, pokemon_id):
+        """Removes a Pokemon from the caught list with a single DELETE; the caller commits."""
+        caught = caught_pokemon_association.c
+        stmt = db.delete(caught_pokemon_association).where(
+            caught.user_id == self.id, caught.pokemon_id == pokemon_id)
+        released = db.session.execute(stmt).rowcount > 0
+        if released:
+            _adjust_counters(self.id, [pokemon_id], -1)
+        return released
+
+    def catch_matching(self, *criteria):
+        """
+        Catches every Pokemon matching ``criteria`` (filters on ``Pokemon``)
+        that is not caught yet with one INSERT ... SELECT; the caller
+        commits. Returns the newly caught IDs.
+        """
+        caught = caught_pokemon_association.c
+        already_caught = db.select(caught.pokemon_id).where(caught.user_id == self.id)
+        source = db.select(db.literal(self.id), Pokemon.id).where(
+            *criteria, Pokemon.id.not_in(already_caught))
+        stmt = db.insert(caught_pokemon_association).from_select(
+            ['user_id', 'pokemon_id'], source)
+        ids = _changed_ids(stmt, caught.pokemon_id, source.with_only_columns(Pokemon.id))
+        _adjust_counters(self.id, ids, 1)
+        return ids
+
+    def release_matching(self, *criteria):
+        """
+        Releases every caught Pokemon matching ``criteria`` with one
+        DELETE ... WHERE pokemon_id IN (SELECT ...); the caller commits.
+        Returns the released IDs.
+        """
+        caught = caught_pokemon_association.c
+        conditions = [caught.user_id == self.id,
+                      caught.pokemon_id.in_(db.select(Pokemon.id).where(*criteria))]
+        stmt = db.delete(caught_pokemon_association).where(*conditions)
+        ids = _changed_ids(stmt, caught.pokemon_id,
+                           db.select(caught.pokemon_id).where(*conditions))
+        _adjust_counters(self.id, ids, -1)
+        return ids
+
+
+def _changed_ids(stmt, id_column, preview):
+    """
+    Runs an INSERT/DELETE and returns the sorted IDs it touched, using
+    RETURNING where the backend has it and ``preview`` (a SELECT of the
+    same rows, run first in the same transaction) where it does not.
+    """
+    dialect = db.session.get_bind().dialect
+    supported = (dialect.insert_returning if stmt.is_insert else dialect.delete_returning)
+    if supported:
+        ids = db.session.execute(stmt.returning(id_column)).scalars().all()
+    else:
+        ids = db.session.execute(preview).scalars().all()
+        if ids:
+            db.session.execute(stmt)
+    return sorted(ids)
+
+
+def _adjust_counters(user_id, pokemon_ids, delta):
+    """
+    Moves ``catch_count`` of each Pokemon and the user's ``caught_total``
+    by ``delta`` per caught row that changed and bumps the user's
+    ``collection_version``; the caller commits, so the counters land in the
+    same transaction as the rows.
+    """
+    if not pokemon_ids:
+        return
+    pokemon = Pokemon.__table__
+    db.session.execute(
+        db.update(pokemon).where(pokemon.c.id == db.bindparam('changed_id'))
+        .values(catch_count=pokemon.c.catch_count + delta),
+        [{'changed_id': pokemon_id} for pokemon_id in pokemon_ids])
+    users = User.__table__
+    db.session.execute(db.update(users).where(users.c.id == user_id)
+                       .values(caught_total=users.c.caught_total + delta * len(pokemon_ids),
+                               collection_version=users.c.collection_version + 1))
 
 
 class Pokemon(db.Model):
@@ -64,6 +232,8 @@ class Pokemon(db.Model):
     # URL for the default sprite
     sprite_url = db.Column(db.String(255), nullable=True)
     description = db.Column(db.Text, nullable=True)
+    # Users who caught it, kept in step by User.catch/release and the bulk paths
+    catch_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationship: A Pokemon can be "caught" by many users
     caught_by_users = db.relationship(
@@ -75,6 +245,18 @@ class Pokemon(db.Model):
     def __repr__(self):
         return f"<Pokemon #{self.id}: {self.name.capitalize()}>"
 
+    @classmethod
+    def in_generation(cls, generation):
+        """Filter for the Pokemon introduced in a (main series) generation."""
+        first, last = GENERATION_RANGES[generation]
+        return cls.id.between(first, last)
+
+    @classmethod
+    def has_type(cls, type_name):
+        """Filter for Pokemon with ``type_name`` as either type."""
+        type_name = type_name.lower()
+        return db.or_(cls.type1 == type_name, cls.type2 == type_name)
+
     @classmethod
     def get_by_id_or_name(cls, identifier):
         """Gets a Pokemon by its ID or name."""
@@ -83,6 +265,132 @@ class Pokemon(db.Model):
         return cls.query.filter(db.func.lower(cls.name) == identifier.lower()).first()
 
 
+# Columns the app maintains itself rather than loading from PokeAPI or
+# snapshots; imports leave them as they are and the API, snapshots and
+# the Pokemon cache (all per data generation) leave them out
+POKEMON_COUNTERS = ('catch_count',)
+POKEMON_DATA_COLUMNS = [column.name for column in Pokemon.__table__.columns
+                        if column.name not in POKEMON_COUNTERS]
+
+
+# Secondary indexes; existing databases get them from `flask db-upgrade`
+# Usernames and emails are unique regardless of case
+db.Index('ix_users_username_lower', db.func.lower(User.username), unique=True)
+db.Index('ix_users_email_lower', db.func.lower(User.email), unique=True)
+db.Index('ix_pokemon_name_lower', db.func.lower(Pokemon.name))  # Case-insensitive name lookups
+db.Index('ix_pokemon_type1', Pokemon.type1)
+db.Index('ix_pokemon_type2', Pokemon.type2)
+for _stat in ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed'):
+    db.Index(f'ix_pokemon_{_stat}', getattr(Pokemon, _stat))
+
+# Base stat total; queries must use this exact expression to match its indexes
+BASE_STAT_TOTAL = (Pokemon.hp + Pokemon.attack + Pokemon.defense
+                   + Pokemon.sp_attack + Pokemon.sp_defense + Pokemon.speed)
+
+# Filtered and sorted index pages (filters.py): one type plus a sort or range column
+db.Index('ix_pokemon_total', BASE_STAT_TOTAL)
+db.Index('ix_pokemon_height', Pokemon.height)
+db.Index('ix_pokemon_weight', Pokemon.weight)
+db.Index('ix_pokemon_type1_total', Pokemon.type1, BASE_STAT_TOTAL)
+db.Index('ix_pokemon_type2_total', Pokemon.type2, BASE_STAT_TOTAL)
+for _stat in ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed'):
+    db.Index(f'ix_pokemon_type1_{_stat}', Pokemon.type1, getattr(Pokemon, _stat))
+
+# Most caught / rarest rankings; the ID tie-break lets either order walk the index
+db.Index('ix_pokemon_catch_count', Pokemon.catch_count, Pokemon.id)
+
+
+class Sprite(db.Model):
+    """A sprite mirrored into the local content-addressed store (sprites.py)."""
+
+    __tablename__ = 'sprites'
+
+    url = db.Column(db.String(255), primary_key=True)  # Pokemon.sprite_url it mirrors
+    digest = db.Column(db.String(64), nullable=False)  # SHA-256 of the image
+    extension = db.Column(db.String(8), nullable=False)
+    thumbnail_digest = db.Column(db.String(64), nullable=False)  # 96px PNG, for sprite sheets
+
+    def __repr__(self):
+        return f"<Sprite {self.digest[:12]} for {self.url}>"
+
+
+class SpriteSheet(db.Model):
+    """Thumbnails of one page of the Pokedex, side by side in one image."""
+
+    __tablename__ = 'sprite_sheets'
+
+    page = db.Column(db.Integer, primary_key=True)
+    pokemon_ids = db.Column(db.Text, nullable=False)  # Comma-separated, in sheet order
+    digest = db.Column(db.String(64), nullable=False)
+
+    def __repr__(self):
+        return f"<SpriteSheet page {self.page}: {self.digest[:12]}>"
+
+
+# DataVersion names
+POKEMON_DATA = 'pokemon'  # Bumped whenever the Pokemon reference data is (re)loaded
+SPRITE_DATA = 'sprites'  # Bumped when mirrored sprites or sprite sheets change
+
+
+class DataVersion(db.Model):
+    """Generation number per class of cached data, shared by every worker."""
+
+    __tablename__ = 'data_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DataVersion {self.name}: {self.version}>"
+
+    @classmethod
+    def current(cls, name):
+        """Returns the current generation of ``name`` (0 if never bumped)."""
+        version = db.session.execute(
+            db.select(cls.version).where(cls.name == name)).scalar()
+        return version or 0
+
+    @classmethod
+    def bump(cls, name):
+        """
+        Moves ``name`` to a new generation; the caller commits.
+        Generations are time based, so a dropped and re-created database
+        never repeats one that a worker may still have cached.
+        """
+        row = db.session.get(cls, name)
+        if row is None:
+            row = cls(name=name, version=0)
+            db.session.add(row)
+        row.version = max(row.version + 1, time.time_ns())
+        return row.version
+
+
+def upsert_statement(table, update=False, keep=()):
+    """
+    Builds an INSERT for ``table`` that tolerates rows whose primary key
+    already exists: skipped (ON CONFLICT DO NOTHING) or, with ``update``,
+    overwritten except for the ``keep`` columns. Backends without ON
+    CONFLICT get a plain INSERT.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return db.insert(table)
+
+    stmt = insert(table)
+    key_columns = [column.name for column in table.primary_key.columns]
+    if update:
+        return stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column.name: stmt.excluded[column.name]
+                  for column in table.columns
+                  if not column.primary_key and column.name not in keep})
+    return stmt.on_conflict_do_nothing(index_elements=key_columns)
+
+
 def connect_db(app):
     """Connect to the database."""
     db.app = app
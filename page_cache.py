@@ -0,0 +1,219 @@
+import hashlib
+import os
+import tempfile
+import time
+from functools import wraps
+
+from flask import current_app, g, make_response, render_template, request
+from markupsafe import Markup
+
+from cache import LRUCache, data_generation
+from models import POKEMON_DATA, SPRITE_DATA
+
+# Rendered-page cache for public pages.
+#
+# Cacheable views are rendered once per (endpoint, URL arguments, data
+# generations) with the user-specific parts of the page (navbar links,
+# flashed messages, catch/release button) replaced by placeholder
+# comments. Every response, hit or miss, fills the placeholders in for the
+# current user, so anonymous and logged-in visitors share one cached body.
+# Responses carry a strong ETag over the final bytes and answer matching
+# If-None-Match requests with 304 Not Modified.
+
+FRAGMENT_MARKER = '<!--fragment:{}-->'
+DEFAULT_PAGE_CACHE_SIZE = 512
+DEFAULT_PAGE_CACHE_TTL = 300  # Seconds
+
+_fragments = {}
+
+
+def register_fragment(name):
+    """Registers ``func(arg)`` as the renderer of the per-user fragment ``name``."""
+    def decorator(func):
+        _fragments[name] = func
+        return func
+    return decorator
+
+
+@register_fragment('user_nav')
+def render_user_nav(arg):
+    return render_template('_user_nav.html')
+
+
+@register_fragment('flashes')
+def render_flashes(arg):
+    return render_template('_flashes.html')
+
+
+def user_fragment(name, arg=''):
+    """
+    Jinja global: renders a per-user fragment inline, or a placeholder
+    while a cacheable page is being rendered.
+    """
+    if g.get('page_cache_capture'):
+        return Markup(FRAGMENT_MARKER.format(f'{name}:{arg}'))
+    return Markup(_fragments[name](str(arg)))
+
+
+def fill_fragments(body):
+    """Replaces every fragment placeholder in a cached body for the current user."""
+    start_token = '<!--fragment:'
+    if start_token not in body:
+        return body
+    parts = []
+    position = 0
+    while True:
+        start = body.find(start_token, position)
+        if start == -1:
+            break
+        end = body.find('-->', start)
+        name, _, arg = body[start + len(start_token):end].partition(':')
+        parts.append(body[position:start])
+        parts.append(_fragments[name](arg))
+        position = end + 3
+    parts.append(body[position:])
+    return ''.join(parts)
+
+
+class MemoryPageStore:
+    """Per-process LRU of rendered bodies."""
+
+    def __init__(self, maxsize=DEFAULT_PAGE_CACHE_SIZE, ttl=DEFAULT_PAGE_CACHE_TTL):
+        self.entries = LRUCache(maxsize, ttl=ttl, name='pages')
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, body):
+        self.entries.set(key, body)
+
+    def stats(self):
+        return self.entries.stats()
+
+
+class FilePageStore:
+    """
+    Rendered bodies as files in a local directory, shared by every worker
+    on the host. Files older than ``ttl`` are misses; the oldest files are
+    pruned once there are more than ``max_entries``.
+    """
+
+    PRUNE_EVERY = 100  # Writes between directory scans
+
+    def __init__(self, directory, max_entries=DEFAULT_PAGE_CACHE_SIZE, ttl=DEFAULT_PAGE_CACHE_TTL):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}.html')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                raise FileNotFoundError(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                body = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return body
+
+    def set(self, key, body):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+            tmp.write(body)
+        os.replace(tmp_path, self._path(key))
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        paths = [os.path.join(self.directory, name)
+                 for name in os.listdir(self.directory) if name.endswith('.html')]
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def init_app(app):
+    """Installs the ``user_fragment`` template global and the configured page store."""
+    app.jinja_env.globals['user_fragment'] = user_fragment
+    backend = app.config.get('PAGE_CACHE_BACKEND')
+    size = app.config.get('PAGE_CACHE_SIZE', DEFAULT_PAGE_CACHE_SIZE)
+    ttl = app.config.get('PAGE_CACHE_TTL', DEFAULT_PAGE_CACHE_TTL)
+    if backend == 'memory':
+        app.extensions['page_cache'] = MemoryPageStore(size, ttl)
+    elif backend == 'file':
+        directory = os.path.join(
+            app.instance_path, app.config.get('PAGE_CACHE_DIR', 'page_cache'))
+        app.extensions['page_cache'] = FilePageStore(directory, size, ttl)
+    elif backend:
+        raise ValueError(f"Unknown PAGE_CACHE_BACKEND: {backend!r}")
+
+
+def page_key():
+    """Cache key of the current request: endpoint, URL arguments and data generations."""
+    return (request.endpoint,
+            tuple(sorted((request.view_args or {}).items())),
+            tuple(sorted(request.args.items(multi=True))),
+            data_generation(POKEMON_DATA), data_generation(SPRITE_DATA))
+
+
+def conditional_response(html):
+    """Wraps a page in a response with a strong ETag, answering 304 when it matches."""
+    response = make_response(html)
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest()[:32])
+    response.headers['Cache-Control'] = 'no-cache'  # Always revalidate
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+
+def cached_page(view=None, *, unless=None):
+    """
+    Serves a public GET view from the page cache. The view must return the
+    rendered HTML string; anything else (redirects, errors) is not cached.
+    ``unless()`` returning true renders the request uncached, for the
+    variants of a page that depend on the user.
+    """
+    if view is None:
+        return lambda view: cached_page(view, unless=unless)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        store = current_app.extensions.get('page_cache')
+        if request.method not in ('GET', 'HEAD') or (unless is not None and unless()):
+            return view(*args, **kwargs)
+        if store is None:
+            rv = view(*args, **kwargs)
+            return conditional_response(rv) if isinstance(rv, str) else rv
+
+        key = page_key()
+        body = store.get(key)
+        if body is None:
+            g.page_cache_capture = True
+            try:
+                rv = view(*args, **kwargs)
+            finally:
+                g.page_cache_capture = False
+            if not isinstance(rv, str):
+                return rv
+            body = rv
+            store.set(key, body)
+        return conditional_response(fill_fragments(body))
+    return wrapper
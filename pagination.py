@@ -0,0 +1,185 @@
+from math import ceil
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from cache import LRUCache
+from models import db
+
+# Page numbers up to this are linked and served with OFFSET; deeper pages
+# are reached with opaque cursors that seek on the key column instead.
+DEFAULT_PAGE_LINK_LIMIT = 10
+DEFAULT_COUNT_CACHE_TTL = 60  # Seconds a cached total may lag other workers
+
+count_cache = LRUCache(maxsize=4096, name='counts')
+
+
+def cached_count(key, query):
+    """
+    ``query.count()`` memoized under ``key`` for COUNT_CACHE_TTL seconds;
+    ``query`` may also be a function returning the count.
+    Keys should include whatever generation invalidates them.
+    """
+    ttl = current_app.config.get('COUNT_CACHE_TTL', DEFAULT_COUNT_CACHE_TTL)
+    return count_cache.get_or_set(key, getattr(query, 'count', query), ttl=ttl)
+
+
+def _cursor_serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='pokedex-cursor')
+
+
+def encode_cursor(key, direction, page):
+    """Opaque, signed token for the page after (``next``) or before (``prev``) ``key``."""
+    return _cursor_serializer().dumps([key, direction, page])
+
+
+def decode_cursor(token):
+    """Returns ``(key, direction, page)`` or None for a missing or tampered token."""
+    if not token:
+        return None
+    try:
+        key, direction, page = _cursor_serializer().loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(key, int) or not isinstance(page, int):
+        return None
+    return key, direction, page
+
+
+class KeysetPagination:
+    """
+    Paginates a query ordered by a unique key column.
+
+    Shallow pages (up to ``page_link_limit``; larger numbers are clamped)
+    are addressed by number and fetched with OFFSET; past that, navigation
+    switches to cursor tokens that seek with ``key > last`` /
+    ``key < first``, so deep pages cost the same as the first one. ``has_next`` comes from fetching one extra row,
+    and ``total`` is supplied by the caller (usually a cached count).
+    Exposes the same attributes the templates use on Flask-SQLAlchemy's
+    ``Pagination``, plus ``prev_args()``/``next_args()`` for building links.
+    """
+
+    def __init__(self, query, key_column, per_page, page=1, cursor=None, total=None,
+                 page_link_limit=None):
+        self.per_page = per_page
+        self.total = total
+        self.page_link_limit = page_link_limit or current_app.config.get(
+            'KEYSET_PAGE_LINK_LIMIT', DEFAULT_PAGE_LINK_LIMIT)
+        self.key_column = key_column
+
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            self.cursor_mode = False
+            # Deeper page numbers would mean deep OFFSET scans; past the
+            # limit the only way on is the cursor from the last linked page
+            self.page = min(max(page or 1, 1), self.page_link_limit)
+            rows = (query.order_by(key_column)
+                    .offset((self.page - 1) * per_page)
+                    .limit(per_page + 1).all())
+            self.has_prev = self.page > 1
+            self.has_next = len(rows) > per_page
+            self.items = rows[:per_page]
+        else:
+            key, direction, self.page = decoded
+            self.cursor_mode = True
+            if direction == 'next':
+                rows = (query.filter(key_column > key).order_by(key_column)
+                        .limit(per_page + 1).all())
+                self.has_prev = True
+                self.has_next = len(rows) > per_page
+                self.items = rows[:per_page]
+            else:
+                rows = (query.filter(key_column < key).order_by(key_column.desc())
+                        .limit(per_page + 1).all())
+                self.has_prev = len(rows) > per_page
+                self.has_next = True
+                self.items = list(reversed(rows[:per_page]))
+            if not self.has_prev:
+                self.page = 1
+
+    def __iter__(self):
+        return iter(self.items)
+
+    @property
+    def pages(self):
+        if not self.total or not self.per_page:
+            return 0
+        return ceil(self.total / self.per_page)
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def _key_of(self, item):
+        return getattr(item, self.key_column.key)
+
+    def prev_args(self):
+        """URL arguments for the previous page."""
+        if not self.cursor_mode or self.page - 1 <= 1:
+            return {'page': self.page - 1}
+        return {'cursor': encode_cursor(self._key_of(self.items[0]), 'prev', self.page - 1)}
+
+    def next_args(self):
+        """URL arguments for the next page; a cursor once past the page link limit."""
+        if not self.cursor_mode and self.page + 1 <= self.page_link_limit:
+            return {'page': self.page + 1}
+        return {'cursor': encode_cursor(self._key_of(self.items[-1]), 'next', self.page + 1)}
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        """
+        Page numbers to link, like ``Pagination.iter_pages`` but only up to
+        the page link limit; ``None`` marks a gap (including the pages
+        beyond the limit, reachable with Next).
+        """
+        last = min(self.pages, self.page_link_limit)
+        pages_end = last + 1
+        if pages_end == 1:
+            return
+        current = min(self.page, last)
+        left_end = min(1 + left_edge, pages_end)
+        yield from range(1, left_end)
+        if left_end < pages_end:
+            mid_start = max(left_end, current - left_current)
+            mid_end = min(current + right_current + 1, pages_end)
+            if mid_start - left_end > 0:
+                yield None
+            yield from range(mid_start, mid_end)
+            if mid_end < pages_end:
+                right_start = max(mid_end, pages_end - right_edge)
+                if right_start - mid_end > 0:
+                    yield None
+                yield from range(right_start, pages_end)
+        if self.pages > last:
+            yield None
+
+
+class StatementPagination(KeysetPagination):
+    """
+    OFFSET pages of a SELECT with bound parameters, for orders that have no
+    unique key column to seek on (e.g. sorted by a stat). ``has_next``
+    comes from one extra row; ``total`` is supplied by the caller and may
+    be None, in which case only Previous/Next are linked.
+    """
+
+    def __init__(self, stmt, params, per_page, page=1, total=None, page_link_limit=None):
+        self.per_page = per_page
+        self.total = total
+        self.page_link_limit = page_link_limit or current_app.config.get(
+            'KEYSET_PAGE_LINK_LIMIT', DEFAULT_PAGE_LINK_LIMIT)
+        self.cursor_mode = False
+        self.page = max(page or 1, 1)
+        rows = db.session.scalars(
+            stmt.offset((self.page - 1) * per_page).limit(per_page + 1), params).all()
+        self.has_prev = self.page > 1
+        self.has_next = len(rows) > per_page
+        self.items = rows[:per_page]
+
+    def prev_args(self):
+        return {'page': self.page - 1}
+
+    def next_args(self):
+        return {'page': self.page + 1}
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g, has_app_context, has_request_context
+
+from models import bcrypt
+
+# Password hashing policy.
+#
+# bcrypt is deliberately slow, so hashes are computed on a small, bounded
+# thread pool (bcrypt releases the GIL) instead of on the request thread.
+# At most PASSWORD_HASH_WORKERS hashes run at once and PASSWORD_HASH_QUEUE
+# more may wait; a login that cannot get a slot within PASSWORD_HASH_WAIT
+# seconds is turned away with PasswordHasherBusy rather than piling up
+# behind the others while page views starve. The cost factor comes from
+# BCRYPT_LOG_ROUNDS, and hashes made at another cost are upgraded the next
+# time their owner logs in.
+
+DEFAULT_ROUNDS = 12
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE = 16
+DEFAULT_WAIT = 5.0  # Seconds
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Every hashing slot is taken; the caller should ask the client to retry."""
+
+
+class PasswordHasher:
+    """Bounded, admission-controlled bcrypt worker pool with timing counters."""
+
+    def __init__(self, rounds=DEFAULT_ROUNDS, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE,
+                 wait=DEFAULT_WAIT):
+        self.rounds = rounds
+        self.wait = wait
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(rounds=config.get('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS),
+                   workers=config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS),
+                   queue_size=config.get('PASSWORD_HASH_QUEUE', DEFAULT_QUEUE),
+                   wait=config.get('PASSWORD_HASH_WAIT', DEFAULT_WAIT))
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - start
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.wait):
+            with self._lock:
+                self.rejected += 1
+            if has_request_context():
+                g.password_hash_seconds = g.get('password_hash_seconds', 0.0)  # Reported by instrumentation
+            raise PasswordHasherBusy("Too many password checks in progress.")
+        try:
+            result, elapsed = self._executor.submit(self._timed, func, *args).result()
+        finally:
+            self._slots.release()
+        with self._lock:
+            self.count += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+        if has_request_context():
+            g.password_hash_seconds = g.get('password_hash_seconds', 0.0) + elapsed
+        return result
+
+    def hash(self, password):
+        return self._run(bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def verify(self, password_hash, password):
+        return self._run(bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a bcrypt hash (``$2b$<cost>$...``) was made at another cost."""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {'count': self.count, 'rejected': self.rejected,
+                    'total_ms': round(self.total_seconds * 1000, 1),
+                    'mean_ms': round(self.total_seconds * 1000 / self.count, 1) if self.count else 0.0,
+                    'max_ms': round(self.max_seconds * 1000, 1)}
+
+
+_default_hasher = None
+
+
+def init_app(app):
+    app.extensions['password_hasher'] = PasswordHasher.from_config(app.config)
+
+
+def get_hasher():
+    """The current app's hasher (a default-policy one outside an app)."""
+    global _default_hasher
+    if has_app_context() and 'password_hasher' in current_app.extensions:
+        return current_app.extensions['password_hasher']
+    if _default_hasher is None:
+        _default_hasher = PasswordHasher()
+    return _default_hasher
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(password_hash, password):
+    return get_hasher().verify(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    return get_hasher().needs_rehash(password_hash)
+
+
+def password_stats():
+    """Hashing time and admission counters of this worker."""
+    return get_hasher().stats()
@@ -0,0 +1,48 @@
+from models import db, Pokemon, User, caught_pokemon_association
+
+# Catch counters and popularity rankings.
+#
+# ``Pokemon.catch_count`` and ``User.caught_total`` are denormalized from
+# ``caught_pokemon`` and moved by every catch and release in the same
+# transaction (models._adjust_counters), so rankings and collection sizes
+# are index reads instead of COUNT(*) ... GROUP BY over every caught row.
+# ``recount()`` rebuilds both from scratch, for ``flask recount`` and for
+# databases that predate the counters.
+
+ORDERS = {'most': 'Most Caught', 'rarest': 'Rarest'}
+DEFAULT_RANKING_SIZE = 20
+
+
+def ranking(order='most', n=DEFAULT_RANKING_SIZE):
+    """
+    The ``n`` most (or with ``order='rarest'`` least) caught Pokemon as
+    ``[(Pokemon, catch_count)]``, read straight off ix_pokemon_catch_count.
+    """
+    if order == 'rarest':
+        sort = (Pokemon.catch_count, Pokemon.id)
+    else:
+        sort = (Pokemon.catch_count.desc(), Pokemon.id.desc())
+    pokemon = db.session.scalars(db.select(Pokemon).order_by(*sort).limit(n)).all()
+    return [(p, p.catch_count) for p in pokemon]
+
+
+def recount():
+    """
+    Rewrites every catch counter that disagrees with ``caught_pokemon``;
+    the caller commits. Returns how many Pokemon and users were corrected.
+    """
+    caught = caught_pokemon_association.c
+    pokemon = Pokemon.__table__
+    actual = (db.select(db.func.count()).select_from(caught_pokemon_association)
+              .where(caught.pokemon_id == pokemon.c.id).scalar_subquery())
+    fixed_pokemon = db.session.execute(
+        db.update(pokemon).where(pokemon.c.catch_count != actual)
+        .values(catch_count=actual)).rowcount
+
+    users = User.__table__
+    actual = (db.select(db.func.count()).select_from(caught_pokemon_association)
+              .where(caught.user_id == users.c.id).scalar_subquery())
+    fixed_users = db.session.execute(
+        db.update(users).where(users.c.caught_total != actual)
+        .values(caught_total=actual)).rowcount
+    return fixed_pokemon, fixed_users
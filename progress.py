@@ -0,0 +1,88 @@
+from collections import namedtuple
+
+import numpy as np
+
+from analytics import stat_table
+from cache import LRUCache, data_generation
+from models import db, Pokemon, POKEMON_DATA, GENERATION_RANGES, caught_pokemon_association
+
+# Per-user collection progress.
+#
+# How much of each type and each generation a trainer has caught. The dex
+# side (how many Pokemon of each type / generation exist) is derived from
+# ``stat_table()`` and memoized on it, so it is computed once per data
+# generation. The trainer side is one grouped query over their caught rows:
+# caught Pokemon collapse into (type1, type2, generation) groups, which are
+# folded into both breakdowns in Python. Results are cached per
+# ``User.collection_version``, which every catch and release bumps in the
+# same transaction (models._adjust_counters), so a cached breakdown is never
+# stale and no worker has to be told to drop one.
+
+DEFAULT_CACHE_SIZE = 1024
+
+progress_cache = LRUCache(DEFAULT_CACHE_SIZE, name='progress')
+
+# One row of a breakdown; ``key`` is a type name or a generation number
+Progress = namedtuple('Progress', 'key caught total percent')
+CollectionProgress = namedtuple('CollectionProgress', 'by_type by_generation')
+
+
+def generation_of():
+    """SQL expression bucketing ``Pokemon.id`` into its generation (NULL outside every range)."""
+    return db.case(*((Pokemon.id.between(first, last), generation)
+                     for generation, (first, last) in GENERATION_RANGES.items()))
+
+
+def dex_totals():
+    """``({type: count}, {generation: count})`` over the whole dex; dual types count under both."""
+    table = stat_table()
+
+    def compute():
+        by_type = {type_name: int(np.count_nonzero(table.type_mask(type_name)))
+                   for type_name in table.types()}
+        starts = np.array([first for first, _ in GENERATION_RANGES.values()])
+        ends = np.array([last for _, last in GENERATION_RANGES.values()])
+        slot = np.searchsorted(starts, table.ids, side='right') - 1
+        inside = (slot >= 0) & (table.ids <= ends[np.maximum(slot, 0)])
+        counts = np.bincount(slot[inside], minlength=len(starts))
+        by_generation = dict(zip(GENERATION_RANGES, (int(c) for c in counts)))
+        return by_type, by_generation
+    return table.memoized('progress_totals', compute)
+
+
+def caught_counts(user_id):
+    """``({type: caught}, {generation: caught})`` for one user, from a single grouped query."""
+    generation = generation_of()
+    rows = db.session.execute(
+        db.select(Pokemon.type1, Pokemon.type2, generation, db.func.count())
+        .join(caught_pokemon_association, caught_pokemon_association.c.pokemon_id == Pokemon.id)
+        .where(caught_pokemon_association.c.user_id == user_id)
+        .group_by(Pokemon.type1, Pokemon.type2, generation)).all()
+    by_type, by_generation = {}, {}
+    for type1, type2, gen, count in rows:
+        for type_name in {type1, type2} - {None, ''}:
+            by_type[type_name] = by_type.get(type_name, 0) + count
+        if gen is not None:
+            by_generation[gen] = by_generation.get(gen, 0) + count
+    return by_type, by_generation
+
+
+def _breakdown(totals, caught):
+    return [Progress(key, caught.get(key, 0), total,
+                     round(caught.get(key, 0) / total * 100, 1) if total else 0.0)
+            for key, total in totals.items()]
+
+
+def collection_progress(user_id, version):
+    """
+    The ``CollectionProgress`` of ``user_id`` at ``collection_version``
+    ``version``, computed on the first request after a catch or release.
+    """
+    key = (user_id, version, data_generation(POKEMON_DATA))
+
+    def compute():
+        type_totals, generation_totals = dex_totals()
+        caught_types, caught_generations = caught_counts(user_id)
+        return CollectionProgress(_breakdown(type_totals, caught_types),
+                                  _breakdown(generation_totals, caught_generations))
+    return progress_cache.get_or_set(key, compute)
@@ -0,0 +1,251 @@
+import hashlib
+import json
+from functools import wraps
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_login import current_user
+
+from models import db, Pokemon, POKEMON_DATA, POKEMON_DATA_COLUMNS, GENERATION_RANGES
+from cache import data_generation, pokemon_cache
+from filters import FilterSpec, FilterError, compile_filter
+
+api_bp = Blueprint('api', __name__)
+
+MAX_BATCH = 1000  # IDs or names per lookup, well under SQLite's bound-parameter limit
+STREAM_THRESHOLD = 200  # Larger results are streamed instead of built in memory
+STREAM_CHUNK_SIZE = 500  # Rows fetched per round trip while streaming
+
+POKEMON_FIELDS = POKEMON_DATA_COLUMNS  # ETags follow the data generation, which catches do not bump
+
+
+class APIError(Exception):
+    """A client error reported as a JSON body."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api_bp.errorhandler(APIError)
+def handle_api_error(error):
+    return jsonify(error=error.message), error.status
+
+
+def api_login_required(view):
+    """Like ``login_required``, but answers 401 JSON instead of redirecting to the login page."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            raise APIError("Authentication required.", 401)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def parse_list(arg):
+    """Splits a comma-separated query argument, dropping blanks and duplicates."""
+    values = []
+    for value in (request.args.get(arg) or '').split(','):
+        value = value.strip()
+        if value and value not in values:
+            values.append(value)
+    if len(values) > MAX_BATCH:
+        raise APIError(f"At most {MAX_BATCH} {arg} per request.")
+    return values
+
+
+def parse_fields():
+    fields = parse_list('fields') or POKEMON_FIELDS
+    unknown = [field for field in fields if field not in POKEMON_FIELDS]
+    if unknown:
+        raise APIError(f"Unknown fields: {', '.join(unknown)}. "
+                       f"Choose from: {', '.join(POKEMON_FIELDS)}.")
+    if 'id' not in fields:
+        fields = ['id'] + fields
+    return fields
+
+
+def etag_for(*parts):
+    """Strong ETag of a lookup: the same arguments in the same data generation give the same body."""
+    key = json.dumps([data_generation(POKEMON_DATA)] + list(parts))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def not_modified_or(etag, build_response):
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = build_response()
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def stream_results(rows, columns, fields, requested, key_field):
+    """Yields a ``{"results": [...], "count": n, "missing": [...]}`` document chunk by chunk."""
+    normalize = str.lower if key_field == 'name' else (lambda value: value)
+    found = set()
+    count = 0
+    yield '{"results":['
+    for row in rows:
+        record = dict(zip(columns, row))
+        found.add(normalize(record[key_field]))
+        yield (',' if count else '') + json.dumps(
+            {field: record[field] for field in fields}, ensure_ascii=False)
+        count += 1
+    missing = [value for value in requested if normalize(value) not in found]
+    yield '],"count":' + str(count) + ',"missing":' + json.dumps(missing) + '}'
+
+
+@api_bp.route('/pokemon')
+def pokemon_batch():
+    """
+    Batch lookup: ``?ids=1,4,7`` or ``?names=pikachu,eevee`` (or neither for
+    the whole dex), with ``?fields=id,name,...`` to choose the columns.
+    Resolved with one ``IN`` query that selects only the requested columns.
+    Without ids or names, the filter and sort arguments of the index page
+    (``?filter=speed>=100&type=fire&sort=-total``) select the rows.
+    """
+    fields = parse_fields()
+    names = parse_list('names')
+    try:
+        ids = [int(value) for value in parse_list('ids')]
+    except ValueError:
+        raise APIError("ids must be integers.")
+    if ids and names:
+        raise APIError("Use either ids or names, not both.")
+    try:
+        spec = FilterSpec.parse(request.args)
+    except FilterError as e:
+        raise APIError(str(e))
+    if spec and (ids or names):
+        raise APIError("Filters and sorting apply to the whole dex, not to ids or names.")
+    if spec:
+        return filtered_batch(spec, fields)
+
+    table = Pokemon.__table__
+    columns = list(fields)
+    if names:
+        requested, key_field = names, 'name'
+        if 'name' not in columns:
+            columns.append('name')  # Needed to report which names were missing
+    else:
+        requested, key_field = ids, 'id'
+    stmt = db.select(*[table.c[column] for column in columns]).order_by(table.c.id)
+    if ids:
+        stmt = stmt.where(table.c.id.in_(ids))
+    elif names:
+        stmt = stmt.where(db.func.lower(table.c.name).in_([name.lower() for name in names]))
+
+    def build_response():
+        # The whole dex and large batches are streamed in chunks straight
+        # from the cursor; small batches get a plain response.
+        if not requested or len(requested) > STREAM_THRESHOLD:
+            rows = db.session.execute(stmt.execution_options(yield_per=STREAM_CHUNK_SIZE))
+            chunks = stream_results(rows, columns, fields, requested, key_field)
+            return Response(stream_with_context(chunks), mimetype='application/json')
+        rows = db.session.execute(stmt).all()
+        body = ''.join(stream_results(rows, columns, fields, requested, key_field))
+        return Response(body, mimetype='application/json')
+
+    return not_modified_or(etag_for(fields, key_field, requested), build_response)
+
+
+def filtered_batch(spec, fields):
+    """Streams the requested columns of every Pokemon matching ``spec``, in its order."""
+    if spec.caught is not None and not current_user.is_authenticated:
+        raise APIError("Authentication required for caught filters.", 401)
+    stmt, _ = compile_filter(spec, fields)
+    params = spec.params(current_user.id if spec.caught is not None else None)
+
+    def build_response():
+        rows = db.session.execute(stmt.execution_options(yield_per=STREAM_CHUNK_SIZE), params)
+        chunks = stream_results(rows, fields, fields, [], 'id')
+        return Response(stream_with_context(chunks), mimetype='application/json')
+
+    if spec.caught is not None:  # Changes with the user's collection, not the data generation
+        response = build_response()
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return not_modified_or(etag_for(fields, 'filter', spec.to_args()), build_response)
+
+
+@api_bp.route('/pokemon/<identifier>')
+def pokemon_single(identifier):
+    """One Pokemon by ID or name, served from the reference data cache."""
+    fields = parse_fields()
+    etag = etag_for(fields, 'single', identifier.lower())
+
+    def build_response():
+        pokemon = pokemon_cache.get_by_id_or_name(identifier)
+        if pokemon is None:
+            raise APIError(f"No Pokemon matches {identifier!r}.", 404)
+        return jsonify({field: getattr(pokemon, field) for field in fields})
+
+    return not_modified_or(etag, build_response)
+
+
+def selector_criteria(selector, action):
+    """
+    Turns a collection selector such as ``{"ids": [1, 4]}``,
+    ``{"generation": 1}``, ``{"type": "fire"}`` or ``{"all": true}`` into
+    ``Pokemon`` filters. Keys are combined with AND, so
+    ``{"generation": 1, "type": "fire"}`` means the Fire types of
+    generation 1.
+    """
+    if not isinstance(selector, dict) or not selector:
+        raise APIError(f"{action} must be an object with ids, generation, type or all.")
+    unknown = set(selector) - {'ids', 'generation', 'type', 'all'}
+    if unknown:
+        raise APIError(f"Unknown {action} keys: {', '.join(sorted(unknown))}.")
+
+    criteria = []
+    if 'ids' in selector:
+        ids = selector['ids']
+        if (not isinstance(ids, list) or len(ids) > MAX_BATCH
+                or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+            raise APIError(f"{action}.ids must be a list of at most {MAX_BATCH} integers.")
+        criteria.append(Pokemon.id.in_(ids))
+    if 'generation' in selector:
+        generation = selector['generation']
+        if (not isinstance(generation, int) or isinstance(generation, bool)
+                or generation not in GENERATION_RANGES):
+            raise APIError(f"{action}.generation must be one of "
+                           f"{', '.join(str(g) for g in GENERATION_RANGES)}.")
+        criteria.append(Pokemon.in_generation(generation))
+    if 'type' in selector:
+        if not isinstance(selector['type'], str) or not selector['type']:
+            raise APIError(f"{action}.type must be a type name.")
+        criteria.append(Pokemon.has_type(selector['type']))
+    if 'all' in selector and selector['all'] is not True:
+        raise APIError(f"{action}.all must be true.")
+    return criteria
+
+
+@api_bp.route('/collection', methods=['POST'])
+@api_login_required
+def update_collection():
+    """
+    Applies bulk catches and releases to the current user's collection in
+    one transaction, e.g. ``{"catch": {"generation": 1}, "release": {"ids": [25]}}``.
+    Each side is a single set-based statement; releases run after catches.
+    Returns the IDs that actually changed and the new collection size.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not payload.keys() & {'catch', 'release'}:
+        raise APIError("Send a JSON object with catch and/or release selectors.")
+    unknown = set(payload) - {'catch', 'release'}
+    if unknown:
+        raise APIError(f"Unknown keys: {', '.join(sorted(unknown))}.")
+    catch_criteria = (selector_criteria(payload['catch'], 'catch')
+                      if 'catch' in payload else None)
+    release_criteria = (selector_criteria(payload['release'], 'release')
+                        if 'release' in payload else None)
+
+    caught, released = [], []
+    if catch_criteria is not None:
+        caught = current_user.catch_matching(*catch_criteria)
+    if release_criteria is not None:
+        released = current_user.release_matching(*release_criteria)
+    db.session.commit()
+    return jsonify(caught=caught, released=released, total=current_user.caught_total)
@@ -1,69 +1,121 @@
-from flask import Blueprint, render_template, abort, request, redirect, url_for, flash
+from flask import Blueprint, render_template, abort, request, redirect, url_for, flash, current_app
 from flask_login import current_user, login_required
 from sqlalchemy import or_
 
 # Assuming User model for profile, caught_pokemon_association
-from models import db, Pokemon, User
+from models import db, Pokemon, User, POKEMON_DATA
 from forms import SearchForm  # We made this global, but can also instantiate here
+from search import search_pokemon
+from cache import data_generation, pokemon_cache
+from pagination import KeysetPagination, StatementPagination, cached_count
+from filters import FilterSpec, FilterError, SORT_FIELDS, compile_filter
+from typechart import TYPES
+from page_cache import cached_page, register_fragment
+from analytics import stat_table
+from streaming import stream_page, stream_rows, streaming_requested
+from progress import collection_progress
 
 main_bp = Blueprint('main', __name__)
 
 POKEMON_PER_PAGE = 20  # For pagination
 
 
+def filtered_pokemon(spec, page):
+    """A page of the Pokemon matching ``spec``; totals are cached unless they depend on the user."""
+    stmt, count = compile_filter(spec)
+    params = spec.params(current_user.id if current_user.is_authenticated else None)
+    if spec.caught is None:
+        total = cached_count(('filter', data_generation(POKEMON_DATA), spec.key()),
+                             lambda: db.session.scalar(count, params))
+    else:
+        total = db.session.scalar(count, params)
+    return StatementPagination(stmt, params, POKEMON_PER_PAGE, page=page, total=total)
+
+
 @main_bp.route('/')
 @main_bp.route('/index')
+# Caught filters are per user; streamed pages are never buffered
+@cached_page(unless=lambda: bool(request.args.get('caught')) or streaming_requested())
 def index():
-    # --- ADD THIS DEBUG PRINT ---
-    if current_user.is_authenticated:
-        print(
-            f"--- DEBUG: main.index - current_user: {current_user.username}, is_authenticated: {current_user.is_authenticated} ---")
-    else:
-        print(
-            f"--- DEBUG: main.index - current_user: Anonymous, is_authenticated: {current_user.is_authenticated} ---")
-    # --- END DEBUG PRINT ---
-
     page = request.args.get('page', 1, type=int)
     search_term = request.args.get('search_term', '').strip()
-    query = Pokemon.query
-
-    if search_term:
-        # Search by name or ID (if numeric)
-        if search_term.isdigit():
-            query = query.filter(Pokemon.id == int(search_term))
+    filter_error = None
+    try:
+        spec = FilterSpec.parse(request.args)
+    except FilterError as e:
+        filter_error, spec = str(e), FilterSpec()
+    if spec.caught is not None and not current_user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+
+    if streaming_requested() and not search_term:
+        # Every match, rendered while the rows are read from the cursor
+        if spec:
+            stmt, _ = compile_filter(spec)
+            params = spec.params(current_user.id if current_user.is_authenticated else None)
         else:
-            query = query.filter(Pokemon.name.ilike(f'%{search_term}%'))
+            stmt, params = db.select(Pokemon).order_by(Pokemon.id), None
+        return stream_page('index.html', title='Pokedex Home', pokemons=stream_rows(stmt, params),
+                           search_term='', spec=spec, filter_args=spec.to_args(),
+                           form_args=spec.form_args(),
+                           filter_error=filter_error, sort_fields=SORT_FIELDS, types=TYPES)
+
+    if search_term and not search_term.isdigit():
+        # Full-text search by name or description, ranked by relevance
+        all_pokemon = search_pokemon(
+            search_term, page=page, per_page=POKEMON_PER_PAGE)
+    elif search_term:
+        # Search by ID
+        all_pokemon = Pokemon.query.filter(Pokemon.id == int(search_term)).paginate(
+            page=page, per_page=POKEMON_PER_PAGE, error_out=False)
+    elif spec:
+        # Filtered and/or sorted: one compiled statement, OFFSET pages
+        all_pokemon = filtered_pokemon(spec, page)
+    else:
+        # Pokedex order; deep pages seek by ID and the total is cached per data generation
+        all_pokemon = KeysetPagination(
+            Pokemon.query, Pokemon.id, POKEMON_PER_PAGE, page=page,
+            cursor=request.args.get('cursor'),
+            total=cached_count(('pokemon', data_generation(POKEMON_DATA)), Pokemon.query))
+
+    return render_template('index.html', title='Pokedex Home', pokemons=all_pokemon, search_term=search_term,
+                           spec=spec, filter_args=spec.to_args(), form_args=spec.form_args(),
+                           filter_error=filter_error, sort_fields=SORT_FIELDS, types=TYPES,
+                           show_all=current_app.config.get('STREAM_LISTINGS', False))
+
+
+@register_fragment('catch_button')
+def render_catch_button(pokemon_id):
+    """Catch/release button of the detail page, rendered per user outside the page cache."""
+    pokemon_id = int(pokemon_id)
+    is_caught = False
+    if current_user.is_authenticated:
+        # Check if the current user has caught this Pokemon (indexed lookup)
+        is_caught = current_user.has_caught(pokemon_id)
+    return render_template('_catch_button.html', pokemon_id=pokemon_id, is_caught=is_caught)
 
-    # Order by ID for consistent Pokedex order
-    all_pokemon = query.order_by(Pokemon.id).paginate(
-        page=page, per_page=POKEMON_PER_PAGE, error_out=False)
 
-    return render_template('index.html', title='Pokedex Home', pokemons=all_pokemon, search_term=search_term)
+def render_pokemon_detail(pokemon):
+    # Percentile ranks come from the cached stat table, not another query
+    return render_template('pokemon_detail.html', title=pokemon.name.capitalize(), pokemon=pokemon,
+                           ranks=stat_table().percentile_ranks(pokemon.id))
 
 
 @main_bp.route('/pokemon/<int:pokemon_id>')
+@cached_page
 def pokemon_detail(pokemon_id):
-    pokemon = Pokemon.query.get_or_404(pokemon_id)
-    is_caught = False
-    if current_user.is_authenticated:
-        # Check if the current user has caught this Pokemon
-        # Accessing caught_pokemon directly on user object
-        is_caught = current_user.caught_pokemon.filter(
-            Pokemon.id == pokemon_id).first() is not None
-
-    return render_template('pokemon_detail.html', title=pokemon.name.capitalize(), pokemon=pokemon, is_caught=is_caught)
+    pokemon = pokemon_cache.get(pokemon_id)
+    if pokemon is None:
+        abort(404)
+    return render_pokemon_detail(pokemon)
 
 
 @main_bp.route('/pokemon/<string:pokemon_name>')
+@cached_page
 def pokemon_detail_by_name(pokemon_name):
-    pokemon = Pokemon.query.filter(db.func.lower(
-        Pokemon.name) == pokemon_name.lower()).first_or_404()
-    is_caught = False
-    if current_user.is_authenticated:
-        is_caught = current_user.caught_pokemon.filter(
-            Pokemon.id == pokemon.id).first() is not None
-
-    return render_template('pokemon_detail.html', title=pokemon.name.capitalize(), pokemon=pokemon, is_caught=is_caught)
+    pokemon = pokemon_cache.get_by_name(pokemon_name)
+    if pokemon is None:
+        abort(404)
+    return render_pokemon_detail(pokemon)
 
 
 # Could also be POST if form is more complex
@@ -80,20 +132,32 @@ def search_pokemon_route():
 @main_bp.route('/profile')
 @login_required
 def profile():
-    user = User.query.get_or_404(current_user.id)
-    # caught_pokemon is a dynamic relationship, so we can paginate it
+    user = current_user  # Identity snapshot; no users query needed
+    # caught_pokemon is a query, so we can paginate it
     page = request.args.get('page', 1, type=int)
-    caught_list = user.caught_pokemon.order_by(Pokemon.id).paginate(
-        page=page, per_page=POKEMON_PER_PAGE, error_out=False)
-    return render_template('profile.html', title=f"{user.username}'s Profile", user=user, caught_list=caught_list)
+    # Both kept by catch/release: no COUNT(*) of the caught list, and the
+    # progress breakdown is recomputed only after the collection changes
+    total, version = user.collection_counters()
+    progress = collection_progress(user.id, version)
+    if streaming_requested():
+        return stream_page('profile.html', title=f"{user.username}'s Profile", user=user,
+                           caught_list=stream_rows(user.caught_pokemon.order_by(Pokemon.id).statement),
+                           caught_total=total, progress=progress)
+    caught_list = KeysetPagination(
+        user.caught_pokemon, Pokemon.id, POKEMON_PER_PAGE, page=page,
+        cursor=request.args.get('cursor'), total=total)
+    return render_template('profile.html', title=f"{user.username}'s Profile", user=user,
+                           caught_list=caught_list, caught_total=total, progress=progress,
+                           show_all=current_app.config.get('STREAM_LISTINGS', False))
 
 
 @main_bp.route('/pokemon/<int:pokemon_id>/catch', methods=['POST'])
 @login_required
 def catch_pokemon(pokemon_id):
-    pokemon = Pokemon.query.get_or_404(pokemon_id)
-    if pokemon not in current_user.caught_pokemon:
-        current_user.caught_pokemon.append(pokemon)
+    pokemon = pokemon_cache.get(pokemon_id)
+    if pokemon is None:
+        abort(404)
+    if current_user.catch(pokemon_id):
         db.session.commit()
         flash(f'You caught {pokemon.name.capitalize()}!', 'success')
     else:
@@ -105,9 +169,10 @@ def catch_pokemon(pokemon_id):
 @main_bp.route('/pokemon/<int:pokemon_id>/release', methods=['POST'])
 @login_required
 def release_pokemon(pokemon_id):
-    pokemon = Pokemon.query.get_or_404(pokemon_id)
-    if pokemon in current_user.caught_pokemon:
-        current_user.caught_pokemon.remove(pokemon)
+    pokemon = pokemon_cache.get(pokemon_id)
+    if pokemon is None:
+        abort(404)
+    if current_user.release(pokemon_id):
         db.session.commit()
         flash(f'You released {pokemon.name.capitalize()}.', 'success')
     else:
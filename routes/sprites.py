@@ -0,0 +1,20 @@
+from flask import Blueprint, abort, current_app, send_from_directory
+
+from sprites import SpriteStore, DIGEST, FORMATS
+
+sprites_bp = Blueprint('sprites', __name__)
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # Seconds; a digest's bytes never change
+
+
+@sprites_bp.route('/<digest>.<extension>')
+def sprite(digest, extension):
+    """A mirrored sprite, thumbnail or sprite sheet by content hash."""
+    if not DIGEST.match(digest) or extension not in FORMATS.values():
+        abort(404)
+    store = SpriteStore.from_config(current_app.config, current_app.instance_path)
+    response = send_from_directory(store.directory, store.relative_path(digest, extension),
+                                   max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,82 @@
+from flask import Blueprint, render_template, abort, request
+from flask_login import current_user, login_required
+
+from analytics import stat_table, MEASURES, MEASURE_LABELS, STATS, DEFAULT_LEADERBOARD_SIZE
+from models import db, caught_pokemon_association
+from page_cache import cached_page
+from popularity import ranking, ORDERS, DEFAULT_RANKING_SIZE
+from typechart import analyze_team, resolve, MAX_TEAM_SIZE
+
+stats_bp = Blueprint('stats', __name__)
+
+MAX_LEADERBOARD_SIZE = 100
+
+
+@stats_bp.route('/')
+@cached_page
+def overview():
+    table = stat_table()
+    measure = request.args.get('measure', 'total')
+    if measure not in MEASURES:
+        abort(404)
+    return render_template(
+        'stats/index.html', title='Stats', table=table, measure=measure,
+        measures=MEASURES, labels=MEASURE_LABELS, stats=STATS,
+        summaries={m: table.summary(m) for m in MEASURES},
+        type_summary=table.type_summary(measure), correlations=table.correlations(),
+        leaders={stat: table.leaderboard(stat, 5) for stat in STATS + ['total']})
+
+
+@stats_bp.route('/top/<measure>')
+@cached_page
+def leaderboard(measure):
+    if measure not in MEASURES:
+        abort(404)
+    table = stat_table()
+    type_name = request.args.get('type') or None
+    if type_name is not None and type_name not in table.types():
+        abort(404)
+    size = min(max(request.args.get('n', DEFAULT_LEADERBOARD_SIZE, type=int), 1),
+               MAX_LEADERBOARD_SIZE)
+    lowest = request.args.get('order') == 'lowest'
+    return render_template(
+        'stats/leaderboard.html', title=f'Top {MEASURE_LABELS[measure]}',
+        measure=measure, measures=MEASURES, labels=MEASURE_LABELS, types=table.types(),
+        type_name=type_name, lowest=lowest, size=size,
+        rows=table.leaderboard(measure, size, type_name, lowest))
+
+
+@stats_bp.route('/team')
+@cached_page
+def team():
+    """Coverage of up to six Pokemon given as ``?pokemon=charizard,25,...``."""
+    identifiers = [part.strip() for part in request.args.get('pokemon', '').split(',') if part.strip()]
+    pokemon_ids, missing = resolve(identifiers[:MAX_TEAM_SIZE])
+    return render_template('stats/team.html', title='Team Coverage',
+                           report=analyze_team(pokemon_ids), missing=missing,
+                           team_text=', '.join(identifiers[:MAX_TEAM_SIZE]), mine=False)
+
+
+@stats_bp.route('/team/mine')
+@login_required
+def my_team():
+    """Coverage of the current user's whole caught list."""
+    caught = caught_pokemon_association.c
+    pokemon_ids = db.session.scalars(
+        db.select(caught.pokemon_id).where(caught.user_id == current_user.id)
+        .order_by(caught.pokemon_id)).all()
+    return render_template('stats/team.html', title='My Collection Coverage',
+                           report=analyze_team(pokemon_ids), missing=[],
+                           team_text='', mine=True)
+
+
+@stats_bp.route('/popular')
+def popular():
+    """Most caught (or ``?order=rarest``) Pokemon; counters move with every catch, so not page-cached."""
+    order = request.args.get('order', 'most')
+    if order not in ORDERS:
+        abort(404)
+    size = min(max(request.args.get('n', DEFAULT_RANKING_SIZE, type=int), 1),
+               MAX_LEADERBOARD_SIZE)
+    return render_template('stats/popular.html', title=ORDERS[order], order=order,
+                           orders=ORDERS, size=size, rows=ranking(order, size))
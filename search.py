@@ -0,0 +1,173 @@
+import difflib
+
+import sqlalchemy as sa
+from flask_sqlalchemy.pagination import Pagination
+
+from models import db, Pokemon
+
+# Full-text search over Pokemon names and descriptions.
+#
+# On SQLite the ``pokemon_fts`` FTS5 table indexes every trigram of
+# ``pokemon.name`` and ``pokemon.description`` (external content, kept in
+# sync by triggers), so substring searches and typo-tolerant lookups are
+# answered from the index instead of a full ``LIKE '%term%'`` scan.
+# Other backends fall back to ILIKE.
+
+FTS_TABLE = 'pokemon_fts'
+NAME_WEIGHT = 10.0  # bm25 weight of a name hit relative to a description hit
+DESCRIPTION_WEIGHT = 1.0
+FUZZY_CANDIDATES = 50  # Closest trigram matches re-ranked by edit similarity
+FUZZY_THRESHOLD = 0.75  # Minimum difflib similarity ratio for a fuzzy match
+MIN_TRIGRAM_TERM = 3  # Shorter terms cannot be looked up in a trigram index
+
+_CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, content='pokemon', content_rowid='id', tokenize='trigram')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON pokemon BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON pokemon BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    # Only the indexed columns: catches move catch_count on every request
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON pokemon
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+for _statement in _CREATE_STATEMENTS:
+    sa.event.listen(Pokemon.__table__, 'after_create',
+                    sa.DDL(_statement).execute_if(dialect='sqlite'))
+sa.event.listen(Pokemon.__table__, 'before_drop',
+                sa.DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect='sqlite'))
+
+fts = sa.table(FTS_TABLE, sa.column('rowid'))
+fts_match = sa.literal_column(FTS_TABLE).op('MATCH')
+fts_rank = sa.func.bm25(sa.literal_column(FTS_TABLE),
+                        NAME_WEIGHT, DESCRIPTION_WEIGHT)
+
+
+def fts_available():
+    """True when the database has the FTS5 search index."""
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return False
+    return sa.inspect(bind).has_table(FTS_TABLE)
+
+
+def rebuild_search_index():
+    """Creates the search index and triggers if missing and reindexes every Pokemon."""
+    for statement in _CREATE_STATEMENTS:
+        db.session.execute(sa.text(statement))
+    db.session.execute(
+        sa.text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def replace_update_trigger():
+    """Re-creates the UPDATE trigger of an existing search index from its current definition."""
+    if not fts_available():
+        return
+    db.session.execute(sa.text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au"))
+    db.session.execute(sa.text(_CREATE_STATEMENTS[-1]))
+
+
+def phrase(text):
+    """Quotes text as a single FTS5 phrase (matches it as a substring)."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(a, b):
+    return difflib.SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+class SearchPagination(Pagination):
+    """Paginates Pokemon whose name or description contains a term, best matches first."""
+
+    def _match(self):
+        return fts_match(phrase(self._query_args['term']))
+
+    def _query_items(self):
+        stmt = (sa.select(Pokemon)
+                .join(fts, fts.c.rowid == Pokemon.id)
+                .where(self._match())
+                .order_by(fts_rank, Pokemon.id)
+                .limit(self.per_page)
+                .offset((self.page - 1) * self.per_page))
+        return list(db.session.scalars(stmt))
+
+    def _query_count(self):
+        stmt = sa.select(sa.func.count()).select_from(fts).where(self._match())
+        return db.session.execute(stmt).scalar()
+
+
+class FuzzyPagination(Pagination):
+    """Paginates an already ranked list of Pokemon IDs."""
+
+    fuzzy = True  # Lets templates say the results are approximate
+
+    def _query_items(self):
+        start = (self.page - 1) * self.per_page
+        ids = self._query_args['ids'][start:start + self.per_page]
+        if not ids:
+            return []
+        by_id = {p.id: p for p in Pokemon.query.filter(Pokemon.id.in_(ids))}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def _query_count(self):
+        return len(self._query_args['ids'])
+
+
+def fuzzy_match_ids(term, limit=FUZZY_CANDIDATES, threshold=FUZZY_THRESHOLD):
+    """
+    IDs of Pokemon whose name is within a few typos of ``term``.
+    Names sharing the most trigrams with the term are fetched from the
+    index, then re-ranked by edit similarity.
+    """
+    grams = trigrams(term)
+    if not grams:
+        return []
+    query = 'name : (' + ' OR '.join(phrase(g) for g in sorted(grams)) + ')'
+    stmt = (sa.select(Pokemon.id, Pokemon.name)
+            .join(fts, fts.c.rowid == Pokemon.id)
+            .where(fts_match(query))
+            .order_by(fts_rank)
+            .limit(limit))
+    scored = [(similarity(term, name), pokemon_id)
+              for pokemon_id, name in db.session.execute(stmt)]
+    scored = [item for item in scored if item[0] >= threshold]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [pokemon_id for _, pokemon_id in scored]
+
+
+def search_pokemon(term, page=1, per_page=20):
+    """
+    Searches Pokemon by name or description and returns a pagination object.
+    Substring matches are ranked by bm25 (name hits first); if nothing
+    matches, falls back to typo-tolerant name matching.
+    """
+    pagination_args = dict(page=page, per_page=per_page, max_per_page=None,
+                           error_out=False)
+    # Terms too short for the trigram index keep plain substring matching;
+    # a scan of the pokemon table is cheap at Pokedex sizes
+    if len(term) < MIN_TRIGRAM_TERM or not fts_available():
+        return (Pokemon.query.filter(Pokemon.name.ilike(f'%{term}%'))
+                .order_by(Pokemon.id).paginate(**pagination_args))
+
+    results = SearchPagination(term=term, **pagination_args)
+    if results.total == 0:
+        ids = fuzzy_match_ids(term)
+        if ids:
+            results = FuzzyPagination(ids=ids, **pagination_args)
+    return results
@@ -1,52 +1,149 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
 import requests
-from models import db, Pokemon  # Assuming your models.py and app setup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app, has_app_context
+from models import db, Pokemon, DataVersion, POKEMON_DATA, POKEMON_COUNTERS, upsert_statement  # Assuming your models.py and app setup
+from http_cache import HttpCache
 
 # Configuration for PokeAPI
 POKEAPI_BASE_URL = "https://pokeapi.co/api/v2/"
 # Fetching the first 151 Pokemon for this example, adjust as needed
 POKEMON_LIMIT = 151  # Kanto Pokedex
 
+# Defaults for the concurrent fetcher, overridable through app config
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_PER_HOST = 8
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+REQUEST_TIMEOUT = 10  # Seconds
+DEFAULT_BATCH_SIZE = 500  # Rows per bulk INSERT
 
-def fetch_pokemon_data_from_api(pokemon_id_or_name):
-    """Fetches detailed data for a single Pokemon from PokeAPI."""
-    try:
-        response = requests.get(
-            f"{POKEAPI_BASE_URL}pokemon/{pokemon_id_or_name.lower() if isinstance(pokemon_id_or_name, str) else pokemon_id_or_name}")
+
+class PokeAPIClient:
+    """Thread-safe PokeAPI client sharing one pooled keep-alive session.
+
+    Retries 429/5xx responses with exponential backoff (honouring
+    ``Retry-After``) and caps the number of in-flight requests per host.
+    With an ``HttpCache`` attached, responses are served from and stored
+    to disk.
+    """
+
+    def __init__(self, base_url=POKEAPI_BASE_URL, pool_size=DEFAULT_CONCURRENCY,
+                 max_per_host=DEFAULT_MAX_PER_HOST, retries=DEFAULT_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR, timeout=REQUEST_TIMEOUT,
+                 cache=None):
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.timeout = timeout
+        self.cache = cache
+        self.max_per_host = max(1, max_per_host)
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET'}),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def from_config(cls, config, concurrency=None, cache=None):
+        """Builds a client from app config values (POKEAPI_* keys)."""
+        concurrency = concurrency or config.get(
+            'SEED_CONCURRENCY', DEFAULT_CONCURRENCY)
+        return cls(
+            base_url=config.get('POKEAPI_BASE_URL', POKEAPI_BASE_URL),
+            pool_size=concurrency,
+            max_per_host=config.get('POKEAPI_MAX_PER_HOST', DEFAULT_MAX_PER_HOST),
+            retries=config.get('POKEAPI_RETRIES', DEFAULT_RETRIES),
+            backoff_factor=config.get(
+                'POKEAPI_BACKOFF_FACTOR', DEFAULT_BACKOFF_FACTOR),
+            cache=cache,
+        )
+
+    def _slot_for(self, url):
+        host = urlparse(url).netloc
+        with self._host_slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_host)
+                self._host_slots[host] = slot
+        return slot
+
+    def get_json(self, url):
+        """GETs a URL and returns the decoded JSON body."""
+        with self._slot_for(url):
+            if self.cache is not None:
+                return json.loads(self.cache.fetch(
+                    self.session, url, timeout=self.timeout))
+            response = self.session.get(url, timeout=self.timeout)
         response.raise_for_status()  # Raises an HTTPError for bad responses (4XX or 5XX)
-        data = response.json()
+        return response.json()
 
+    def pokemon_url(self, pokemon_id_or_name):
+        key = pokemon_id_or_name.lower() if isinstance(
+            pokemon_id_or_name, str) else pokemon_id_or_name
+        return f"{self.base_url}pokemon/{key}"
+
+    def close(self):
+        self.session.close()
+
+
+def parse_pokemon_data(data, species_data):
+    """Turns PokeAPI pokemon + species documents into Pokemon column values."""
+    # Find an English flavor text entry
+    description = "No description available."
+    for entry in species_data.get('flavor_text_entries', []):
+        if entry['language']['name'] == 'en':
+            description = entry['flavor_text'].replace(
+                '\n', ' ').replace('\f', ' ')  # Clean up text
+            break
+
+    types = [t['type']['name'] for t in data['types']]
+    stats = {stat['stat']['name']: stat['base_stat'] for stat in data['stats']}
+
+    return {
+        'id': data['id'],
+        'name': data['name'],
+        'type1': types[0] if len(types) > 0 else 'unknown',
+        'type2': types[1] if len(types) > 1 else None,
+        'hp': stats.get('hp'),
+        'attack': stats.get('attack'),
+        'defense': stats.get('defense'),
+        'sp_attack': stats.get('special-attack'),
+        'sp_defense': stats.get('special-defense'),
+        'speed': stats.get('speed'),
+        'height': data.get('height'),  # In decimetres
+        'weight': data.get('weight'),  # In hectograms
+        'sprite_url': data['sprites']['front_default'] if data['sprites'] else None,
+        'description': description
+    }
+
+
+def fetch_pokemon_data_from_api(pokemon_id_or_name, client=None):
+    """Fetches detailed data for a single Pokemon from PokeAPI."""
+    owns_client = client is None
+    if owns_client:
+        client = PokeAPIClient(pool_size=1)
+    data = None
+    try:
+        data = client.get_json(client.pokemon_url(pokemon_id_or_name))
         # Fetch species data for description
-        species_url = data['species']['url']
-        species_response = requests.get(species_url)
-        species_response.raise_for_status()
-        species_data = species_response.json()
-
-        # Find an English flavor text entry
-        description = "No description available."
-        for entry in species_data.get('flavor_text_entries', []):
-            if entry['language']['name'] == 'en':
-                description = entry['flavor_text'].replace(
-                    '\n', ' ').replace('\f', ' ')  # Clean up text
-                break
-
-        types = [t['type']['name'] for t in data['types']]
-
-        return {
-            'id': data['id'],
-            'name': data['name'],
-            'type1': types[0] if len(types) > 0 else 'unknown',
-            'type2': types[1] if len(types) > 1 else None,
-            'hp': next((stat['base_stat'] for stat in data['stats'] if stat['stat']['name'] == 'hp'), None),
-            'attack': next((stat['base_stat'] for stat in data['stats'] if stat['stat']['name'] == 'attack'), None),
-            'defense': next((stat['base_stat'] for stat in data['stats'] if stat['stat']['name'] == 'defense'), None),
-            'sp_attack': next((stat['base_stat'] for stat in data['stats'] if stat['stat']['name'] == 'special-attack'), None),
-            'sp_defense': next((stat['base_stat'] for stat in data['stats'] if stat['stat']['name'] == 'special-defense'), None),
-            'speed': next((stat['base_stat'] for stat in data['stats'] if stat['stat']['name'] == 'speed'), None),
-            'height': data.get('height'),  # In decimetres
-            'weight': data.get('weight'),  # In hectograms
-            'sprite_url': data['sprites']['front_default'] if data['sprites'] else None,
-            'description': description
-        }
+        species_data = client.get_json(data['species']['url'])
+        return parse_pokemon_data(data, species_data)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching data for {pokemon_id_or_name}: {e}")
         return None
@@ -54,62 +151,136 @@ def fetch_pokemon_data_from_api(pokemon_id_or_name):
         print(
             f"KeyError while parsing data for {pokemon_id_or_name}: {e} - Data: {data}")
         return None
+    finally:
+        if owns_client:
+            client.close()
+
+
+def fetch_many_pokemon(ids, client, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Fetches several Pokemon through a bounded thread pool.
+    Yields ``(pokemon_id, data)`` pairs in completion order; ``data`` is
+    None when the fetch failed.
+    """
+    if concurrency <= 1:
+        for pokemon_id in ids:
+            yield pokemon_id, fetch_pokemon_data_from_api(pokemon_id, client)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency,
+                            thread_name_prefix='pokeapi') as executor:
+        futures = {executor.submit(fetch_pokemon_data_from_api, pokemon_id, client): pokemon_id
+                   for pokemon_id in ids}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+class BulkInsertResult:
+    """Row counts and timing for one bulk insert run."""
+
+    def __init__(self):
+        self.attempted = 0
+        self.written = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.written / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"{self.written} rows written ({self.attempted} attempted) in "
+                f"{self.elapsed:.2f}s, {self.rows_per_second:.1f} rows/sec")
+
+
+def bulk_insert_pokemon(records, batch_size=DEFAULT_BATCH_SIZE, update=False):
+    """
+    Streams Pokemon column dicts into batched executemany INSERTs.
+    Rows whose ID already exists are skipped (or overwritten with ``update``)
+    where the backend supports ON CONFLICT; catch counters are never
+    overwritten. Commits once per batch, bumps
+    the Pokemon data generation if anything was written and returns a
+    ``BulkInsertResult``.
+    """
+    stmt = upsert_statement(Pokemon.__table__, update=update, keep=POKEMON_COUNTERS)
+    result = BulkInsertResult()
+    started = time.perf_counter()
+    batch = []
+
+    def flush():
+        outcome = db.session.execute(stmt, batch)
+        db.session.commit()
+        result.attempted += len(batch)
+        result.written += outcome.rowcount if outcome.rowcount >= 0 else len(batch)
+        batch.clear()
+
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+            print(f"Committed batch ending at Pokemon ID {record['id']}...")
+    if batch:
+        flush()
+    if result.written:
+        # Invalidates every worker's caches of Pokemon reference data
+        DataVersion.bump(POKEMON_DATA)
+        db.session.commit()
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def existing_pokemon_ids():
+    """Loads the set of Pokemon IDs already in the database in one query."""
+    return set(db.session.scalars(db.select(Pokemon.id)))
 
 
 # Pass app_context or app if needed for config/db
-def seed_pokemon_data(app_context=None):
+def seed_pokemon_data(app_context=None, concurrency=None, limit=None, batch_size=None,
+                      offline=None):
     """
     Seeds the database with Pokemon data from PokeAPI.
-    Fetches a list of Pokemon names/IDs first, then details for each.
+    Fetches details for every missing ID, ``concurrency`` at a time over a
+    shared connection pool and the on-disk response cache, and streams the
+    parsed rows into batched bulk INSERTs of ``batch_size`` rows. With
+    ``offline`` only cached responses are used.
     """
-    print(f"Attempting to seed up to {POKEMON_LIMIT} Pokémon.")
-
-    # Check if Pokemon table already has data to avoid re-seeding unnecessarily
-    # This requires an app context to query the database.
-    # This logic might be better in the CLI command itself.
-    # For now, we'll assume it's run on an empty or intentionally reset DB.
-
-    count = 0
-    for i in range(1, POKEMON_LIMIT + 1):
-        # Check if Pokemon already exists
-        existing_pokemon = Pokemon.query.get(i)
-        if existing_pokemon:
-            print(
-                f"Pokemon ID {i} ({existing_pokemon.name}) already exists. Skipping.")
-            continue
-
-        print(f"Fetching data for Pokemon ID: {i}")
-        data = fetch_pokemon_data_from_api(i)
-
-        if data:
-            pokemon = Pokemon(
-                id=data['id'],
-                name=data['name'],
-                type1=data['type1'],
-                type2=data['type2'],
-                hp=data['hp'],
-                attack=data['attack'],
-                defense=data['defense'],
-                sp_attack=data['sp_attack'],
-                sp_defense=data['sp_defense'],
-                speed=data['speed'],
-                height=data['height'],
-                weight=data['weight'],
-                sprite_url=data['sprite_url'],
-                description=data['description']
-            )
-            db.session.add(pokemon)
-            count += 1
-            if count % 20 == 0:  # Commit in batches
-                print(f"Committing batch at Pokemon ID {i}...")
-                db.session.commit()
-        else:
-            print(
-                f"Could not fetch or parse data for Pokemon ID: {i}. Skipping.")
-
-    db.session.commit()  # Final commit for any remaining entries
-    print(f"Successfully seeded {count} new Pokémon.")
-    return count
+    config = current_app.config if has_app_context() else {}
+    cache = HttpCache.from_config(
+        config, current_app.instance_path, offline) if has_app_context() else None
+    concurrency = concurrency or config.get(
+        'SEED_CONCURRENCY', DEFAULT_CONCURRENCY)
+    batch_size = batch_size or config.get('SEED_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    limit = limit or POKEMON_LIMIT
+    print(
+        f"Attempting to seed up to {limit} Pokémon with {concurrency} concurrent fetches.")
+
+    # Check which Pokemon already exist with a single query
+    existing_ids = existing_pokemon_ids()
+    pending_ids = [i for i in range(1, limit + 1) if i not in existing_ids]
+    skipped = limit - len(pending_ids)
+    if skipped:
+        print(f"{skipped} Pokemon already exist. Skipping them.")
+
+    def fetched_records(client):
+        for i, data in fetch_many_pokemon(pending_ids, client, concurrency):
+            if data:
+                yield data
+            else:
+                print(
+                    f"Could not fetch or parse data for Pokemon ID: {i}. Skipping.")
+
+    client = PokeAPIClient.from_config(
+        config, concurrency=concurrency, cache=cache)
+    try:
+        result = bulk_insert_pokemon(fetched_records(client), batch_size)
+    finally:
+        client.close()
+
+    if cache is not None:
+        print(f"Response cache: {cache.hits} hits, {cache.revalidated} revalidated, "
+              f"{cache.misses} misses{' (offline)' if cache.offline else ''}.")
+    print(f"Successfully seeded {result.written} new Pokémon: {result}.")
+    return result.written
 
 # Example of how to run this independently (requires app context)
 # if __name__ == '__main__':
@@ -0,0 +1,99 @@
+import gzip
+import json
+
+from models import db, Pokemon, POKEMON_DATA_COLUMNS
+from seed import bulk_insert_pokemon, DEFAULT_BATCH_SIZE
+
+# Snapshot files are line-delimited JSON: one header object, then one
+# JSON array of column values per Pokemon, in the header's column order.
+SNAPSHOT_FORMAT = 'pokedex-snapshot'
+SNAPSHOT_VERSION = 1
+EXPORT_CHUNK_SIZE = 1000  # Rows fetched per round trip while exporting
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is malformed or of an unsupported version."""
+
+
+def _open(path, mode, compress=None):
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def pokemon_columns():
+    return list(POKEMON_DATA_COLUMNS)  # Catch counters belong to this database, not the snapshot
+
+
+def export_dex(path, compress=None):
+    """
+    Streams every row of the ``pokemon`` table into a snapshot file.
+    Gzip-compressed when ``compress`` is set or the path ends in ``.gz``.
+    Returns the number of rows written.
+    """
+    columns = pokemon_columns()
+    table = Pokemon.__table__
+    stmt = db.select(*[table.c[name] for name in columns]).order_by(table.c.id)
+    rows = db.session.execute(
+        stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+
+    count = 0
+    with _open(path, 'w', compress) as f:
+        header = {'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION,
+                  'table': table.name, 'columns': columns}
+        f.write(json.dumps(header) + '\n')
+        for row in rows:
+            f.write(json.dumps(list(row), ensure_ascii=False,
+                    separators=(',', ':')) + '\n')
+            count += 1
+    return count
+
+
+def read_snapshot(path):
+    """
+    Lazily yields Pokemon column dicts from a snapshot file, one line at a
+    time, so memory use does not grow with the size of the dex.
+    Columns missing from older snapshots are filled with None.
+    """
+    with _open(path, 'r') as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError as e:
+            raise SnapshotError(f"{path} has no valid snapshot header: {e}")
+        if header.get('format') != SNAPSHOT_FORMAT:
+            raise SnapshotError(f"{path} is not a Pokedex snapshot.")
+        if header.get('version', 0) > SNAPSHOT_VERSION:
+            raise SnapshotError(
+                f"{path} uses snapshot version {header['version']}, "
+                f"this app reads up to version {SNAPSHOT_VERSION}.")
+
+        file_columns = header['columns']
+        known_columns = pokemon_columns()
+        unknown = set(file_columns) - set(known_columns)
+        if unknown:
+            raise SnapshotError(
+                f"{path} has unknown columns: {', '.join(sorted(unknown))}")
+        missing = [name for name in known_columns if name not in file_columns]
+
+        for line_number, line in enumerate(f, start=2):
+            if not line.strip():
+                continue
+            values = json.loads(line)
+            if len(values) != len(file_columns):
+                raise SnapshotError(
+                    f"{path}:{line_number} has {len(values)} values, expected {len(file_columns)}.")
+            record = dict(zip(file_columns, values))
+            for name in missing:
+                record[name] = None
+            yield record
+
+
+def import_dex(path, batch_size=DEFAULT_BATCH_SIZE, replace=False):
+    """
+    Bulk loads a snapshot file into the ``pokemon`` table.
+    Existing IDs are kept unless ``replace`` is set, in which case they are
+    overwritten. Returns the ``BulkInsertResult``.
+    """
+    return bulk_insert_pokemon(read_snapshot(path), batch_size, update=replace)
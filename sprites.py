@@ -0,0 +1,338 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app, url_for
+
+from cache import LRUCache, data_generation
+from models import (db, Pokemon, Sprite, SpriteSheet, DataVersion, SPRITE_DATA,
+                    upsert_statement)
+
+# Local sprite mirror.
+#
+# ``mirror_sprites()`` downloads every distinct ``Pokemon.sprite_url``
+# concurrently into a content-addressed ``SpriteStore`` (files named by the
+# SHA-256 of their bytes), renders a fixed-size PNG thumbnail of each, and
+# packs the thumbnails of each page of the Pokedex into one sprite sheet.
+# Because a file's name changes whenever its bytes do, routes/sprites.py
+# serves them with ``Cache-Control: immutable``. Templates go through the
+# ``sprite`` filter and ``sprite_sheet()`` global, which fall back to the
+# external URL for anything not mirrored (or with SPRITE_MIRROR off).
+
+DEFAULT_SPRITE_DIR = 'sprites'
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RETRIES = 3
+DEFAULT_THUMBNAIL_SIZE = 96  # Pixels, square
+DEFAULT_SHEET_SIZE = 20  # Thumbnails per sheet, matching routes.main.POKEMON_PER_PAGE
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+REQUEST_TIMEOUT = 10  # Seconds
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+FORMATS = {'PNG': 'png', 'GIF': 'gif', 'JPEG': 'jpg', 'WEBP': 'webp'}  # Pillow format -> extension
+DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+index_cache = LRUCache(maxsize=2, name='sprites')
+
+
+class SpriteError(ValueError):
+    """A downloaded sprite that is not an image we can store."""
+
+
+class SpriteStore:
+    """Image files addressed by the SHA-256 of their bytes, under ``<digest[:2]>/``."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @classmethod
+    def from_config(cls, config, instance_path):
+        return cls(os.path.join(instance_path, config.get('SPRITE_DIR', DEFAULT_SPRITE_DIR)))
+
+    @staticmethod
+    def relative_path(digest, extension):
+        return f"{digest[:2]}/{digest}.{extension}"
+
+    def path(self, digest, extension):
+        return os.path.join(self.directory, digest[:2], f"{digest}.{extension}")
+
+    def exists(self, digest, extension):
+        return os.path.exists(self.path(digest, extension))
+
+    def put(self, data, extension):
+        """Stores ``data`` unless an identical file exists and returns its digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest, extension)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def read(self, digest, extension):
+        with open(self.path(digest, extension), 'rb') as f:
+            return f.read()
+
+
+def thumbnail(image, size=DEFAULT_THUMBNAIL_SIZE):
+    """``image`` scaled to fit a transparent ``size`` square, as PNG bytes."""
+    image = image.convert('RGBA')
+    scale = min(size / image.width, size / image.height)
+    # Nearest neighbour keeps pixel-art sprites crisp
+    image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                         Image.Resampling.NEAREST)
+    canvas = Image.new('RGBA', (size, size))
+    canvas.paste(image, ((size - image.width) // 2, (size - image.height) // 2))
+    return png_bytes(canvas)
+
+
+def png_bytes(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+class SpriteDownloader:
+    """
+    Fetches sprites over one pooled keep-alive session, ``concurrency`` at
+    a time, and stores each with its thumbnail.
+    """
+
+    def __init__(self, store, concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES,
+                 thumbnail_size=DEFAULT_THUMBNAIL_SIZE, max_bytes=DEFAULT_MAX_BYTES,
+                 timeout=REQUEST_TIMEOUT):
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.thumbnail_size = thumbnail_size
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=frozenset({'GET'}), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=self.concurrency,
+                              pool_maxsize=self.concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def from_config(cls, config, store, concurrency=None):
+        """Builds a downloader from SPRITE_* settings."""
+        return cls(store,
+                   concurrency=concurrency or config.get('SPRITE_CONCURRENCY', DEFAULT_CONCURRENCY),
+                   thumbnail_size=config.get('SPRITE_THUMBNAIL_SIZE', DEFAULT_THUMBNAIL_SIZE),
+                   max_bytes=config.get('SPRITE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+    def download(self, url):
+        """GETs ``url``, refusing non-images and bodies over ``max_bytes``."""
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            if not content_type.startswith('image/'):
+                raise SpriteError(f"{url} is {content_type or 'untyped'}, not an image")
+            body = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                body += chunk
+                if len(body) > self.max_bytes:
+                    raise SpriteError(f"{url} is larger than {self.max_bytes} bytes")
+        return bytes(body)
+
+    def fetch(self, url):
+        """Downloads and stores one sprite; returns its ``sprites`` row."""
+        data = self.download(url)
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except (OSError, Image.DecompressionBombError) as e:
+            raise SpriteError(f"{url} is not a readable image: {e}")
+        extension = FORMATS.get(image.format)
+        if extension is None:
+            raise SpriteError(f"{url} is a {image.format} image; expected one of {', '.join(FORMATS)}")
+        return {
+            'url': url,
+            'digest': self.store.put(data, extension),
+            'extension': extension,
+            'thumbnail_digest': self.store.put(thumbnail(image, self.thumbnail_size), 'png'),
+        }
+
+    def fetch_many(self, urls):
+        """
+        Yields ``(url, row, error)`` in completion order; ``row`` is None
+        when the fetch failed.
+        """
+        def attempt(url):
+            try:
+                return url, self.fetch(url), None
+            except (requests.exceptions.RequestException, SpriteError) as e:
+                return url, None, e
+
+        if self.concurrency <= 1:
+            yield from map(attempt, urls)
+            return
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix='sprites') as executor:
+            for future in as_completed([executor.submit(attempt, url) for url in urls]):
+                yield future.result()
+
+    def close(self):
+        self.session.close()
+
+
+class MirrorResult:
+    """Counts and timing for one mirror run."""
+
+    def __init__(self):
+        self.fetched = 0
+        self.failed = 0
+        self.skipped = 0
+        self.sheets = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        return (f"{self.fetched} sprites fetched, {self.failed} failed, {self.skipped} already "
+                f"mirrored, {self.sheets} sprite sheets in {self.elapsed:.2f}s")
+
+
+def build_sprite_sheets(store, sheet_size=DEFAULT_SHEET_SIZE,
+                        thumbnail_size=DEFAULT_THUMBNAIL_SIZE):
+    """
+    Replaces the ``sprite_sheets`` rows with one sheet per ``sheet_size``
+    Pokemon in ID order, the layout of the unfiltered index pages. Pages
+    with a sprite that was not mirrored get no sheet. Returns the number of
+    sheets written.
+    """
+    rows = db.session.execute(
+        db.select(Pokemon.id, Pokemon.sprite_url, Sprite.thumbnail_digest)
+        .outerjoin(Sprite, Sprite.url == Pokemon.sprite_url)
+        .order_by(Pokemon.id)).all()
+    db.session.execute(db.delete(SpriteSheet))
+    sheets = []
+    for start in range(0, len(rows), sheet_size):
+        page = rows[start:start + sheet_size]
+        if any(url and not thumb for _, url, thumb in page):
+            continue
+        sheet = Image.new('RGBA', (thumbnail_size * len(page), thumbnail_size))
+        for slot, (_, url, thumb) in enumerate(page):
+            if thumb:
+                with Image.open(store.path(thumb, 'png')) as image:
+                    sheet.paste(image.resize((thumbnail_size, thumbnail_size)),
+                                (slot * thumbnail_size, 0))
+        sheets.append({'page': start // sheet_size + 1,
+                       'pokemon_ids': ','.join(str(pokemon_id) for pokemon_id, _, _ in page),
+                       'digest': store.put(png_bytes(sheet), 'png')})
+    if sheets:
+        db.session.execute(db.insert(SpriteSheet), sheets)
+    return len(sheets)
+
+
+def sheet_rows():
+    return {tuple(row) for row in db.session.execute(
+        db.select(SpriteSheet.page, SpriteSheet.pokemon_ids, SpriteSheet.digest))}
+
+
+def mirror_sprites(refresh=False, concurrency=None):
+    """
+    Mirrors every Pokemon sprite not yet in the local store (all of them
+    with ``refresh``) and rebuilds the sprite sheets; if anything changed,
+    bumps the sprite data generation so cached pages pick up the local
+    URLs. Returns a ``MirrorResult``.
+    """
+    config = current_app.config
+    store = SpriteStore.from_config(config, current_app.instance_path)
+    result = MirrorResult()
+    started = time.perf_counter()
+
+    urls = db.session.scalars(db.select(Pokemon.sprite_url).distinct()
+                              .where(Pokemon.sprite_url.is_not(None))).all()
+    mirrored = {} if refresh else {
+        sprite.url: sprite for sprite in db.session.scalars(db.select(Sprite))}
+    # Rows whose files went missing (e.g. a wiped instance folder) are fetched again
+    pending = [url for url in urls if url not in mirrored
+               or not store.exists(mirrored[url].digest, mirrored[url].extension)]
+    result.skipped = len(urls) - len(pending)
+
+    downloader = SpriteDownloader.from_config(config, store, concurrency)
+    fetched = []
+    try:
+        for url, row, error in downloader.fetch_many(pending):
+            if row is None:
+                result.failed += 1
+                print(f"Could not mirror sprite {url}: {error}")
+            else:
+                fetched.append(row)
+    finally:
+        downloader.close()
+    if fetched:
+        db.session.execute(upsert_statement(Sprite.__table__, update=True), fetched)
+    result.fetched = len(fetched)
+
+    sheets_before = sheet_rows()
+    result.sheets = build_sprite_sheets(
+        store, config.get('SPRITE_SHEET_SIZE', DEFAULT_SHEET_SIZE),
+        config.get('SPRITE_THUMBNAIL_SIZE', DEFAULT_THUMBNAIL_SIZE))
+    if fetched or sheet_rows() != sheets_before:
+        # Only the sprite caches; Pokemon data caches stay warm
+        DataVersion.bump(SPRITE_DATA)
+    db.session.commit()
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+class SpriteIndex:
+    """Mirrored sprites by external URL and sprite sheets by their Pokemon IDs."""
+
+    def __init__(self, sprites, sheets):
+        self.sprites = sprites  # url -> (digest, extension, thumbnail digest)
+        self.sheets = sheets  # (pokemon IDs) -> digest
+
+    @classmethod
+    def load(cls):
+        sprites = {url: (digest, extension, thumb) for url, digest, extension, thumb in
+                   db.session.execute(db.select(Sprite.url, Sprite.digest, Sprite.extension,
+                                                Sprite.thumbnail_digest))}
+        sheets = {tuple(int(i) for i in ids.split(',')): digest for ids, digest in
+                  db.session.execute(db.select(SpriteSheet.pokemon_ids, SpriteSheet.digest))}
+        return cls(sprites, sheets)
+
+
+def sprite_index():
+    """The ``SpriteIndex`` of the current data generation, or None with SPRITE_MIRROR off."""
+    if not current_app.config.get('SPRITE_MIRROR'):
+        return None
+    return index_cache.get_or_set(data_generation(SPRITE_DATA), SpriteIndex.load)
+
+
+def sprite_url(digest, extension):
+    return url_for('sprites.sprite', digest=digest, extension=extension)
+
+
+def local_sprite(url, thumbnail=False):
+    """Template filter: the mirrored URL of an external sprite, or ``url`` itself."""
+    index = sprite_index()
+    entry = index.sprites.get(url) if index is not None and url else None
+    if entry is None:
+        return url
+    digest, extension, thumb = entry
+    if thumbnail and thumb:
+        return sprite_url(thumb, 'png')
+    return sprite_url(digest, extension)
+
+
+def sprite_sheet(pokemon_ids):
+    """Template global: the sheet URL for exactly these Pokemon in this order, or None."""
+    index = sprite_index()
+    digest = index.sheets.get(tuple(pokemon_ids)) if index is not None else None
+    return sprite_url(digest, 'png') if digest else None
+
+
+def init_app(app):
+    app.add_template_filter(local_sprite, 'sprite')
+    app.add_template_global(sprite_sheet)
@@ -0,0 +1,72 @@
+from flask import Response, current_app, get_flashed_messages, request, stream_template
+from markupsafe import Markup
+
+from models import db
+
+# Streamed listing pages.
+#
+# ``?show=all`` on the index and profile renders every matching card with
+# ``stream_template`` instead of building the page in memory: the rows come
+# from a server-side cursor ``STREAM_BATCH_SIZE`` at a time while the
+# template is being generated. Jinja yields many tiny strings, so the
+# output is coalesced into writes of about ``STREAM_CHUNK_BYTES``; a
+# ``{{ stream_flush() }}`` in the template sends everything rendered so far
+# at once, which lets the page header reach the browser before the first
+# rows are read.
+
+DEFAULT_BATCH_SIZE = 500  # Rows per cursor fetch
+DEFAULT_CHUNK_BYTES = 16 * 1024
+FLUSH_MARKER = Markup('<!--stream:flush-->')
+
+
+def stream_flush():
+    """Template global: flush point of a streamed page (dropped from the output)."""
+    return FLUSH_MARKER
+
+
+def streaming_requested():
+    """True for ``?show=all`` requests when STREAM_LISTINGS is on."""
+    return request.args.get('show') == 'all' and current_app.config.get('STREAM_LISTINGS', False)
+
+
+def stream_rows(stmt, params=None, batch_size=None):
+    """Yields the ORM rows of ``stmt``, fetched lazily ``batch_size`` at a time."""
+    batch_size = batch_size or current_app.config.get('STREAM_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size), params or {})
+    for partition in result.scalars().partitions():
+        yield from partition
+
+
+def coalesce(chunks, size=DEFAULT_CHUNK_BYTES):
+    """Joins rendered strings into writes of at least ``size`` characters, splitting at flush markers."""
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        if chunk == FLUSH_MARKER:
+            if buffer:
+                yield ''.join(buffer)
+                buffer, buffered = [], 0
+            continue
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_page(template_name, **context):
+    """A streamed response of ``template_name``; the template gets ``streaming=True``."""
+    # The session cookie goes out with the headers, so flashed messages have
+    # to be taken from it now rather than halfway through the body
+    get_flashed_messages(with_categories=True)
+    chunks = stream_template(template_name, streaming=True, **context)
+    response = Response(
+        coalesce(chunks, current_app.config.get('STREAM_CHUNK_BYTES', DEFAULT_CHUNK_BYTES)),
+        mimetype='text/html')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def init_app(app):
+    app.add_template_global(stream_flush)
@@ -2,6 +2,7 @@
 from models import User, Pokemon  # Assuming models.py is in the project_root
 from config import TestingConfig
 from app import create_app, db  # Assuming app.py is in the project_root
+from cache import clear_all_caches
 import pytest
 import sys
 import os
@@ -54,6 +55,7 @@ def init_database(app):  # 'app' here is the session-scoped app fixture
     with app.app_context():  # Ensure operations are within app context
         db.drop_all()
         db.create_all()
+        clear_all_caches()  # Process-local caches would outlive the old tables
         # Seed minimal data again if necessary for specific test modules/functions
         test_user = User.query.filter_by(username='testuser').first()
         if not test_user:
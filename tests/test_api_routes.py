@@ -0,0 +1,108 @@
+# pokedex_project/tests/test_api_routes.py
+from sqlalchemy import event
+
+from models import db, Pokemon, User
+import routes.api
+
+
+def add_pokemon(app, count):
+    with app.app_context():
+        db.session.add_all(Pokemon(id=i, name=f'mon{i}', type1='normal')
+                           for i in range(2, count + 1))
+        db.session.commit()
+
+
+def test_batch_lookup_by_ids_is_one_query(client, app, init_database):
+    add_pokemon(app, 10)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/v1/pokemon?ids=7,1,4,999&fields=name,type1')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['results'] == [{'id': 1, 'name': 'bulbasaur', 'type1': 'grass'},
+                               {'id': 4, 'name': 'mon4', 'type1': 'normal'},
+                               {'id': 7, 'name': 'mon7', 'type1': 'normal'}]
+    assert data['count'] == 3 and data['missing'] == [999]
+    pokemon_queries = [s for s in statements if 'FROM pokemon' in s]
+    assert len(pokemon_queries) == 1
+    assert 'description' not in pokemon_queries[0]  # Only requested columns are read
+
+
+def test_batch_lookup_by_names_and_errors(client, init_database):
+    data = client.get('/api/v1/pokemon?names=Bulbasaur,missingno&fields=type1').get_json()
+    assert data['results'] == [{'id': 1, 'type1': 'grass'}]
+    assert data['missing'] == ['missingno']
+
+    assert client.get('/api/v1/pokemon?fields=password').status_code == 400
+    assert client.get('/api/v1/pokemon?ids=abc').status_code == 400
+    assert client.get('/api/v1/pokemon?ids=1&names=bulbasaur').status_code == 400
+    assert client.get('/api/v1/pokemon/missingno').status_code == 404
+    assert client.get('/api/v1/pokemon/Bulbasaur?fields=name').get_json() == {
+        'id': 1, 'name': 'bulbasaur'}
+
+
+def test_large_results_are_streamed(client, app, init_database, monkeypatch):
+    add_pokemon(app, 30)
+    monkeypatch.setattr(routes.api, 'STREAM_THRESHOLD', 5)
+    response = client.get('/api/v1/pokemon?ids=' + ','.join(str(i) for i in range(1, 21)))
+    assert response.is_streamed
+    assert [p['id'] for p in response.get_json()['results']] == list(range(1, 21))
+
+    everything = client.get('/api/v1/pokemon?fields=id')
+    assert everything.get_json()['count'] == 30
+
+
+def test_batch_lookup_etag(client, init_database):
+    first = client.get('/api/v1/pokemon?ids=1')
+    assert first.headers['ETag']
+    again = client.get('/api/v1/pokemon?ids=1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    other = client.get('/api/v1/pokemon?ids=1&fields=name', headers={'If-None-Match': first.headers['ETag']})
+    assert other.status_code == 200
+
+
+def test_collection_requires_login(client, init_database):
+    response = client.post('/api/v1/collection', json={'catch': {'ids': [1]}})
+    assert response.status_code == 401
+    assert response.get_json()['error']
+
+
+def test_bulk_catch_and_release(auth_client, app, init_database):
+    with app.app_context():
+        db.session.add_all([
+            Pokemon(id=4, name='charmander', type1='fire'),
+            Pokemon(id=6, name='charizard', type1='fire', type2='flying'),
+            Pokemon(id=25, name='pikachu', type1='electric'),
+            Pokemon(id=155, name='cyndaquil', type1='fire'),
+        ])
+        db.session.commit()
+
+    response = auth_client.post('/api/v1/collection', json={'catch': {'generation': 1}})
+    assert response.get_json() == {'caught': [1, 4, 6, 25], 'released': [], 'total': 4}
+
+    # Already caught Pokemon are skipped; releases run after catches
+    response = auth_client.post('/api/v1/collection', json={
+        'catch': {'type': 'FIRE'}, 'release': {'ids': [25, 155, 999]}})
+    assert response.get_json() == {'caught': [155], 'released': [25, 155], 'total': 3}
+
+    response = auth_client.post('/api/v1/collection', json={
+        'release': {'generation': 1, 'type': 'fire'}})
+    assert response.get_json() == {'caught': [], 'released': [4, 6], 'total': 1}
+
+    for bad in ({}, {'catch': {}}, {'catch': {'generation': 42}},
+                {'catch': {'generation': [1]}}, {'catch': {'generation': True}},
+                {'catch': {'ids': ['1']}}, {'catch': {'all': True}, 'drop': {}}):
+        response = auth_client.post('/api/v1/collection', json=bad)
+        assert response.status_code == 400 and 'error' in response.get_json()
+    with app.app_context():
+        assert db.session.get(User, 1).caught_total == 1  # Rejected payloads caught nothing
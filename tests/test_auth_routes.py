@@ -1,6 +1,7 @@
 # pokedex_project/tests/test_auth_routes.py
 from flask import url_for
-from models import User
+from sqlalchemy import event
+from models import db, User
 
 
 def test_signup_page_loads(client, app):
@@ -95,3 +96,45 @@ def test_logout(auth_client, app):  # auth_client is already logged in as 'testu
     assert index_url in response.request.path
     assert "Login" in html_content
     assert "testuser's Profile" not in html_content
+
+
+def count_user_queries(app, request):
+    """Runs ``request()`` and returns the statements it issued against ``users``."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if 'users' in statement:
+            statements.append(statement.split()[0])
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return response, statements
+
+
+def test_signup_and_login_round_trips(client, app, init_database):
+    response, statements = count_user_queries(app, lambda: client.post('/auth/signup', data=dict(
+        username='Misty', email='misty@example.com',
+        password='starmie', confirm_password='starmie')))
+    assert response.status_code == 302
+    assert statements == ['SELECT', 'INSERT']  # One uniqueness check, one insert
+
+    response, statements = count_user_queries(app, lambda: client.post('/auth/login', data=dict(
+        identifier='MISTY@example.com', password='starmie')))
+    assert response.status_code == 302
+    assert statements == ['SELECT']  # Email or username in a single OR query
+
+
+def test_signup_rejects_case_insensitive_duplicates(client, init_database):
+    response = client.post('/auth/signup', data=dict(
+        username='TestUser', email='TEST@example.com',
+        password='password', confirm_password='password'))
+    html_content = response.data.decode('utf-8')
+    assert response.status_code == 200
+    assert 'That username is already taken' in html_content
+    assert 'That email address is already registered' in html_content
+    assert User.query.count() == 1
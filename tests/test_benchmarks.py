@@ -0,0 +1,57 @@
+# pokedex_project/tests/test_benchmarks.py
+from benchmarks.run import compare, percentile, summarize
+from benchmarks.synthetic import generate_dex, heaviest_collector, PASSWORD
+from models import db, User, Pokemon, caught_pokemon_association
+
+
+def test_generate_dex_is_skewed_and_reproducible(app, init_database):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        summary = generate_dex(pokemon=1200, users=20, seed=7, batch_size=500)
+        assert summary['caught'] > 0
+        assert Pokemon.query.count() == 1200
+        assert db.session.get(Pokemon, 1100).name.endswith('-1100')  # A form past the base dex
+        assert db.session.get(User, 3).check_password(PASSWORD)
+
+        caught = caught_pokemon_association.c
+        sizes = db.session.execute(db.select(db.func.count()).select_from(
+            caught_pokemon_association).group_by(caught.user_id)).scalars().all()
+        assert max(sizes) > 2 * min(sizes)
+        assert heaviest_collector() is not None
+        first_names = [p.name for p in Pokemon.query.order_by(Pokemon.id).limit(5)]
+
+        db.drop_all()
+        db.create_all()
+        generate_dex(pokemon=1200, users=20, seed=7, batch_size=500)
+        assert [p.name for p in Pokemon.query.order_by(Pokemon.id).limit(5)] == first_names
+
+
+def test_percentiles_and_regression_check():
+    samples = sorted(float(i) for i in range(1, 101))
+    assert percentile(samples, 50) == 50.0 and percentile(samples, 99) == 99.0
+    baseline = {'results': {'detail': summarize([1.0] * 10, [1] * 10)}}
+    faster = {'results': {'detail': summarize([1.1] * 10, [1] * 10)}}
+    slower = {'results': {'detail': summarize([2.0] * 10, [2] * 10)}}
+    assert compare(baseline, faster, threshold=0.25) == []
+    assert len(compare(baseline, slower, threshold=0.25)) == 2
+
+
+def test_load_test_mix_and_report(tmp_path):
+    import argparse
+    import pytest
+    from benchmarks.loadtest import Recorder, parse_mix, report
+
+    assert parse_mix('browse=3,catch=1') == {'browse': 3.0, 'catch': 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix('fly=1')
+
+    log_path = tmp_path / 'gunicorn.log'
+    log_path.write_text('sqlite3.OperationalError: database is locked\n')
+    recorder = Recorder()
+    for status in (200, 200, 302, 500):
+        recorder.record('catch', 0.01, status)
+    result = report(recorder, duration=2.0, log_path=str(log_path))
+    assert result['requests'] == 4 and result['throughput_rps'] == 2.0
+    assert result['actions']['catch']['errors'] == 1
+    assert result['database_locked'] == 1
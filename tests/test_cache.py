@@ -0,0 +1,61 @@
+# pokedex_project/tests/test_cache.py
+from flask import url_for
+from sqlalchemy import event
+
+from cache import LRUCache, pokemon_cache
+from models import db, Pokemon, DataVersion, POKEMON_DATA
+
+
+def test_lru_cache_eviction_ttl_and_counters():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.set('c', 3)
+    assert 'b' not in cache and cache.get('c') == 3
+    cache.set('d', 4, ttl=0)
+    assert cache.get('d') is None
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1
+
+
+def test_pokemon_cache_read_through_and_generation(app, init_database):
+    with app.app_context():
+        before = pokemon_cache.by_id.stats()['misses']
+        assert pokemon_cache.get(1).name == 'bulbasaur'
+        assert pokemon_cache.get_by_name('BULBASAUR').id == 1
+        assert pokemon_cache.get_by_id_or_name('1').name == 'bulbasaur'
+        assert pokemon_cache.get(999) is None
+        assert pokemon_cache.by_id.stats()['misses'] == before + 2
+
+        db.session.get(Pokemon, 1).name = 'bulbasaur-renamed'
+        db.session.commit()
+        assert pokemon_cache.get(1).name == 'bulbasaur'  # Still cached
+
+        DataVersion.bump(POKEMON_DATA)
+        db.session.commit()
+        assert pokemon_cache.get(1).name == 'bulbasaur-renamed'
+        assert pokemon_cache.get_by_name('bulbasaur') is None
+
+
+def test_warm_detail_pages_skip_pokemon_queries(client, app, init_database, monkeypatch):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+        detail_url = url_for('main.pokemon_detail', pokemon_id=1)
+        by_name_url = url_for('main.pokemon_detail_by_name', pokemon_name='Bulbasaur')
+    # Warm the cache
+    assert client.get(detail_url).status_code == 200
+    assert client.get(by_name_url).status_code == 200
+
+    monkeypatch.setitem(app.config, 'DATA_GENERATION_POLL_SECONDS', 60)
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        assert b'Bulbasaur' in client.get(detail_url).data
+        assert b'Bulbasaur' in client.get(by_name_url).data
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert statements == []  # Anonymous detail views never touch the database
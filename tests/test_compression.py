@@ -0,0 +1,130 @@
+# pokedex_project/tests/test_compression.py
+import gzip
+import zlib
+
+import pytest
+from sqlalchemy import event
+
+from compression import compress, compress_stream, compressed_cache
+from models import db, Pokemon
+from page_cache import MemoryPageStore
+
+GZIP = {'Accept-Encoding': 'gzip, deflate'}
+
+
+@pytest.fixture
+def page_store(app, init_database, monkeypatch):
+    store = MemoryPageStore()
+    monkeypatch.setitem(app.extensions, 'page_cache', store)
+    return store
+
+
+def test_pages_are_gzipped_with_their_own_etag(client, page_store):
+    plain = client.get('/pokemon/1')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    response = client.get('/pokemon/1', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    assert int(response.headers['Content-Length']) == len(response.data) < len(plain.data)
+    assert response.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+
+    # The second client sharing the body gets the stored compressed bytes
+    hits = compressed_cache.hits
+    assert client.get('/pokemon/1', headers=GZIP).data == response.data
+    assert compressed_cache.hits == hits + 1
+
+    revalidated = client.get('/pokemon/1', headers=dict(GZIP, **{
+        'If-None-Match': response.headers['ETag']}))
+    assert revalidated.status_code == 304 and revalidated.data == b''
+    assert client.get('/pokemon/1', headers={
+        'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+
+def test_small_and_binary_bodies_are_not_compressed(client, app, init_database):
+    response = client.get('/api/v1/pokemon/1', headers=GZIP)
+    assert len(response.data) < app.config['COMPRESSION_MIN_SIZE']
+    assert 'Content-Encoding' not in response.headers
+
+    response = client.get('/api/v1/pokemon/1', headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_streamed_pages_are_compressed_per_chunk(client, app, init_database):
+    with app.app_context():
+        db.session.add_all(Pokemon(id=pokemon_id, name=f'zipmon-{pokemon_id}', type1='ice')
+                           for pokemon_id in range(2, 200))
+        db.session.commit()
+    response = client.get('/?show=all', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    html = gzip.decompress(response.data).decode('utf-8')
+    assert 'Zipmon-199' in html and '</html>' in html
+
+
+def test_stream_compression_flushes_every_chunk():
+    chunks = [b'<html>' * 50, b'<p>card</p>' * 50, b'</html>']
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    output = compress_stream(chunks, 'gzip')
+    for chunk in chunks:
+        # Each input chunk can be decoded in full as soon as it is compressed
+        assert decompressor.decompress(next(output)) == chunk
+    decompressor.decompress(b''.join(output))
+    assert decompressor.eof
+
+
+def test_brotli_is_preferred_when_installed(client, page_store):
+    brotli = pytest.importorskip('brotli')
+    plain = client.get('/pokemon/1')
+    response = client.get('/pokemon/1', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == plain.data
+    assert compress(plain.data, 'br') == response.data
+
+
+def test_encoded_revalidation_skips_the_view(client, app, init_database):
+    with app.app_context():
+        db.session.add_all(Pokemon(id=pokemon_id, name=f'zipmon-{pokemon_id}', type1='ice')
+                           for pokemon_id in range(2, 80))
+        db.session.commit()
+    url = '/api/v1/pokemon?ids=' + ','.join(str(i) for i in range(1, 80))
+    response = client.get(url, headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'].endswith('-gzip"')
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if 'FROM pokemon' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        revalidated = client.get(url, headers=dict(GZIP, **{
+            'If-None-Match': response.headers['ETag']}))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert revalidated.status_code == 304 and statements == []
+    assert revalidated.headers['ETag'] == response.headers['ETag']
+
+
+def test_streamed_batches_get_an_encoded_etag(client, app, init_database):
+    with app.app_context():
+        db.session.add_all(Pokemon(id=pokemon_id, name=f'zipmon-{pokemon_id}', type1='ice')
+                           for pokemon_id in range(2, 120))
+        db.session.commit()
+    plain = client.get('/api/v1/pokemon')  # The whole dex is streamed
+    response = client.get('/api/v1/pokemon', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in plain.headers
+    assert response.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    assert zlib.decompress(response.data, 16 + zlib.MAX_WBITS) == plain.data
+
+    revalidated = client.get('/api/v1/pokemon', headers=dict(GZIP, **{
+        'If-None-Match': response.headers['ETag']}))
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == response.headers['ETag']
@@ -0,0 +1,135 @@
+# pokedex_project/tests/test_filters.py
+import pytest
+from flask import g
+from sqlalchemy import event
+from werkzeug.datastructures import MultiDict
+
+from models import db, Pokemon, User
+from filters import FilterSpec, FilterError, compile_filter, statement_cache
+
+# (id, name, type1, type2, hp, attack, speed, weight)
+ROWS = [
+    (2, 'charmander', 'fire', None, 39, 52, 65, 85),
+    (3, 'charizard', 'fire', 'flying', 78, 84, 100, 905),
+    (4, 'squirtle', 'water', None, 44, 48, 43, 90),
+    (5, 'gyarados', 'water', 'flying', 95, 125, 81, 2350),
+    (6, 'pidgeot', 'normal', 'flying', 83, 80, 101, 395),
+    (7, 'jolteon', 'electric', None, 65, 65, 130, 245),
+]
+
+
+@pytest.fixture
+def filter_dex(app, init_database):
+    with app.app_context():
+        for pokemon_id, name, type1, type2, hp, attack, speed, weight in ROWS:
+            db.session.add(Pokemon(id=pokemon_id, name=name, type1=type1, type2=type2, hp=hp,
+                                   attack=attack, defense=50, sp_attack=50, sp_defense=50,
+                                   speed=speed, weight=weight))
+        db.session.commit()
+
+
+def parse(**args):
+    return FilterSpec.parse(MultiDict(args))
+
+
+def run(spec, user_id=None):
+    stmt, count = compile_filter(spec)
+    params = spec.params(user_id)
+    return [p.name for p in db.session.scalars(stmt, params)], db.session.scalar(count, params)
+
+
+def test_parse_and_canonical_args():
+    spec = parse(filter='Speed >= 100, weight<500', type='Fire', sort='-total', caught='no')
+    assert spec.clauses == (('speed', '>=', 100), ('weight', '<', 500), ('type', '=', 'fire'))
+    assert spec.sort == 'total' and spec.descending and spec.caught is False
+    assert spec.to_args() == {'filter': 'speed>=100,weight<500,type=fire',
+                              'sort': '-total', 'caught': 'no'}
+    assert parse(**spec.to_args()).key() == spec.key()
+    assert spec.form_args() == {'filter': 'speed>=100,weight<500', 'type': 'fire',
+                                'sort': '-total', 'caught': 'no'}
+    assert parse(**spec.form_args()).key() == spec.key()
+    assert not parse()
+
+    for bad in ({'filter': 'speed>>1'}, {'filter': 'password=1'}, {'filter': 'speed>=fast'},
+                {'filter': 'type>fire'}, {'generation': '42'}, {'sort': 'password'},
+                {'caught': 'maybe'}):
+        with pytest.raises(FilterError):
+            parse(**bad)
+
+
+def test_filters_compile_to_one_cached_statement(app, filter_dex):
+    with app.app_context():
+        statement_cache.clear()
+        assert run(parse(type='flying', sort='-speed')) == (
+            ['pidgeot', 'charizard', 'gyarados'], 3)
+        assert run(parse(type='flying', filter='speed<=100', sort='-speed')) == (
+            ['charizard', 'gyarados'], 2)
+        assert len(statement_cache) == 2  # Different shapes
+        run(parse(type='fire', filter='speed<=50', sort='-speed'))
+        assert len(statement_cache) == 2  # Same shape, new values
+
+        assert run(parse(type1='water', sort='attack'))[0] == ['squirtle', 'gyarados']
+        assert run(parse(filter='type!=flying,total>=280', sort='-total'))[0] == [
+            'jolteon', 'charmander', 'squirtle']
+        assert run(parse(filter='weight>=900', sort='name'))[0] == ['charizard', 'gyarados']
+        assert run(parse(generation='1', filter='hp>80'))[0] == ['gyarados', 'pidgeot']
+
+        user = db.session.get(User, 1)
+        user.catch(3)
+        user.catch(5)
+        db.session.commit()
+        assert run(parse(caught='yes', sort='-hp'), 1)[0] == ['gyarados', 'charizard']
+        assert run(parse(caught='no', type='flying'), 1)[0] == ['pidgeot']
+
+
+def test_index_page_filters(client, app, filter_dex):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        html = client.get('/?type=flying&sort=-speed').get_data(as_text=True)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert html.index('Pidgeot') < html.index('Charizard') < html.index('Gyarados')
+    assert 'Squirtle' not in html
+    assert len([s for s in statements if 'FROM pokemon' in s]) == 2  # The page and its count
+    assert '<option value="flying" selected>' in html  # The form keeps the chosen type
+    assert 'name="filter" value=""' in html
+
+    html = client.get('/?filter=speed!!1').get_data(as_text=True)
+    assert 'Cannot read filter' in html and 'Bulbasaur' in html
+
+    response = client.get('/?caught=yes')
+    assert response.status_code == 302 and '/auth/login' in response.location
+
+
+def test_index_caught_filter_is_per_user(auth_client, app, filter_dex):
+    with app.app_context():
+        db.session.get(User, 1).catch(7)
+        db.session.commit()
+    g.pop('_login_user', None)
+    html = auth_client.get('/?caught=yes').get_data(as_text=True)
+    assert 'Jolteon' in html and 'Charizard' not in html
+    g.pop('_login_user', None)
+    html = auth_client.get('/?caught=no&type=electric').get_data(as_text=True)
+    assert 'No Pokémon match these filters' in html
+
+
+def test_api_filters(client, filter_dex):
+    data = client.get('/api/v1/pokemon?type=fire&sort=-attack&fields=name,attack').get_json()
+    assert data['results'] == [{'id': 3, 'name': 'charizard', 'attack': 84},
+                               {'id': 2, 'name': 'charmander', 'attack': 52}]
+    # Missing values count as different from any value
+    data = client.get('/api/v1/pokemon?filter=type2!=flying&fields=name').get_json()
+    assert [row['name'] for row in data['results']] == ['bulbasaur', 'charmander',
+                                                        'squirtle', 'jolteon']
+    data = client.get('/api/v1/pokemon?filter=hp!=39&type1=grass&fields=name').get_json()
+    assert [row['name'] for row in data['results']] == ['bulbasaur']  # hp is NULL
+    assert client.get('/api/v1/pokemon?filter=speed>fast').status_code == 400
+    assert client.get('/api/v1/pokemon?ids=1&type=fire').status_code == 400
+    assert client.get('/api/v1/pokemon?caught=yes').status_code == 401
@@ -0,0 +1,94 @@
+# pokedex_project/tests/test_identity.py
+from flask import g
+from sqlalchemy import event
+
+from identity import identity_cache, load_user, UserSnapshot
+from models import db, User
+
+
+def get(client, url):
+    # pytest-flask keeps one app context (and so g) around the whole test;
+    # drop Flask-Login's per-request user so every request runs the loader
+    g.pop('_login_user', None)
+    return client.get(url)
+
+
+def users_queries(app, client, url):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        # The profile's caught_total counter is data, not identity
+        if 'FROM users' in statement and not statement.startswith('SELECT users.caught_total'):
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = get(client, url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return statements
+
+
+def test_authenticated_page_views_skip_users_table(client, app, init_database):
+    client.post('/auth/login', data={'identifier': 'testuser', 'password': 'password'})
+    assert users_queries(app, client, '/profile') == []
+    assert users_queries(app, client, '/pokemon/1') == []
+
+    identity_cache.clear()
+    assert len(users_queries(app, client, '/profile')) == 1  # Reloaded once, then cached
+    assert users_queries(app, client, '/profile') == []
+
+
+def test_password_change_and_logout_forget_identity(client, app, init_database):
+    client.post('/auth/login', data={'identifier': 'testuser', 'password': 'password'})
+    assert 1 in identity_cache
+
+    with app.app_context():
+        user = db.session.get(User, 1)
+        user.set_password('new-password')
+        db.session.commit()
+    assert 1 not in identity_cache
+
+    get(client, '/profile')
+    assert 1 in identity_cache
+    get(client, '/auth/logout')
+    assert 1 not in identity_cache
+
+
+def test_session_mode_needs_no_lookup(client, app, init_database, monkeypatch):
+    monkeypatch.setitem(app.config, 'IDENTITY_IN_SESSION', True)
+    client.post('/auth/login', data={'identifier': 'testuser', 'password': 'password'})
+    identity_cache.clear()
+    assert users_queries(app, client, '/profile') == []
+
+
+def test_snapshot_falls_back_to_orm_user(app, init_database):
+    with app.test_request_context():
+        snapshot = load_user('1')
+        assert isinstance(snapshot, UserSnapshot)
+        assert snapshot.username == 'testuser'
+        assert snapshot.check_password('password')  # Loaded from the database on demand
+        assert not snapshot.has_caught(1)
+        assert load_user('999') is None
+
+
+def test_session_snapshot_rejected_after_password_change(client, app, init_database, monkeypatch):
+    monkeypatch.setitem(app.config, 'IDENTITY_IN_SESSION', True)
+    client.post('/auth/login', data={'identifier': 'testuser', 'password': 'password'})
+    assert get(client, '/profile').status_code == 200
+
+    with app.app_context():
+        user = db.session.get(User, 1)
+        user.set_password('changed-elsewhere')  # Another device; this worker's cache is dropped
+        db.session.commit()
+    monkeypatch.setattr(identity_cache, 'ttl', 0)  # The cookie's last check has expired
+    response = get(client, '/profile')
+    assert response.status_code == 302 and '/auth/login' in response.location
+    monkeypatch.setattr(identity_cache, 'ttl', 60)
+    assert get(client, '/profile').status_code == 302  # Logged out, not just refused once
+
+    client.post('/auth/login', data={'identifier': 'testuser', 'password': 'changed-elsewhere'})
+    assert get(client, '/profile').status_code == 200
@@ -0,0 +1,39 @@
+# pokedex_project/tests/test_instrumentation.py
+import json
+import logging
+import os
+
+
+def test_server_timing_header(client, init_database):
+    response = client.get('/pokemon/1')
+    timing = response.headers['Server-Timing']
+    assert 'db;dur=' in timing and 'tpl;dur=' in timing and 'total;dur=' in timing
+    assert 'queries' in timing and 'hits' in timing
+
+
+def test_password_hashing_is_reported(client, init_database):
+    assert 'hash;' not in client.get('/pokemon/1').headers['Server-Timing']
+    response = client.post('/auth/login', data={'identifier': 'testuser', 'password': 'password'})
+    timing = response.headers['Server-Timing']
+    assert 'hash;dur=' in timing and 'rejected' in timing
+
+
+def test_request_and_slow_logs(client, app, init_database, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, 'SLOW_QUERY_MS', 0)
+    monkeypatch.setitem(app.config, 'SLOW_REQUEST_MS', 0)
+    with caplog.at_level(logging.INFO, logger='pokedex'):
+        client.get('/pokemon/1')
+
+    records = [json.loads(r.getMessage()) for r in caplog.records if r.name.startswith('pokedex')]
+    request = next(r for r in records if r['event'] == 'request')
+    assert request['endpoint'] == 'main.pokemon_detail' and request['status'] == 200
+    assert request['sql_count'] >= 1 and request['template_ms'] > 0
+    assert any(r['event'] == 'slow_query' and 'FROM pokemon' in r['statement'] for r in records)
+    assert any(r['event'] == 'slow_request' for r in records)
+
+
+def test_sampling_profiler_writes_stats(client, app, init_database, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'PROFILE_SAMPLE_RATE', 1.0)
+    monkeypatch.setitem(app.config, 'PROFILE_DIR', str(tmp_path))  # Absolute paths win in join
+    client.get('/pokemon/1')
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.prof')]
@@ -82,4 +82,35 @@ def test_profile_page_authenticated(auth_client, app):
     assert "testuser's Pokedex" in html_content  # Assert against the string
     assert "My Caught Pokémon" in html_content  # Assert against the string
 
-# Add more tests for catch/release functionality later
+
+def test_catch_and_release_are_idempotent(auth_client, app, init_database):
+    """Catching twice or releasing twice changes nothing the second time."""
+    with app.app_context():
+        catch_url = url_for('main.catch_pokemon', pokemon_id=1)
+        release_url = url_for('main.release_pokemon', pokemon_id=1)
+
+    response = auth_client.post(catch_url, follow_redirects=True)
+    html_content = response.data.decode('utf-8')
+    assert "You caught Bulbasaur!" in html_content
+    assert "Release Pokémon" in html_content
+    response = auth_client.post(catch_url, follow_redirects=True)
+    assert "You already have Bulbasaur in your Pokedex." in response.data.decode('utf-8')
+
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        assert user.has_caught(1)
+        assert user.caught_pokemon.count() == 1
+
+    response = auth_client.post(release_url, follow_redirects=True)
+    assert "You released Bulbasaur." in response.data.decode('utf-8')
+    response = auth_client.post(release_url, follow_redirects=True)
+    assert "Bulbasaur is not in your Pokedex." in response.data.decode('utf-8')
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        assert not user.has_caught(1)
+
+
+def test_catch_unknown_pokemon_is_404(auth_client, app):
+    with app.app_context():
+        catch_url = url_for('main.catch_pokemon', pokemon_id=9999)
+    assert auth_client.post(catch_url).status_code == 404
@@ -0,0 +1,75 @@
+# pokedex_project/tests/test_migrations.py
+import sqlalchemy as sa
+
+from models import db, Pokemon, User
+from migrations import MIGRATIONS, current, head, set_version
+
+
+def test_db_upgrade_adds_missing_indexes(app, runner, init_database):
+    with app.app_context():
+        # Simulate a database created before the indexes were declared
+        for table in db.metadata.tables.values():
+            for index in table.indexes:
+                index.drop(db.engine)
+        assert current() == 0
+
+    result = runner.invoke(args=['db-upgrade'])
+    assert result.exit_code == 0, result.output
+    assert 'Applied migration 1' in result.output
+
+    with app.app_context():
+        # The inspector skips expression indexes on SQLite, so ask the catalog
+        indexes = set(db.session.execute(sa.text(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+        assert {'ix_pokemon_name_lower', 'ix_pokemon_type1', 'ix_pokemon_speed',
+                'ix_caught_pokemon_pokemon_id', 'ix_pokemon_total', 'ix_pokemon_type1_speed'} <= indexes
+        assert current() == head() == MIGRATIONS[-1][0]
+
+    result = runner.invoke(args=['db-upgrade'])
+    assert 'Applied' not in result.output
+
+
+def test_init_db_stamps_latest_version(app, runner, init_database):
+    result = runner.invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert current() == head()
+
+
+def test_db_upgrade_adds_and_backfills_catch_counters(app, runner, init_database):
+    with app.app_context():
+        db.session.get(User, 1).catch(1)
+        db.session.commit()
+        # Simulate a database from before the counters (SQLite drops unindexed columns only)
+        db.session.execute(sa.text('DROP INDEX ix_pokemon_catch_count'))
+        db.session.execute(sa.text('ALTER TABLE pokemon DROP COLUMN catch_count'))
+        db.session.execute(sa.text('ALTER TABLE users DROP COLUMN caught_total'))
+        set_version(3)
+        db.session.commit()
+
+    result = runner.invoke(args=['db-upgrade'])
+    assert result.exit_code == 0, result.output
+    assert 'Applied migration 4' in result.output
+
+    with app.app_context():
+        db.session.expire_all()
+        assert db.session.get(Pokemon, 1).catch_count == 1
+        assert db.session.get(User, 1).caught_total == 1
+
+
+def test_db_upgrade_narrows_the_search_update_trigger(app, runner, init_database):
+    with app.app_context():
+        # Simulate the trigger from before it listed its columns
+        db.session.execute(sa.text('DROP TRIGGER pokemon_fts_au'))
+        db.session.execute(sa.text(
+            "CREATE TRIGGER pokemon_fts_au AFTER UPDATE ON pokemon BEGIN SELECT 1; END"))
+        set_version(5)
+        db.session.commit()
+
+    result = runner.invoke(args=['db-upgrade'])
+    assert result.exit_code == 0, result.output
+    assert 'Applied migration 6' in result.output
+    with app.app_context():
+        trigger = db.session.execute(sa.text(
+            "SELECT sql FROM sqlite_master WHERE name = 'pokemon_fts_au'")).scalar()
+        assert 'AFTER UPDATE OF name, description ON pokemon' in trigger
@@ -0,0 +1,65 @@
+# pokedex_project/tests/test_page_cache.py
+import pytest
+from flask import url_for
+
+from page_cache import FilePageStore, MemoryPageStore
+
+
+@pytest.fixture
+def page_store(app, init_database, monkeypatch):
+    store = MemoryPageStore()
+    monkeypatch.setitem(app.extensions, 'page_cache', store)
+    return store
+
+
+def test_anonymous_pages_are_cached_with_etags(client, app, page_store):
+    with app.app_context():
+        detail_url = url_for('main.pokemon_detail', pokemon_id=1)
+    first = client.get(detail_url)
+    assert first.status_code == 200
+    assert first.headers['ETag']
+    assert page_store.stats()['misses'] == 1
+
+    second = client.get(detail_url)
+    assert second.data == first.data
+    assert page_store.stats()['hits'] == 1
+
+    not_modified = client.get(detail_url, headers={'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+
+def test_logged_in_users_share_the_cached_body(client, app, page_store):
+    with app.app_context():
+        detail_url = url_for('main.pokemon_detail', pokemon_id=1)
+        login_url = url_for('auth.login')
+    anonymous = client.get(detail_url)
+    assert 'to catch this Pokémon!' in anonymous.data.decode('utf-8')
+
+    client.post(login_url, data=dict(identifier='testuser', password='password'))
+    response = client.get(detail_url)
+    html_content = response.data.decode('utf-8')
+    assert page_store.stats()['hits'] >= 1
+    assert "testuser's Profile" in html_content
+    assert 'Catch Pokémon' in html_content
+    assert '<!--fragment:' not in html_content
+    assert response.headers['ETag'] != anonymous.headers['ETag']
+
+
+def test_missing_pages_are_not_cached(client, app, page_store):
+    with app.app_context():
+        missing_url = url_for('main.pokemon_detail', pokemon_id=9999)
+    response = client.get(missing_url)
+    assert response.status_code == 404
+    assert '<!--fragment:' not in response.data.decode('utf-8')
+    assert page_store.stats()['size'] == 0
+
+
+def test_file_page_store(tmp_path):
+    store = FilePageStore(str(tmp_path), max_entries=2)
+    for i in range(3):
+        store.set(('main.index', i), f'<p>{i}</p>')
+    assert store.get(('main.index', 2)) == '<p>2</p>'
+    store.prune()
+    assert len(list(tmp_path.iterdir())) == 2
+    assert store.get(('main.index', 'missing')) is None
@@ -0,0 +1,87 @@
+# pokedex_project/tests/test_pagination.py
+import re
+from html import unescape
+
+import pytest
+from flask import url_for
+
+from cache import cache_stats, data_generation
+from models import db, Pokemon, DataVersion, POKEMON_DATA
+from pagination import KeysetPagination, cached_count, encode_cursor
+
+
+@pytest.fixture
+def big_dex(app, init_database):
+    with app.app_context():
+        db.session.add_all(Pokemon(id=i, name=f'mon-{i}', type1='normal')
+                           for i in range(2, 66))
+        db.session.commit()
+    return init_database
+
+
+def link(html, text):
+    match = re.search(r'<a href="([^"]+)"\s+class="[^"]*">' + text + '</a>', html)
+    return unescape(match.group(1)) if match else None
+
+
+def test_keyset_pages_match_offset_pages(app, big_dex):
+    with app.test_request_context():
+        first = KeysetPagination(Pokemon.query, Pokemon.id, 20, page=1, total=65)
+        assert first.pages == 4 and first.next_args() == {'page': 2}
+        second = KeysetPagination(Pokemon.query, Pokemon.id, 20,
+                                  cursor=encode_cursor(first.items[-1].id, 'next', 2))
+        assert [p.id for p in second.items] == list(range(21, 41))
+        assert second.page == 2 and second.has_prev and second.has_next
+
+        back = KeysetPagination(Pokemon.query, Pokemon.id, 20,
+                                cursor=encode_cursor(21, 'prev', 1))
+        assert [p.id for p in back.items] == list(range(1, 21))
+        assert not back.has_prev and back.page == 1
+
+        last = KeysetPagination(Pokemon.query, Pokemon.id, 20,
+                                cursor=encode_cursor(60, 'next', 4))
+        assert [p.id for p in last.items] == list(range(61, 66))
+        assert not last.has_next
+
+        # Page numbers past the link limit are clamped rather than scanned to
+        deep = KeysetPagination(Pokemon.query, Pokemon.id, 5, page=99999, total=65,
+                                page_link_limit=3)
+        assert deep.page == 3 and [p.id for p in deep.items] == list(range(11, 16))
+        assert 'cursor' in deep.next_args()
+
+        # Tampered cursors fall back to the first page
+        tampered = KeysetPagination(Pokemon.query, Pokemon.id, 20, cursor='bogus')
+        assert [p.id for p in tampered.items][:1] == [1]
+
+
+def test_index_switches_to_cursor_links_past_limit(client, app, big_dex, monkeypatch):
+    monkeypatch.setitem(app.config, 'KEYSET_PAGE_LINK_LIMIT', 2)
+    with app.app_context():
+        page_two = url_for('main.index', page=2)
+    html = client.get(page_two).data.decode('utf-8')
+    assert 'Mon-40' in html
+    next_url = link(html, 'Next')
+    assert 'cursor=' in next_url
+
+    html = client.get(next_url).data.decode('utf-8')
+    assert 'Mon-41' in html and 'Mon-60' in html and 'Mon-40' not in html
+    assert 'Page 3' in html
+
+    html = client.get(link(html, 'Previous')).data.decode('utf-8')
+    assert 'Mon-21' in html and 'Mon-40' in html and 'Mon-41' not in html
+
+
+def test_cached_count_follows_data_generation(app, big_dex, monkeypatch):
+    monkeypatch.setitem(app.config, 'COUNT_CACHE_TTL', 60)
+    with app.app_context():
+        key = ('pokemon', data_generation(POKEMON_DATA))
+        assert cached_count(key, Pokemon.query) == 65
+        db.session.add(Pokemon(id=66, name='mon-66', type1='normal'))
+        db.session.commit()
+        assert cached_count(key, Pokemon.query) == 65  # Served from cache
+        assert cache_stats()['counts']['hits'] >= 1
+
+        DataVersion.bump(POKEMON_DATA)
+        db.session.commit()
+        key = ('pokemon', data_generation(POKEMON_DATA))
+        assert cached_count(key, Pokemon.query) == 66
@@ -0,0 +1,62 @@
+# pokedex_project/tests/test_passwords.py
+import threading
+
+import pytest
+
+from models import db, bcrypt, User
+from passwords import PasswordHasher, PasswordHasherBusy
+
+
+def test_hash_uses_configured_cost(app, init_database):
+    with app.app_context():
+        user = db.session.get(User, 1)
+        assert user.password_hash.startswith('$2b$04$')  # TestingConfig cost
+        assert user.check_password('password') and not user.check_password('wrong')
+        assert not user.password_needs_rehash()
+        assert app.extensions['password_hasher'].stats()['count'] >= 2
+
+
+def test_login_rehashes_at_new_cost(client, app, init_database):
+    with app.app_context():
+        user = db.session.get(User, 1)
+        user.password_hash = bcrypt.generate_password_hash('password', 5).decode('utf-8')
+        db.session.commit()
+
+    response = client.post('/auth/login', data={'identifier': 'testuser', 'password': 'password'})
+    assert response.status_code == 302
+
+    with app.app_context():
+        user = db.session.get(User, 1)
+        assert user.password_hash.startswith('$2b$04$')
+        assert user.check_password('password')
+
+
+def test_admission_control_rejects_when_full():
+    hasher = PasswordHasher(rounds=4, workers=1, queue_size=0, wait=0.01)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    worker = threading.Thread(target=hasher._run, args=(slow,))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash('password')
+    finally:
+        release.set()
+        worker.join()
+    assert hasher.verify(hasher.hash('password'), 'password')
+    assert hasher.stats()['rejected'] == 1
+
+
+def test_login_returns_503_when_hashing_is_saturated(client, app, init_database, monkeypatch):
+    busy = PasswordHasher(rounds=4, workers=1, queue_size=0, wait=0)
+    busy._slots.acquire()
+    monkeypatch.setitem(app.extensions, 'password_hasher', busy)
+    response = client.post('/auth/login', data={'identifier': 'testuser', 'password': 'password'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+    assert '1 rejected' in response.headers['Server-Timing']
@@ -0,0 +1,89 @@
+# pokedex_project/tests/test_popularity.py
+from flask import g
+
+from models import db, Pokemon, User
+from popularity import ranking, recount
+from seed import bulk_insert_pokemon
+
+
+def add_trainers_and_pokemon(app):
+    with app.app_context():
+        for pokemon_id, name in ((4, 'charmander'), (7, 'squirtle'), (25, 'pikachu')):
+            db.session.add(Pokemon(id=pokemon_id, name=name, type1='normal'))
+        for i in (2, 3):
+            user = User(username=f'trainer{i}', email=f'trainer{i}@example.com')
+            user.set_password('password')
+            db.session.add(user)
+        db.session.commit()
+
+
+def counters(app):
+    with app.app_context():
+        return ({p.id: p.catch_count for p in db.session.scalars(db.select(Pokemon))},
+                {u.id: u.caught_total for u in db.session.scalars(db.select(User))})
+
+
+def test_catch_and_release_move_counters(auth_client, app, init_database):
+    add_trainers_and_pokemon(app)
+    auth_client.post('/pokemon/25/catch')
+    auth_client.post('/pokemon/25/catch')  # Already caught: no change
+    auth_client.post('/pokemon/4/catch')
+    auth_client.post('/pokemon/4/release')
+    pokemon, users = counters(app)
+    assert (pokemon[25], pokemon[4], users[1]) == (1, 0, 1)
+
+    response = auth_client.post('/api/v1/collection', json={'catch': {'generation': 1}})
+    assert response.get_json()['total'] == 4
+    response = auth_client.post('/api/v1/collection', json={'release': {'ids': [1, 7]}})
+    assert response.get_json()['total'] == 2
+    pokemon, users = counters(app)
+    assert pokemon == {1: 0, 4: 1, 7: 0, 25: 1} and users[1] == 2
+
+    g.pop('_login_user', None)
+    assert 'Pokémon Caught: 2' in auth_client.get('/profile').get_data(as_text=True)
+
+
+def test_rankings_and_page(client, app, init_database):
+    add_trainers_and_pokemon(app)
+    with app.app_context():
+        for user_id, caught in ((1, [25, 7]), (2, [25, 7]), (3, [25, 4])):
+            user = db.session.get(User, user_id)
+            for pokemon_id in caught:
+                user.catch(pokemon_id)
+        db.session.commit()
+        assert [(p.id, count) for p, count in ranking('most', 3)] == [(25, 3), (7, 2), (4, 1)]
+        assert [p.id for p, _ in ranking('rarest', 2)] == [1, 4]
+
+    html = client.get('/stats/popular').get_data(as_text=True)
+    assert html.index('Pikachu') < html.index('Squirtle') < html.index('Charmander')
+    assert '3 trainers' in html
+    html = client.get('/stats/popular?order=rarest&n=1').get_data(as_text=True)
+    assert 'Bulbasaur' in html and 'Pikachu' not in html
+    assert client.get('/stats/popular?order=newest').status_code == 404
+
+
+def test_recount_command_repairs_drift(runner, app, init_database):
+    add_trainers_and_pokemon(app)
+    with app.app_context():
+        db.session.get(User, 2).catch(25)
+        db.session.execute(db.update(Pokemon).where(Pokemon.id.in_([4, 25])).values(catch_count=9))
+        db.session.execute(db.update(User).where(User.id == 3).values(caught_total=5))
+        db.session.commit()
+
+    result = runner.invoke(args=['recount'])
+    assert result.exit_code == 0, result.output
+    assert 'corrected 2 Pokemon and 1 users' in result.output
+    pokemon, users = counters(app)
+    assert (pokemon[4], pokemon[25], users[2], users[3]) == (0, 1, 1, 0)
+    with app.app_context():
+        assert recount() == (0, 0)
+
+
+def test_reimport_keeps_catch_counts(app, init_database):
+    with app.app_context():
+        db.session.get(User, 1).catch(1)
+        db.session.commit()
+        bulk_insert_pokemon([{'id': 1, 'name': 'bulbasaur', 'type1': 'grass', 'hp': 45}],
+                            update=True)
+        bulbasaur = db.session.get(Pokemon, 1)
+        assert bulbasaur.hp == 45 and bulbasaur.catch_count == 1
@@ -0,0 +1,85 @@
+# pokedex_project/tests/test_progress.py
+from flask import g
+from sqlalchemy import event
+
+from models import db, Pokemon, User
+from progress import collection_progress, progress_cache
+
+
+def add_pokemon(app):
+    with app.app_context():
+        for pokemon_id, name, type1, type2 in ((4, 'charmander', 'fire', None),
+                                               (6, 'charizard', 'fire', 'flying'),
+                                               (152, 'chikorita', 'grass', None),
+                                               (155, 'cyndaquil', 'fire', None)):
+            db.session.add(Pokemon(id=pokemon_id, name=name, type1=type1, type2=type2))
+        db.session.commit()
+
+
+def caught_queries(app, compute):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if 'caught_pokemon' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        result = compute()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return result, statements
+
+
+def test_breakdown_by_type_and_generation(app, init_database):
+    add_pokemon(app)
+    with app.app_context():
+        user = db.session.get(User, 1)
+        for pokemon_id in (1, 6, 155):
+            user.catch(pokemon_id)
+        db.session.commit()
+        total, version = user.collection_counters()
+        assert total == 3
+
+        progress, statements = caught_queries(app, lambda: collection_progress(user.id, version))
+        assert len(statements) == 1 and 'GROUP BY' in statements[0]
+        assert {p.key: (p.caught, p.total) for p in progress.by_type} == {
+            'fire': (2, 3), 'flying': (1, 1), 'grass': (1, 2), 'poison': (1, 1)}
+        by_generation = {p.key: p for p in progress.by_generation}
+        assert (by_generation[1].caught, by_generation[1].total, by_generation[1].percent) == (2, 3, 66.7)
+        assert (by_generation[2].caught, by_generation[2].total) == (1, 2)
+        assert by_generation[9].total == 0
+
+
+def test_cached_until_collection_changes(app, init_database):
+    add_pokemon(app)
+    with app.app_context():
+        user = db.session.get(User, 1)
+        user.catch(4)
+        db.session.commit()
+        _, version = user.collection_counters()
+        first = collection_progress(user.id, version)
+        again, statements = caught_queries(app, lambda: collection_progress(user.id, version))
+        assert again is first and not statements
+
+        user.catch(152)
+        db.session.commit()
+        _, bumped = user.collection_counters()
+        assert bumped == version + 1
+        progress = collection_progress(user.id, bumped)
+        assert {p.key: p.caught for p in progress.by_generation if p.caught} == {1: 1, 2: 1}
+        assert progress_cache.stats()['size'] == 2
+
+
+def test_profile_shows_progress(auth_client, app, init_database):
+    add_pokemon(app)
+    g.pop('_login_user', None)
+    assert 'By Generation' not in auth_client.get('/profile').get_data(as_text=True)
+
+    auth_client.post('/pokemon/6/catch')
+    auth_client.post('/pokemon/152/catch')
+    g.pop('_login_user', None)
+    html = auth_client.get('/profile').get_data(as_text=True)
+    assert 'By Type' in html and 'By Generation' in html
+    assert 'Generation 2' in html and '1 / 2' in html
+    assert 'Generation 9' not in html  # No Pokemon of it in this dex
@@ -0,0 +1,131 @@
+# pokedex_project/tests/test_query_plans.py
+import re
+
+import pytest
+from sqlalchemy import event
+
+from models import db, User, Pokemon
+from analytics import stat_table
+
+# Every statement issued by the hot routes is run through EXPLAIN QUERY PLAN.
+# A plan step that walks a whole table fails the test, except:
+# - virtual tables (the FTS5 index answers its own MATCH queries),
+# - covering-index scans (COUNT(*) totals, which are cached anyway),
+# - unfiltered ordered scans that stop at a LIMIT (OFFSET pages in
+#   primary-key order).
+# Search terms shorter than a trigram are matched with ILIKE '%term%', a
+# deliberate scan of the (small) pokemon table, so they are not listed here.
+# The analytics stat table reads every row by design, once per data
+# generation; the fixture warms it so the hot requests hit the cache.
+
+HOT_REQUESTS = [
+    ('GET', '/'),
+    ('GET', '/?page=2'),
+    ('GET', '/?search_term=saur'),
+    ('GET', '/?search_term=qzqzqz'),  # No match: fuzzy fallback
+    ('GET', '/?search_term=42'),
+    ('GET', '/pokemon/42'),
+    ('GET', '/pokemon/Mon42'),
+    ('GET', '/?type=fire&sort=-speed'),
+    ('GET', '/?type1=water&filter=attack>=50&sort=-attack'),
+    ('GET', '/?filter=total>=300,weight<500&sort=-total&page=2'),
+    ('GET', '/api/v1/pokemon?ids=1,2,3'),
+    ('GET', '/api/v1/pokemon?names=mon7,mon8'),
+    ('GET', '/api/v1/pokemon?type1=fire&sort=-speed&fields=name'),
+    ('POST', '/auth/signup', {'username': 'newtrainer', 'email': 'new@example.com',
+                              'password': 'password', 'confirm_password': 'password'}),
+    ('POST', '/auth/login', {'identifier': 'test@example.com', 'password': 'password'}),
+    ('POST', '/auth/login', {'identifier': 'testuser', 'password': 'password'}),
+    ('POST', '/pokemon/42/catch'),
+    ('GET', '/pokemon/42'),
+    ('GET', '/profile'),
+    ('GET', '/profile?page=2'),
+    ('GET', '/?type1=fire&caught=no&sort=-total'),
+    ('POST', '/pokemon/42/release'),
+    ('POST', '/api/v1/collection', {'catch': {'type': 'fire'}, 'release': {'generation': 1}}),
+    ('GET', '/stats/popular'),
+    ('GET', '/stats/popular?order=rarest'),
+]
+
+ALLOWED_SCAN = re.compile(r'^SCAN (CONSTANT ROW|\S+ VIRTUAL TABLE|\S+ USING COVERING INDEX)')
+
+
+@pytest.fixture
+def plan_dex(app, init_database):
+    with app.app_context():
+        db.session.add_all(
+            Pokemon(id=i, name=f'mon{i}', type1='fire' if i % 3 else 'water',
+                    description='A synthetic Pokemon.') for i in range(2, 301))
+        user = db.session.get(User, 1)
+        user.caught_pokemon.extend(Pokemon.query.filter(Pokemon.id <= 60))
+        db.session.commit()
+        stat_table()
+
+
+def capture_statements(app, client):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for method, url, *body in HOT_REQUESTS:
+            if method == 'GET':
+                response = client.get(url)
+            elif url.startswith('/api/'):
+                response = client.post(url, json=body[0])
+            else:
+                response = client.post(url, data=body[0] if body else None)
+            assert response.status_code < 400, (url, response.status_code)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return statements
+
+
+def full_scans(statement, plan):
+    """Plan steps that read a whole table or index."""
+    # A scan in an order the primary key or an index already provides stops
+    # at the LIMIT, unless a WHERE filter has to be checked row by row
+    statement = f" {' '.join(statement.split())} "
+    bounded = (' ORDER BY ' in statement and ' LIMIT ' in statement and ' WHERE ' not in statement
+               and not any('TEMP B-TREE' in step for step in plan))
+    return [step for step in plan
+            if step.startswith('SCAN ') and not ALLOWED_SCAN.match(step) and not bounded]
+
+
+def test_hot_queries_use_indexes(app, client, plan_dex):
+    statements = capture_statements(app, client)
+    assert len(statements) > 20
+
+    failures = []
+    seen = set()
+    with app.app_context():
+        connection = db.session.connection()
+        for statement, parameters in statements:
+            if statement in seen or statement.lstrip().split()[0].upper() not in (
+                    'SELECT', 'INSERT', 'UPDATE', 'DELETE'):
+                continue
+            seen.add(statement)
+            plan = [row[-1] for row in connection.exec_driver_sql(
+                'EXPLAIN QUERY PLAN ' + statement, parameters)]
+            scans = full_scans(statement, plan)
+            if scans:
+                failures.append(f"{' '.join(statement.split())}\n    {scans}")
+    assert not failures, 'Full table scans:\n' + '\n'.join(failures)
+
+
+def test_full_scan_detection():
+    assert full_scans('SELECT * FROM pokemon WHERE type1 = ?', ['SCAN pokemon'])
+    assert full_scans('SELECT * FROM pokemon ORDER BY name LIMIT 5',
+                      ['SCAN pokemon', 'USE TEMP B-TREE FOR ORDER BY'])
+    assert not full_scans('SELECT * FROM pokemon ORDER BY id LIMIT 5', ['SCAN pokemon'])
+    assert full_scans('SELECT * FROM pokemon WHERE type1 = ? LIMIT 20', ['SCAN pokemon'])
+    assert full_scans('SELECT * FROM pokemon WHERE type1 = ? ORDER BY id LIMIT 20',
+                      ['SCAN pokemon'])
+    assert full_scans('SELECT * FROM pokemon LIMIT 20', ['SCAN pokemon'])
+    assert not full_scans('SELECT count(*) FROM pokemon',
+                          ['SCAN pokemon USING COVERING INDEX ix_pokemon_type1'])
@@ -0,0 +1,100 @@
+# pokedex_project/tests/test_search.py
+import pytest
+import sqlalchemy as sa
+from flask import url_for
+
+from models import db, Pokemon, User
+from search import search_pokemon, rebuild_search_index
+
+
+@pytest.fixture
+def search_dex(app, init_database):
+    with app.app_context():
+        db.session.add_all([
+            Pokemon(id=4, name='charmander', type1='fire',
+                    description='The flame at the tip of its tail makes a sound.'),
+            Pokemon(id=6, name='charizard', type1='fire', type2='flying',
+                    description='Spits fire that is hot enough to melt boulders.'),
+            Pokemon(id=25, name='pikachu', type1='electric',
+                    description='It keeps its tail raised to monitor its surroundings.'),
+        ])
+        db.session.commit()
+    return init_database
+
+
+def names(results):
+    return [p.name for p in results.items]
+
+
+def test_substring_search_is_ranked(app, search_dex):
+    with app.app_context():
+        results = search_pokemon('char')
+        assert sorted(names(results)) == ['charizard', 'charmander']
+        assert results.total == 2
+
+        # Name hits outrank description hits
+        assert names(search_pokemon('fire')) == ['charizard']
+        assert sorted(names(search_pokemon('tail'))) == ['charmander', 'pikachu']
+
+
+def test_typo_tolerant_search(app, search_dex):
+    with app.app_context():
+        results = search_pokemon('charzard')
+        assert names(results) == ['charizard']
+        assert results.fuzzy
+        assert search_pokemon('nonexistentmon').total == 0
+
+
+def test_index_stays_in_sync_with_updates_and_deletes(app, search_dex):
+    with app.app_context():
+        db.session.get(Pokemon, 25).name = 'raichu'
+        db.session.commit()
+        assert names(search_pokemon('raichu')) == ['raichu']
+        assert search_pokemon('pikachu').total == 0
+
+        Pokemon.query.filter_by(id=6).delete()
+        db.session.commit()
+        assert names(search_pokemon('char')) == ['charmander']
+
+        rebuild_search_index()
+        assert names(search_pokemon('char')) == ['charmander']
+
+
+def test_catches_leave_the_index_untouched(app, search_dex):
+    with app.app_context():
+        # Index Bulbasaur under a marker only; a reindex would put its real text back
+        bulbasaur = db.session.get(Pokemon, 1)
+        db.session.execute(sa.text(
+            "INSERT INTO pokemon_fts(pokemon_fts, rowid, name, description) "
+            "VALUES ('delete', 1, :name, :description)"),
+            {'name': bulbasaur.name, 'description': bulbasaur.description})
+        db.session.execute(sa.text(
+            "INSERT INTO pokemon_fts(rowid, name, description) VALUES (1, 'markermon', '')"))
+        db.session.commit()
+
+        user = db.session.get(User, 1)
+        user.catch(1)
+        db.session.commit()
+        user.release(1)
+        db.session.commit()
+        assert db.session.get(Pokemon, 1).catch_count == 0
+        assert names(search_pokemon('markermon')) == ['bulbasaur']
+        assert not db.session.execute(sa.text(
+            "SELECT rowid FROM pokemon_fts WHERE pokemon_fts MATCH '\"strange seed\"'")).all()
+
+
+def test_short_terms_match_name_substrings(app, search_dex):
+    with app.app_context():
+        assert names(search_pokemon('pi')) == ['pikachu']
+        assert names(search_pokemon('iz')) == ['charizard']
+        assert names(search_pokemon('AR')) == ['charmander', 'charizard']
+
+
+def test_index_route_fuzzy_search(client, app, search_dex):
+    with app.app_context():
+        search_url = url_for('main.index', search_term='charzard')
+    response = client.get(search_url)
+    assert response.status_code == 200
+    html_content = response.data.decode('utf-8')
+    assert 'Charizard' in html_content
+    assert 'showing the closest names instead' in html_content
@@ -0,0 +1,208 @@
+# pokedex_project/tests/test_seed.py
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import seed
+from http_cache import HttpCache, OfflineCacheMiss
+from models import db, Pokemon
+
+
+def canned_pokemon(pokemon_id, base_url):
+    """A trimmed PokeAPI /pokemon/<id> document."""
+    return {
+        'id': pokemon_id,
+        'name': f'stubmon-{pokemon_id}',
+        'types': [{'slot': 1, 'type': {'name': 'fire'}}],
+        'stats': [
+            {'base_stat': 40 + pokemon_id, 'stat': {'name': 'hp'}},
+            {'base_stat': 50, 'stat': {'name': 'attack'}},
+            {'base_stat': 45, 'stat': {'name': 'defense'}},
+            {'base_stat': 60, 'stat': {'name': 'special-attack'}},
+            {'base_stat': 55, 'stat': {'name': 'special-defense'}},
+            {'base_stat': 70, 'stat': {'name': 'speed'}},
+        ],
+        'height': 7,
+        'weight': 69,
+        'sprites': {'front_default': f'{base_url}sprites/{pokemon_id}.png'},
+        'species': {'url': f'{base_url}pokemon-species/{pokemon_id}/'},
+    }
+
+
+def canned_species(pokemon_id):
+    """A trimmed PokeAPI /pokemon-species/<id> document."""
+    return {
+        'id': pokemon_id,
+        'flavor_text_entries': [
+            {'flavor_text': 'Ein Testmon.', 'language': {'name': 'de'}},
+            {'flavor_text': f'Stub\nentry\f{pokemon_id}.',
+             'language': {'name': 'en'}},
+        ],
+    }
+
+
+class StubPokeAPI:
+    """Local HTTP server serving canned PokeAPI JSON."""
+
+    def __init__(self):
+        self.requests = []
+        self.fail_once = set()  # Paths answered with a 429 on first hit
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append(self.path)
+                    throttled = self.path in stub.fail_once
+                    stub.fail_once.discard(self.path)
+                if throttled:
+                    return self._send(429, {'detail': 'slow down'})
+                etag = f'"{self.path}"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self._send(304, None)
+                parts = self.path.strip('/').split('/')
+                if len(parts) == 4 and parts[2] == 'pokemon' and parts[3].isdigit():
+                    return self._send(200, canned_pokemon(int(parts[3]), stub.base_url), etag)
+                if len(parts) == 4 and parts[2] == 'pokemon-species':
+                    return self._send(200, canned_species(int(parts[3])), etag)
+                return self._send(404, {'detail': 'Not found.'})
+
+            def _send(self, status, payload, etag=None):
+                body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if etag:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}/api/v2/'
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def pokeapi(app, monkeypatch):
+    with StubPokeAPI() as stub:
+        monkeypatch.setitem(app.config, 'POKEAPI_BASE_URL', stub.base_url)
+        yield stub
+
+
+def test_parse_pokemon_data():
+    data = seed.parse_pokemon_data(
+        canned_pokemon(4, 'http://stub/'), canned_species(4))
+    assert data['name'] == 'stubmon-4'
+    assert data['type1'] == 'fire' and data['type2'] is None
+    assert data['sp_attack'] == 60 and data['hp'] == 44
+    assert data['description'] == 'Stub entry 4.'
+
+
+def test_fetch_retries_throttled_requests(pokeapi):
+    pokeapi.fail_once.add('/api/v2/pokemon/7')
+    client = seed.PokeAPIClient(base_url=pokeapi.base_url, backoff_factor=0)
+    try:
+        data = seed.fetch_pokemon_data_from_api(7, client)
+    finally:
+        client.close()
+    assert data['id'] == 7
+    assert pokeapi.requests.count('/api/v2/pokemon/7') == 2
+
+
+def test_concurrent_seed_against_stub(app, init_database, pokeapi):
+    with app.app_context():
+        count = seed.seed_pokemon_data(app, concurrency=4, limit=12)
+        assert count == 11  # Bulbasaur (#1) is already seeded
+        assert Pokemon.query.count() == 12
+        assert db.session.get(Pokemon, 12).description == 'Stub entry 12.'
+    # One pokemon + one species request per new Pokemon
+    assert len(pokeapi.requests) == 22
+
+
+def test_seed_db_cli_concurrency_option(app, runner, init_database, pokeapi, monkeypatch):
+    monkeypatch.setattr(seed, 'POKEMON_LIMIT', 5)
+    result = runner.invoke(args=['seed-db', '--concurrency', '3'])
+    assert result.exit_code == 0, result.output
+    assert 'with 3 concurrent fetches' in result.output
+    assert 'Seeded 4 Pokemon into the database.' in result.output
+    assert 'rows/sec' in result.output
+
+
+def test_bulk_insert_skips_existing_ids(app, init_database):
+    records = ({'id': i, 'name': f'bulkmon-{i}', 'type1': 'water', 'type2': None,
+                'hp': 50, 'attack': 50, 'defense': 50, 'sp_attack': 50,
+                'sp_defense': 50, 'speed': 50, 'height': 10, 'weight': 100,
+                'sprite_url': None, 'description': None}
+               for i in range(1, 8))
+    with app.app_context():
+        result = seed.bulk_insert_pokemon(records, batch_size=3)
+        assert result.attempted == 7
+        assert result.written == 6  # ID 1 already exists and is left alone
+        assert db.session.get(Pokemon, 1).name == 'bulbasaur'
+        assert Pokemon.query.count() == 7
+    assert 'rows/sec' in str(result)
+
+
+def test_warm_reseed_is_served_from_disk_cache(app, init_database, pokeapi, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'POKEAPI_CACHE_DIR', str(tmp_path))
+    with app.app_context():
+        assert seed.seed_pokemon_data(app, concurrency=2, limit=4) == 3
+        Pokemon.query.filter(Pokemon.id > 1).delete()
+        db.session.commit()
+        network_requests = len(pokeapi.requests)
+
+        # Warm and offline reseeds never reach the stub server
+        assert seed.seed_pokemon_data(app, concurrency=2, limit=4) == 3
+        Pokemon.query.filter(Pokemon.id > 1).delete()
+        db.session.commit()
+        assert seed.seed_pokemon_data(app, limit=4, offline=True) == 3
+    assert len(pokeapi.requests) == network_requests
+
+
+def test_cache_revalidates_stale_entries(pokeapi, tmp_path):
+    cache = HttpCache(str(tmp_path), ttl=0)
+    client = seed.PokeAPIClient(base_url=pokeapi.base_url, cache=cache)
+    try:
+        first = client.get_json(client.pokemon_url(25))
+        second = client.get_json(client.pokemon_url(25))
+    finally:
+        client.close()
+    assert first == second
+    assert cache.misses == 1 and cache.revalidated == 1
+
+
+def test_cache_offline_miss_and_lru_eviction(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=70)  # Room for three 21-byte bodies
+    now = time.time()
+    for age, name in ((30, 'a'), (20, 'b'), (10, 'c')):
+        cache.store(f'http://stub/{name}', f'{{"doc": "{name * 10}"}}'.encode(), {})
+        os.utime(cache._entry_path(f'http://stub/{name}'), (now - age, now - age))
+    cache.read(cache.get('http://stub/a'))  # Oldest stored, but now the most recently used
+    cache.store('http://stub/d', b'{"doc": "dddddddddd"}', {})
+    assert cache.get('http://stub/b') is None  # Least recently used, evicted
+    for name in 'acd':
+        assert cache.get(f'http://stub/{name}') is not None
+
+    offline = HttpCache(str(tmp_path), offline=True)
+    with pytest.raises(OfflineCacheMiss):
+        offline.fetch(None, 'http://stub/b')
+    assert offline.fetch(None, 'http://stub/a') == b'{"doc": "aaaaaaaaaa"}'
@@ -0,0 +1,53 @@
+# pokedex_project/tests/test_snapshot.py
+import gzip
+import json
+
+from models import db, Pokemon, POKEMON_DATA_COLUMNS
+from snapshot import SNAPSHOT_VERSION
+
+
+def test_export_import_round_trip(app, runner, init_database, tmp_path):
+    path = str(tmp_path / 'dex.jsonl.gz')
+    result = runner.invoke(args=['export-dex', path])
+    assert result.exit_code == 0, result.output
+    assert 'Exported 1 Pokemon' in result.output
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+    assert header['version'] == SNAPSHOT_VERSION
+    assert header['columns'] == POKEMON_DATA_COLUMNS  # Catch counters stay behind
+
+    with app.app_context():
+        Pokemon.query.delete()
+        db.session.commit()
+
+    result = runner.invoke(args=['import-dex', path, '--batch-size', '1'])
+    assert result.exit_code == 0, result.output
+    assert '1 rows written' in result.output
+    with app.app_context():
+        bulbasaur = db.session.get(Pokemon, 1)
+        assert bulbasaur.name == 'bulbasaur'
+        assert bulbasaur.description == 'A strange seed was planted on its back at birth.'
+
+
+def test_import_replace_and_missing_columns(app, runner, init_database, tmp_path):
+    path = tmp_path / 'dex.jsonl'
+    lines = [{'format': 'pokedex-snapshot', 'version': 1, 'table': 'pokemon',
+              'columns': ['id', 'name', 'type1']},
+             [1, 'bulbasaur-mega', 'grass'], [2, 'ivysaur', 'grass']]
+    path.write_text('\n'.join(json.dumps(line) for line in lines) + '\n')
+
+    result = runner.invoke(args=['import-dex', str(path), '--replace'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert db.session.get(Pokemon, 1).name == 'bulbasaur-mega'
+        assert db.session.get(Pokemon, 2).speed is None
+
+
+def test_import_rejects_newer_snapshot_versions(runner, tmp_path):
+    path = tmp_path / 'future.jsonl'
+    path.write_text(json.dumps({'format': 'pokedex-snapshot', 'version': 99,
+                                'columns': ['id']}) + '\n')
+    result = runner.invoke(args=['import-dex', str(path)])
+    assert result.exit_code != 0
+    assert 'snapshot version 99' in result.output
@@ -0,0 +1,171 @@
+# pokedex_project/tests/test_sprites.py
+import hashlib
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from models import db, Pokemon, Sprite, SpriteSheet, DataVersion, POKEMON_DATA, SPRITE_DATA
+from sprites import SpriteDownloader, SpriteStore, mirror_sprites
+
+
+def png(width, height, color):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (width, height), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class StubImageServer:
+    """Local HTTP server serving sprites, a non-image and a 404."""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+        self.images = {'/sprites/1.png': png(40, 30, 'green'),
+                       '/sprites/2.png': png(64, 64, 'red'),
+                       '/sprites/3.png': png(20, 48, 'blue')}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append(self.path)
+                if self.path in stub.images:
+                    return self._send(200, 'image/png', stub.images[self.path])
+                if self.path == '/sprites/page.png':
+                    return self._send(200, 'text/html', b'<html>Not a sprite</html>')
+                if self.path == '/sprites/fake.png':
+                    return self._send(200, 'image/png', b'definitely not a png')
+                return self._send(404, 'text/plain', b'Not found.')
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}/'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def image_server():
+    with StubImageServer() as server:
+        yield server
+
+
+@pytest.fixture
+def sprite_dex(app, init_database, image_server, tmp_path):
+    """Four Pokemon with sprites on the stub server (two share one) and the mirror enabled."""
+    overrides = {'SPRITE_MIRROR': True, 'SPRITE_DIR': str(tmp_path / 'sprites')}
+    saved = {key: app.config.get(key) for key in overrides}
+    app.config.update(overrides)
+    with app.app_context():
+        db.session.get(Pokemon, 1).sprite_url = f'{image_server.base_url}sprites/1.png'
+        for pokemon_id, sprite in ((2, 2), (3, 3), (4, 2)):
+            db.session.add(Pokemon(id=pokemon_id, name=f'spritemon-{pokemon_id}', type1='normal',
+                                   sprite_url=f'{image_server.base_url}sprites/{sprite}.png'))
+        db.session.commit()
+    yield image_server
+    app.config.update(saved)
+
+
+def test_mirror_stores_sprites_thumbnails_and_sheets(app, sprite_dex):
+    app.config['SPRITE_SHEET_SIZE'] = 2
+    try:
+        with app.app_context():
+            pokemon_version = DataVersion.current(POKEMON_DATA)
+            result = mirror_sprites()
+            assert (result.fetched, result.failed, result.sheets) == (3, 0, 2)
+            sprite_version = DataVersion.current(SPRITE_DATA)
+            assert sprite_version and DataVersion.current(POKEMON_DATA) == pokemon_version
+            assert sorted(sprite_dex.requests) == ['/sprites/1.png', '/sprites/2.png',
+                                                   '/sprites/3.png']
+
+            store = SpriteStore.from_config(app.config, app.instance_path)
+            sprite = db.session.get(Sprite, f'{sprite_dex.base_url}sprites/3.png')
+            assert sprite.digest == hashlib.sha256(sprite_dex.images['/sprites/3.png']).hexdigest()
+            assert store.read(sprite.digest, 'png') == sprite_dex.images['/sprites/3.png']
+            with Image.open(store.path(sprite.thumbnail_digest, 'png')) as thumb:
+                assert thumb.size == (96, 96)
+
+            sheets = db.session.scalars(db.select(SpriteSheet).order_by(SpriteSheet.page)).all()
+            assert [sheet.pokemon_ids for sheet in sheets] == ['1,2', '3,4']
+            with Image.open(store.path(sheets[1].digest, 'png')) as sheet:
+                assert sheet.size == (192, 96)
+                assert sheet.getpixel((48, 48)) == (0, 0, 255, 255)
+                assert sheet.getpixel((96 + 48, 48)) == (255, 0, 0, 255)
+
+            again = mirror_sprites()
+            assert (again.fetched, again.skipped) == (0, 3)
+            assert len(sprite_dex.requests) == 3
+            assert DataVersion.current(SPRITE_DATA) == sprite_version  # Nothing changed
+    finally:
+        app.config['SPRITE_SHEET_SIZE'] = 20
+
+
+def test_pages_use_local_sprites_with_immutable_caching(client, app, sprite_dex):
+    with app.app_context():
+        mirror_sprites()
+        sprite = db.session.get(Sprite, f'{sprite_dex.base_url}sprites/2.png')
+        sheet = db.session.get(SpriteSheet, 1)
+    assert sheet.pokemon_ids == '1,2,3,4'
+
+    html = client.get('/pokemon/2').get_data(as_text=True)
+    assert f'/sprites/{sprite.digest}.png' in html and sprite_dex.base_url not in html
+    assert f'/sprites/{sheet.digest}.png' in client.get('/').get_data(as_text=True)
+
+    response = client.get(f'/sprites/{sprite.thumbnail_digest}.png')
+    assert response.status_code == 200 and response.mimetype == 'image/png'
+    assert response.cache_control.immutable and response.cache_control.public
+    assert response.cache_control.max_age >= 365 * 24 * 3600
+
+    assert client.get(f'/sprites/{"0" * 64}.png').status_code == 404
+    assert client.get(f'/sprites/{sprite.digest}.exe').status_code == 404
+    assert client.get('/sprites/..%2Fpokedex_test.png').status_code == 404
+
+
+def test_pages_fall_back_to_external_sprites(client, app, sprite_dex):
+    html = client.get('/pokemon/2').get_data(as_text=True)
+    assert f'{sprite_dex.base_url}sprites/2.png' in html  # Not mirrored yet
+
+    app.config['SPRITE_MIRROR'] = False
+    with app.app_context():
+        mirror_sprites()
+    html = client.get('/pokemon/2').get_data(as_text=True)
+    assert f'{sprite_dex.base_url}sprites/2.png' in html
+
+
+def test_downloader_rejects_non_images(tmp_path, image_server):
+    downloader = SpriteDownloader(SpriteStore(str(tmp_path)), concurrency=4, retries=0,
+                                  max_bytes=1024)
+    image_server.images['/sprites/huge.png'] = png(1, 1, 'red') + bytes(4096)
+    urls = [f'{image_server.base_url}sprites/{name}.png'
+            for name in ('1', 'page', 'fake', 'missing', 'huge')]
+    try:
+        results = {url.rsplit('/', 1)[1]: (row, error)
+                   for url, row, error in downloader.fetch_many(urls)}
+    finally:
+        downloader.close()
+    assert results['1.png'][0]['extension'] == 'png'
+    for name in ('page.png', 'fake.png', 'missing.png', 'huge.png'):
+        row, error = results[name]
+        assert row is None and error is not None
+    assert 'larger than' in str(results['huge.png'][1])
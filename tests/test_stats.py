@@ -0,0 +1,102 @@
+# pokedex_project/tests/test_stats.py
+import numpy as np
+from sqlalchemy import event
+
+from models import db, Pokemon, DataVersion, POKEMON_DATA
+from analytics import stat_table
+from cache import forget_generation
+
+# (id, name, type1, type2, hp, attack, defense, sp_attack, sp_defense, speed, height, weight)
+ROWS = [
+    (2, 'ivysaur', 'grass', 'poison', 60, 62, 63, 80, 80, 60, 10, 130),
+    (3, 'charmander', 'fire', None, 39, 52, 43, 60, 50, 65, 6, 85),
+    (4, 'pikachu', 'electric', None, 35, 55, 40, 50, 50, 90, 4, 60),
+    (5, 'snorlax', 'normal', None, 160, 110, 65, 65, 110, 30, 21, 4600),
+    (6, 'gengar', 'ghost', 'poison', 60, 65, 60, 130, 75, 110, 15, 405),
+]
+COLUMNS = ['hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed', 'height', 'weight']
+
+
+def add_pokemon(app):
+    with app.app_context():
+        for pokemon_id, name, type1, type2, *stats in ROWS:
+            db.session.add(Pokemon(id=pokemon_id, name=name, type1=type1, type2=type2,
+                                   **dict(zip(COLUMNS, stats))))
+        DataVersion.bump(POKEMON_DATA)
+        db.session.commit()
+        forget_generation()
+
+
+def test_stat_table_totals_ranks_and_leaderboard(app, init_database):
+    add_pokemon(app)
+    with app.app_context():
+        table = stat_table()
+        assert len(table) == 6  # Bulbasaur from the fixture has no stats
+        assert np.isnan(table.columns['total'][0])
+        assert table.columns['total'][table.row(5)] == 540
+
+        assert table.leaderboard('speed', 2) == [(6, 'gengar', 110.0, 100.0),
+                                                 (4, 'pikachu', 90.0, 80.0)]
+        assert [row[0] for row in table.leaderboard('hp', 2, lowest=True)] == [4, 3]
+        assert [row[0] for row in table.leaderboard('sp_attack', 5, type_name='poison')] == [6, 2]
+
+        ranks = table.percentile_ranks(5)
+        assert ranks['hp'] == 100.0 and ranks['speed'] == 20.0
+        assert table.percentile_ranks(1)['hp'] is None
+        assert table.percentile_ranks(999) == {}
+
+        poison = dict(table.type_summary('hp'))['poison']
+        assert poison['count'] == 2 and poison['mean'] == 60.0
+        assert table.summary('speed')['median'] == 65.0
+
+        correlations = table.correlations()
+        assert correlations.shape == (9, 9)
+        assert correlations[0, 0] == 1.0
+
+
+def test_stat_table_is_loaded_once_per_generation(app, init_database):
+    add_pokemon(app)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            first = stat_table()
+            assert stat_table() is first
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        assert len([s for s in statements if 'FROM pokemon' in s]) == 1
+
+        db.session.get(Pokemon, 2).speed = 200
+        DataVersion.bump(POKEMON_DATA)
+        db.session.commit()
+        forget_generation()
+        assert stat_table() is not first
+        assert stat_table().leaderboard('speed', 1)[0][0] == 2
+
+
+def test_stats_pages(client, app, init_database):
+    add_pokemon(app)
+    response = client.get('/stats/')
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert 'Pokédex Stats' in html and 'Snorlax' in html and 'Correlations' in html
+
+    html = client.get('/stats/top/speed?type=poison').get_data(as_text=True)
+    assert html.index('Gengar') < html.index('Ivysaur')
+    assert 'Pikachu' not in html
+
+    assert client.get('/stats/top/password').status_code == 404
+    assert client.get('/stats/top/hp?type=shadow').status_code == 404
+    assert client.get('/stats/?measure=password').status_code == 404
+
+
+def test_detail_page_shows_percentile_ranks(client, app, init_database):
+    add_pokemon(app)
+    html = client.get('/pokemon/5').get_data(as_text=True)
+    assert '100th pct' in html
+    assert 'Base stat total' in html
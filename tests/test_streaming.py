@@ -0,0 +1,75 @@
+# pokedex_project/tests/test_streaming.py
+import pytest
+from flask import g
+from sqlalchemy import event
+
+from models import db, Pokemon, User
+from streaming import FLUSH_MARKER, coalesce
+
+
+@pytest.fixture
+def big_dex(app, init_database):
+    with app.app_context():
+        db.session.add_all(Pokemon(id=pokemon_id, name=f'streamon-{pokemon_id}',
+                                   type1='fire' if pokemon_id % 2 else 'water', speed=pokemon_id)
+                           for pokemon_id in range(2, 46))
+        db.session.commit()
+
+
+def test_coalesce_joins_small_chunks_and_splits_at_flushes():
+    chunks = ['<head>', '<nav>', FLUSH_MARKER, 'a' * 3, 'b' * 3, 'c', FLUSH_MARKER, FLUSH_MARKER,
+              'd' * 9, 'e']
+    assert list(coalesce(chunks, size=8)) == ['<head><nav>', 'aaabbbc', 'ddddddddd', 'e']
+
+
+def test_show_all_streams_every_card(client, app, big_dex):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/?show=all', buffered=False)
+        assert response.is_streamed
+        chunks = iter(response.response)
+        header = next(chunks).decode('utf-8')
+        # The header is out before the Pokemon are read
+        assert 'Pokédex' in header and 'Streamon' not in header
+        assert not [s for s in statements if 'FROM pokemon' in s]
+        html = header + b''.join(chunks).decode('utf-8')
+        response.close()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert html.index('Bulbasaur') < html.index('Streamon-2') < html.index('Streamon-45')
+    assert 'Previous' not in html and 'Show pages' in html
+    assert len([s for s in statements if 'FROM pokemon' in s]) == 1  # No page count either
+
+    html = client.get('/?show=all&type=water&sort=-speed').get_data(as_text=True)
+    assert html.index('Streamon-44') < html.index('Streamon-2') and 'Streamon-45' not in html
+    assert 'No Pokémon match these filters' in client.get(
+        '/?show=all&filter=speed>1000').get_data(as_text=True)
+
+
+def test_paged_index_links_to_show_all(client, app, big_dex):
+    html = client.get('/').get_data(as_text=True)
+    assert 'show=all' in html and 'Streamon-45' not in html
+
+    app.config['STREAM_LISTINGS'] = False
+    try:
+        html = client.get('/?show=all').get_data(as_text=True)
+        assert 'Streamon-45' not in html and 'Next' in html
+    finally:
+        app.config['STREAM_LISTINGS'] = True
+
+
+def test_profile_show_all(auth_client, app, big_dex):
+    with app.app_context():
+        db.session.get(User, 1).catch_matching(Pokemon.id >= 2)
+        db.session.commit()
+    g.pop('_login_user', None)
+    html = auth_client.get('/profile?show=all').get_data(as_text=True)
+    assert 'Pokémon Caught: 44' in html
+    assert html.count('value="Release"') == 44
@@ -0,0 +1,77 @@
+# pokedex_project/tests/test_typechart.py
+from flask import g
+
+from models import db, Pokemon, User, DataVersion, POKEMON_DATA
+from cache import forget_generation
+from typechart import CHART, TYPE_CODES, analyze_team, defensive_profile, resolve
+
+DEX = [
+    (2, 'charmander', 'fire', None), (3, 'squirtle', 'water', None),
+    (4, 'pikachu', 'electric', None), (5, 'geodude', 'rock', 'ground'),
+    (6, 'onix', 'rock', 'ground'), (7, 'gyarados', 'water', 'flying'),
+    (8, 'ferrothorn', 'grass', 'steel'), (9, 'missingno', 'unknown', None),
+]
+
+
+def add_pokemon(app):
+    with app.app_context():
+        db.session.add_all(Pokemon(id=i, name=name, type1=t1, type2=t2, hp=50, attack=50,
+                                   defense=50, sp_attack=50, sp_defense=50, speed=50)
+                           for i, name, t1, t2 in DEX)
+        DataVersion.bump(POKEMON_DATA)
+        db.session.commit()
+        forget_generation()
+
+
+def test_chart_and_dual_type_profiles():
+    assert CHART[TYPE_CODES['water'], TYPE_CODES['fire']] == 2
+    assert CHART[TYPE_CODES['ghost'], TYPE_CODES['normal']] == 0
+    assert defensive_profile('rock', 'ground')['water'] == 4
+    assert defensive_profile('rock', 'ground')['electric'] == 0
+    assert defensive_profile('grass', 'steel')['fire'] == 4
+    assert defensive_profile('grass', 'steel')['poison'] == 0
+    assert defensive_profile('fire')['water'] == 2
+    assert set(defensive_profile('unknown').values()) == {1.0}
+
+
+def test_team_weaknesses_coverage_and_suggestions(app, init_database):
+    add_pokemon(app)
+    with app.app_context():
+        ids, missing = resolve(['Geodude', '6', 'mewtwo', '999'])
+        assert ids == [5, 6] and missing == ['mewtwo', '999']
+
+        report = analyze_team(ids)
+        assert len(report) == 2
+        weaknesses = dict((t, (weak, resist)) for t, weak, resist in report.shared_weaknesses())
+        assert weaknesses['water'] == (2, 0) and weaknesses['grass'] == (2, 0)
+        assert 'electric' not in weaknesses
+        assert 'fire' in report.covered() and 'water' not in report.covered()
+
+        suggestions = report.suggestions(3)
+        suggested = [row[0] for row in suggestions]
+        assert 5 not in suggested and 6 not in suggested
+        assert suggested[0] == 7  # Water/flying resists water, fighting, ground and steel
+        assert suggestions == sorted(suggestions, key=lambda row: -row[4])
+
+        empty = analyze_team([])
+        assert len(empty) == 0 and empty.shared_weaknesses() == []
+        assert len(empty.suggestions(3)) == 3
+
+
+def test_team_pages(auth_client, app, init_database):
+    add_pokemon(app)
+    html = auth_client.get('/stats/team?pokemon=geodude,onix,mewtwo').get_data(as_text=True)
+    assert 'Shared Weaknesses' in html and 'Not found: mewtwo' in html
+    assert 'Ferrothorn' in html
+
+    g.pop('_login_user', None)
+    assert app.test_client().get('/stats/team/mine').status_code == 302  # Login required
+
+    with app.app_context():
+        user = db.session.get(User, 1)
+        user.catch(2)
+        user.catch(3)
+        db.session.commit()
+    g.pop('_login_user', None)
+    html = auth_client.get('/stats/team/mine').get_data(as_text=True)
+    assert 'Team (2)' in html and 'Charmander' in html
@@ -0,0 +1,193 @@
+import numpy as np
+
+from analytics import stat_table
+
+# Type effectiveness and team coverage.
+#
+# The 18 types get integer codes; ``CHART[attack, defend]`` is the damage
+# multiplier of an attacking type against a single defending type. Every
+# dual-type defensive profile is precomputed into ``PROFILES[type1, type2]``
+# (the multiplier taken from each attacking type), with code NONE standing
+# for a missing second type or a type name the chart does not know. Team
+# analysis and candidate scoring index these arrays with the dex's type
+# codes, which are encoded once per data generation on the stat table, so
+# ranking every Pokemon in the dex is a few array operations.
+
+TYPES = ['normal', 'fire', 'water', 'electric', 'grass', 'ice', 'fighting', 'poison',
+         'ground', 'flying', 'psychic', 'bug', 'rock', 'ghost', 'dragon', 'dark',
+         'steel', 'fairy']
+TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+NONE = len(TYPES)
+MAX_TEAM_SIZE = 6
+DEFAULT_SUGGESTIONS = 10
+
+# Multipliers other than 1x, attacker -> {defender: multiplier}
+_EFFECTIVENESS = {
+    'normal': {'rock': .5, 'ghost': 0, 'steel': .5},
+    'fire': {'fire': .5, 'water': .5, 'grass': 2, 'ice': 2, 'bug': 2, 'rock': .5,
+             'dragon': .5, 'steel': 2},
+    'water': {'fire': 2, 'water': .5, 'grass': .5, 'ground': 2, 'rock': 2, 'dragon': .5},
+    'electric': {'water': 2, 'electric': .5, 'grass': .5, 'ground': 0, 'flying': 2,
+                 'dragon': .5},
+    'grass': {'fire': .5, 'water': 2, 'grass': .5, 'poison': .5, 'ground': 2, 'flying': .5,
+              'bug': .5, 'rock': 2, 'dragon': .5, 'steel': .5},
+    'ice': {'fire': .5, 'water': .5, 'grass': 2, 'ice': .5, 'ground': 2, 'flying': 2,
+            'dragon': 2, 'steel': .5},
+    'fighting': {'normal': 2, 'ice': 2, 'poison': .5, 'flying': .5, 'psychic': .5, 'bug': .5,
+                 'rock': 2, 'ghost': 0, 'dark': 2, 'steel': 2, 'fairy': .5},
+    'poison': {'grass': 2, 'poison': .5, 'ground': .5, 'rock': .5, 'ghost': .5, 'steel': 0,
+               'fairy': 2},
+    'ground': {'fire': 2, 'electric': 2, 'grass': .5, 'poison': 2, 'flying': 0, 'bug': .5,
+               'rock': 2, 'steel': 2},
+    'flying': {'electric': .5, 'grass': 2, 'fighting': 2, 'bug': 2, 'rock': .5, 'steel': .5},
+    'psychic': {'fighting': 2, 'poison': 2, 'psychic': .5, 'dark': 0, 'steel': .5},
+    'bug': {'fire': .5, 'grass': 2, 'fighting': .5, 'poison': .5, 'flying': .5, 'psychic': 2,
+            'ghost': .5, 'dark': 2, 'steel': .5, 'fairy': .5},
+    'rock': {'fire': 2, 'ice': 2, 'fighting': .5, 'ground': .5, 'flying': 2, 'bug': 2,
+             'steel': .5},
+    'ghost': {'normal': 0, 'psychic': 2, 'ghost': 2, 'dark': .5},
+    'dragon': {'dragon': 2, 'steel': .5, 'fairy': 0},
+    'dark': {'fighting': .5, 'psychic': 2, 'ghost': 2, 'dark': .5, 'fairy': .5},
+    'steel': {'fire': .5, 'water': .5, 'electric': .5, 'ice': 2, 'rock': 2, 'steel': .5,
+              'fairy': 2},
+    'fairy': {'fire': .5, 'fighting': 2, 'poison': .5, 'dragon': 2, 'dark': 2, 'steel': .5},
+}
+
+
+def _build_chart():
+    chart = np.ones((len(TYPES), len(TYPES)))
+    for attacker, row in _EFFECTIVENESS.items():
+        for defender, multiplier in row.items():
+            chart[TYPE_CODES[attacker], TYPE_CODES[defender]] = multiplier
+    return chart
+
+
+CHART = _build_chart()
+# Attacking rows with a neutral NONE row, so unknown types never count as coverage
+ATTACK = np.vstack([CHART, np.ones(len(TYPES))])
+# PROFILES[type1, type2, attack]; NONE as a defending type is neutral
+_DEFEND = np.hstack([CHART, np.ones((len(TYPES), 1))])
+PROFILES = (_DEFEND[:, :, None] * _DEFEND[:, None, :]).transpose(1, 2, 0)
+
+
+def type_code(name):
+    """Code of a type name, NONE for missing or unknown types."""
+    return TYPE_CODES.get((name or '').lower(), NONE)
+
+
+def encode(type1, type2):
+    """Vectorized ``type_code`` over two arrays of type names; mono types get NONE as type2."""
+    codes1 = np.fromiter((type_code(t) for t in type1), dtype=np.intp, count=len(type1))
+    codes2 = np.fromiter((type_code(t) for t in type2), dtype=np.intp, count=len(type2))
+    codes2[codes2 == codes1] = NONE
+    return codes1, codes2
+
+
+def defensive_profile(type1, type2=None):
+    """``{attacking type: multiplier}`` for a single or dual type."""
+    codes1, codes2 = encode([type1], [type2])
+    return dict(zip(TYPES, PROFILES[codes1[0], codes2[0]].tolist()))
+
+
+def dex_codes(table=None):
+    """Type codes of every Pokemon in the stat table, encoded once per data generation."""
+    table = stat_table() if table is None else table
+    return table.memoized('type_codes', lambda: encode(table.type1, table.type2))
+
+
+class TeamReport:
+    """Coverage analysis of a team, all arrays indexed by type code."""
+
+    def __init__(self, positions, table):
+        self.table = table
+        self.positions = np.asarray(positions, dtype=np.intp)
+        codes1, codes2 = dex_codes(table)
+        self.codes1 = codes1[self.positions]
+        self.codes2 = codes2[self.positions]
+        # Multiplier each member takes from each attacking type: (members, 18)
+        self.defense = PROFILES[self.codes1, self.codes2]
+        self.weak = (self.defense > 1).sum(axis=0)
+        self.resist = (self.defense < 1).sum(axis=0)
+        # Best multiplier of the team's own types against each defending type
+        attack_codes = np.unique(np.concatenate([self.codes1, self.codes2]))
+        self.offense = ATTACK[attack_codes].max(axis=0, initial=0)
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def members(self):
+        return [(int(self.table.ids[p]), self.table.names[p], self.table.type1[p],
+                 self.table.type2[p] or None) for p in self.positions]
+
+    def shared_weakness_mask(self):
+        """Attacking types that hit at least two members (one on a solo team) and are not walled."""
+        return (self.weak >= min(2, len(self))) & (self.weak > self.resist)
+
+    def shared_weaknesses(self):
+        """``[(type, weak members, resisting members)]``, worst first."""
+        codes = np.flatnonzero(self.shared_weakness_mask())
+        order = np.argsort(self.resist[codes] - self.weak[codes], kind='stable')
+        return [(TYPES[c], int(self.weak[c]), int(self.resist[c])) for c in codes[order]]
+
+    def covered(self):
+        """Defending types the team hits super effectively with its own types."""
+        return [TYPES[c] for c in np.flatnonzero(self.offense > 1)]
+
+    def uncovered(self):
+        return [TYPES[c] for c in np.flatnonzero(self.offense <= 1)]
+
+    def suggestions(self, n=DEFAULT_SUGGESTIONS):
+        """
+        The ``n`` Pokemon that best patch the team, scored for every Pokemon
+        in the dex at once: each shared weakness it resists adds (and each
+        it shares subtracts) the number of members it outnumbers resists
+        by, each uncovered type its own types hit super effectively adds 1,
+        and base stat total breaks ties. Returns
+        ``[(id, name, type1, type2, score)]``.
+        """
+        if not len(self.table):
+            return []
+        codes1, codes2 = dex_codes(self.table)
+        weights = np.maximum(self.weak - self.resist, 0) * self.shared_weakness_mask()
+        profiles = PROFILES[codes1, codes2]                        # (dex, 18)
+        defensive = (profiles < 1) @ weights - (profiles > 1) @ weights
+        best_attack = np.maximum(ATTACK[codes1], ATTACK[codes2])  # (dex, 18)
+        offensive = (best_attack > 1).astype(int) @ (self.offense <= 1)
+        score = (defensive + offensive).astype(float)
+        totals = np.nan_to_num(self.table.columns['total'])
+        # Tie-break by stat total; it stays below one point of score
+        ranking = score + totals / (totals.max() + 1)
+        ranking[self.positions] = -np.inf
+        count = min(n, len(ranking) - len(np.unique(self.positions)))
+        if count <= 0:
+            return []
+        top = np.argpartition(-ranking, count - 1)[:count]
+        top = top[np.argsort(-ranking[top], kind='stable')]
+        return [(int(self.table.ids[p]), self.table.names[p], self.table.type1[p],
+                 self.table.type2[p] or None, int(score[p])) for p in top]
+
+
+def resolve(identifiers, table=None):
+    """Pokedex IDs of the given IDs or names, in order; unknown ones are returned separately."""
+    table = stat_table() if table is None else table
+    by_name = table.memoized('name_index', lambda: {
+        name.lower(): int(pokemon_id) for pokemon_id, name in zip(table.ids, table.names)})
+    found, missing = [], []
+    for identifier in identifiers:
+        if identifier.isdigit():
+            pokemon_id = int(identifier) if table.row(int(identifier)) is not None else None
+        else:
+            pokemon_id = by_name.get(identifier.lower())
+        (missing if pokemon_id is None else found).append(pokemon_id or identifier)
+    return found, missing
+
+
+def analyze_team(pokemon_ids, table=None):
+    """``TeamReport`` of the Pokemon with ``pokemon_ids``; IDs not in the dex are skipped."""
+    table = stat_table() if table is None else table
+    ids = np.asarray(list(pokemon_ids), dtype=np.int64)
+    positions = np.searchsorted(table.ids, ids)
+    valid = positions < len(table.ids)
+    valid[valid] &= table.ids[positions[valid]] == ids[valid]
+    return TeamReport(positions[valid], table)